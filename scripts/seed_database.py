@@ -5,12 +5,12 @@ import sys
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
 import asyncio
-import bcrypt
 import uuid
 
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from src.backend.core.database import AsyncSessionLocal
+from src.backend.core.security import hash_api_key_secret
 from src.backend.models.organization import Organization
 from src.backend.models.user import User, APIKey
 
@@ -38,12 +38,12 @@ async def seed_database():
 
         # Create API Key
         api_key_secret = uuid.uuid4().hex
-        hashed_secret = bcrypt.hashpw(api_key_secret.encode("utf-8"), bcrypt.gensalt())
+        hashed_secret = hash_api_key_secret(api_key_secret)
         key_prefix = "gpus_tst"
 
         api_key = APIKey(
             key_prefix=key_prefix,
-            key_hash=hashed_secret.decode("utf-8"),
+            key_hash=hashed_secret,
             user_id=user.id,
             organization_id=organization.id,
         )
@@ -0,0 +1,44 @@
+"""add warm pool columns to gpu table
+
+Revision ID: 3b7e2d91a4f0
+Revises: c8f3859940b6
+Create Date: 2026-10-18 09:12:41.318204
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3b7e2d91a4f0'
+down_revision: Union[str, Sequence[str], None] = 'c8f3859940b6'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('gpus', sa.Column('gpu_model', sa.String(length=255), nullable=True))
+    op.add_column('gpus', sa.Column('region', sa.String(length=64), nullable=True))
+    # Warm pool GPUs are not assigned to an organization or user until claimed.
+    op.alter_column('gpus', 'organization_id', existing_type=sa.UUID(), nullable=True)
+    op.alter_column('gpus', 'user_id', existing_type=sa.UUID(), nullable=True)
+    op.create_index(
+        'ix_gpus_warm_pool',
+        'gpus',
+        ['gpu_model', 'region', 'created_at'],
+        unique=False,
+        postgresql_where=sa.text("organization_id IS NULL AND status = 'AVAILABLE'"),
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_gpus_warm_pool', table_name='gpus')
+    op.execute("DELETE FROM gpus WHERE organization_id IS NULL OR user_id IS NULL")
+    op.alter_column('gpus', 'user_id', existing_type=sa.UUID(), nullable=False)
+    op.alter_column('gpus', 'organization_id', existing_type=sa.UUID(), nullable=False)
+    op.drop_column('gpus', 'region')
+    op.drop_column('gpus', 'gpu_model')
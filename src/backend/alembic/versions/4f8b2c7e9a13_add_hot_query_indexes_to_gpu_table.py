@@ -0,0 +1,68 @@
+"""add hot query indexes to gpu table
+
+Revision ID: 4f8b2c7e9a13
+Revises: e2a7f5c13d68
+Create Date: 2026-10-18 18:05:52.771930
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '4f8b2c7e9a13'
+down_revision: Union[str, Sequence[str], None] = 'e2a7f5c13d68'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+ACTIVE = "status IN ('PROVISIONING', 'AVAILABLE', 'BUSY')"
+LEASED = "status IN ('AVAILABLE', 'BUSY')"
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Built concurrently so the gpus table stays writable; that cannot run
+    # inside the migration's transaction.
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_gpus_organization_id_status',
+            'gpus',
+            ['organization_id', 'status'],
+            unique=False,
+            postgresql_concurrently=True,
+        )
+        op.create_index(
+            'ix_gpus_organization_id_active',
+            'gpus',
+            ['organization_id'],
+            unique=False,
+            postgresql_where=sa.text(ACTIVE),
+            postgresql_concurrently=True,
+        )
+        op.create_index(
+            'ix_gpus_lease_expires_at_leased',
+            'gpus',
+            ['lease_expires_at'],
+            unique=False,
+            postgresql_where=sa.text(LEASED),
+            postgresql_concurrently=True,
+        )
+        # Superseded by the partial index above.
+        op.drop_index('ix_gpus_lease_expires_at', table_name='gpus', postgresql_concurrently=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_gpus_lease_expires_at',
+            'gpus',
+            ['lease_expires_at'],
+            unique=False,
+            postgresql_concurrently=True,
+        )
+        op.drop_index('ix_gpus_lease_expires_at_leased', table_name='gpus', postgresql_concurrently=True)
+        op.drop_index('ix_gpus_organization_id_active', table_name='gpus', postgresql_concurrently=True)
+        op.drop_index('ix_gpus_organization_id_status', table_name='gpus', postgresql_concurrently=True)
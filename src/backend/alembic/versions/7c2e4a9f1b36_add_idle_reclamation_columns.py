@@ -0,0 +1,44 @@
+"""add idle reclamation columns
+
+Revision ID: 7c2e4a9f1b36
+Revises: b5d9e1a7c342
+Create Date: 2026-10-18 21:12:40.318264
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '7c2e4a9f1b36'
+down_revision: Union[str, Sequence[str], None] = 'b5d9e1a7c342'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+idle_action = sa.Enum('NOTIFY', 'SHORTEN_LEASE', 'RECLAIM', name='idleaction')
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    idle_action.create(op.get_bind(), checkfirst=True)
+    op.add_column('organizations', sa.Column('idle_timeout_seconds', sa.Integer(), nullable=True))
+    op.add_column(
+        'organizations',
+        sa.Column('idle_action', idle_action, server_default='NOTIFY', nullable=False),
+    )
+    op.add_column(
+        'organizations',
+        sa.Column('idle_grace_seconds', sa.Integer(), server_default='900', nullable=False),
+    )
+    op.add_column('gpus', sa.Column('idle_since', sa.DateTime(timezone=True), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('gpus', 'idle_since')
+    op.drop_column('organizations', 'idle_grace_seconds')
+    op.drop_column('organizations', 'idle_action')
+    op.drop_column('organizations', 'idle_timeout_seconds')
+    idle_action.drop(op.get_bind(), checkfirst=True)
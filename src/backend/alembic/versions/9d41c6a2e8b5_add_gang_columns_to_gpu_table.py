@@ -0,0 +1,32 @@
+"""add gang columns to gpu table
+
+Revision ID: 9d41c6a2e8b5
+Revises: 3b7e2d91a4f0
+Create Date: 2026-10-18 14:03:27.552817
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9d41c6a2e8b5'
+down_revision: Union[str, Sequence[str], None] = '3b7e2d91a4f0'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('gpus', sa.Column('gang_id', sa.UUID(), nullable=True))
+    op.add_column('gpus', sa.Column('placement_group', sa.String(length=255), nullable=True))
+    op.create_index(op.f('ix_gpus_gang_id'), 'gpus', ['gang_id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_gpus_gang_id'), table_name='gpus')
+    op.drop_column('gpus', 'placement_group')
+    op.drop_column('gpus', 'gang_id')
@@ -0,0 +1,76 @@
+"""add keyset pagination indexes
+
+Revision ID: b5d9e1a7c342
+Revises: 4f8b2c7e9a13
+Create Date: 2026-10-18 19:26:14.508817
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b5d9e1a7c342'
+down_revision: Union[str, Sequence[str], None] = '4f8b2c7e9a13'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Built concurrently so the tables stay writable; that cannot run inside
+    # the migration's transaction.
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_gpus_organization_id_created_at_current',
+            'gpus',
+            ['organization_id', 'created_at', 'id'],
+            unique=False,
+            postgresql_where=sa.text("status <> 'DEPROVISIONED'"),
+            postgresql_concurrently=True,
+        )
+        op.create_index(
+            'ix_gpus_organization_id_status_created_at',
+            'gpus',
+            ['organization_id', 'status', 'created_at', 'id'],
+            unique=False,
+            postgresql_concurrently=True,
+        )
+        # Its columns are a prefix of the index above.
+        op.drop_index('ix_gpus_organization_id_status', table_name='gpus', postgresql_concurrently=True)
+        op.create_index(
+            'ix_users_organization_id_created_at',
+            'users',
+            ['organization_id', 'created_at', 'id'],
+            unique=False,
+            postgresql_concurrently=True,
+        )
+        op.create_index(
+            'ix_api_keys_user_id_created_at',
+            'api_keys',
+            ['user_id', 'created_at', 'id'],
+            unique=False,
+            postgresql_concurrently=True,
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_api_keys_user_id_created_at', table_name='api_keys', postgresql_concurrently=True)
+        op.drop_index('ix_users_organization_id_created_at', table_name='users', postgresql_concurrently=True)
+        op.create_index(
+            'ix_gpus_organization_id_status',
+            'gpus',
+            ['organization_id', 'status'],
+            unique=False,
+            postgresql_concurrently=True,
+        )
+        op.drop_index(
+            'ix_gpus_organization_id_status_created_at', table_name='gpus', postgresql_concurrently=True
+        )
+        op.drop_index(
+            'ix_gpus_organization_id_created_at_current', table_name='gpus', postgresql_concurrently=True
+        )
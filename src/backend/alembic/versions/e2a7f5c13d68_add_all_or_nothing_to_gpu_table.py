@@ -0,0 +1,31 @@
+"""add all_or_nothing to gpu table
+
+Revision ID: e2a7f5c13d68
+Revises: 9d41c6a2e8b5
+Create Date: 2026-10-18 16:47:09.204153
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e2a7f5c13d68'
+down_revision: Union[str, Sequence[str], None] = '9d41c6a2e8b5'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column(
+        'gpus',
+        sa.Column('all_or_nothing', sa.Boolean(), server_default=sa.false(), nullable=False),
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('gpus', 'all_or_nothing')
@@ -1,3 +1,5 @@
+from fastapi import APIRouter
+
 from src.backend.api.v1.endpoints import organizations, gpus, users, api_keys
 
 api_router = APIRouter()
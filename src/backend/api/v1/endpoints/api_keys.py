@@ -1,9 +1,11 @@
+import uuid
 
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Response, status
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from src.backend.core.auth import get_current_user
-from src.backend.core.database import get_db
+from src.backend.core.database import get_db, get_read_db
+from src.backend.core.pagination import PageParams, page_params, set_next_cursor
 from src.backend.crud.api_key import api_key as api_key_crud
 from src.backend.models.user import User
 from src.backend.schemas import api_key as api_key_schema
@@ -35,15 +37,45 @@ async def create_api_key(
 
 @router.get("/", response_model=list[api_key_schema.APIKey], summary="List API keys")
 async def get_api_keys(
-    db: AsyncSession = Depends(get_db),
-    skip: int = 0,
-    limit: int = 100,
+    response: Response,
+    db: AsyncSession = Depends(get_read_db),
+    page: PageParams = Depends(page_params),
     current_user: User = Depends(get_current_user),
 ):
     """
-    Retrieve a list of API keys for the current user.
+    Retrieve a page of API keys for the current user, oldest first;
+    X-Next-Cursor holds the `cursor` of the next page, if any.
     """
-    api_keys = await api_key_crud.get_multi_by_user(
-        db, user_id=current_user.id, skip=skip, limit=limit
+    api_keys, next_key = await api_key_crud.get_multi_by_user(
+        db, user_id=current_user.id, page=page
     )
+    set_next_cursor(response, next_key)
     return api_keys
+
+
+@router.delete(
+    "/{key_id}",
+    response_model=api_key_schema.APIKey,
+    summary="Revoke an API key",
+)
+async def revoke_api_key(
+    *,
+    db: AsyncSession = Depends(get_db),
+    key_id: uuid.UUID,
+    current_user: User = Depends(get_current_user),
+):
+    """
+    Revoke one of the current user's API keys. The key stops authenticating immediately.
+    """
+    db_api_key = await api_key_crud.get(db, id=key_id)
+    if not db_api_key:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="API key not found.",
+        )
+    if db_api_key.user_id != current_user.id:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="You do not have permission to revoke this API key.",
+        )
+    return await api_key_crud.revoke(db, db_obj=db_api_key)
@@ -1,16 +1,38 @@
+import time
 import uuid
+from datetime import datetime, timedelta, timezone
 from typing import List, Optional
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, status
+from fastapi.responses import StreamingResponse
+from sqlalchemy.exc import DBAPIError
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from src.backend.core.auth import get_current_user
-from src.backend.core.database import get_db
+from src.backend.core.config import settings
+from src.backend.core.database import (
+    AsyncSessionLocal,
+    get_db,
+    get_read_db,
+    open_read_session,
+    record_read_failure,
+    replica_router,
+)
+from src.backend.core.export import MEDIA_TYPES, ExportFormat, encode_rows
+from src.backend.core.gpu_cache import gpu_cache
+from src.backend.core.heartbeats import heartbeat_buffer
+from src.backend.core.pagination import PageParams, page_params, set_next_cursor
+from src.backend.core.quota import quota_backend
+from src.backend.core.responses import FastJSONResponse
+from src.backend.core.scheduler import allocation_scheduler
+from src.backend.core.telemetry import METRICS as TELEMETRY_METRICS, telemetry_store
+from src.backend.core.warm_pool import warm_pool_stats
 from src.backend.models.user import User
 from src.backend.schemas import gpu as gpu_schema
-from src.backend.worker import provision_gpu
+from src.backend.worker import dispatch_allocations
 from src.backend.crud.organization import organization as organization_crud
 from src.backend.crud import gpu as gpu_crud
-from src.backend.models.gpu import GpuStatus
+from src.backend.models.gpu import GpuHealthState, GpuStatus
+from src.backend.models.organization import IdleAction
 
 router = APIRouter()
 
@@ -28,7 +50,17 @@ async def allocate_gpu(
 ):
     """
     Asynchronously requests a new GPU.
+
+    A GPU from the warm pool is claimed and returned ready to use when one is
+    available. Otherwise the request joins the organization's provisioning
+    queue, which is drained fair-share across organizations.
+
+    Requests for more than one GPU are gang allocations: the GPUs are
+    reserved against the quota together and launched in a single batch,
+    optionally into a cluster placement group. Gangs are never served from
+    the warm pool, whose GPUs are not co-located.
     """
+    started = time.perf_counter()
     organization = await organization_crud.get(db, id=current_user.organization_id)
     if not organization:
         raise HTTPException(
@@ -36,44 +68,238 @@ async def allocate_gpu(
             detail="Organization not found.",
         )
 
-    active_gpu_count = await organization_crud.get_active_gpu_count(db, organization_id=organization.id)
-    if active_gpu_count >= organization.max_active_gpus:
-        raise HTTPException(
-            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
-            detail="GPU quota reached. Please deallocate an existing GPU before requesting a new one.",
+    quota_exceeded = HTTPException(
+        status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+        detail="GPU quota reached. Please deallocate an existing GPU before requesting a new one.",
+    )
+    region = allocation_request.region or settings.AWS_REGION
+    is_gang = allocation_request.count > 1
+
+    warm_gpu = None
+    if not is_gang:
+        warm_gpu = await gpu_crud.gpu.claim_warm(
+            db,
+            gpu_model=allocation_request.gpu_model,
+            region=region,
+            organization_id=organization.id,
+            user_id=current_user.id,
+            lease_expires_at=datetime.now(timezone.utc)
+            + timedelta(seconds=settings.GPU_DEFAULT_LEASE_SECONDS),
         )
+    if warm_gpu is not None:
+        # Rolling back releases the row lock and leaves the GPU in the pool.
+        if not await quota_backend.reserve(
+            str(organization.id), str(warm_gpu.id), organization.max_active_gpus
+        ):
+            await db.rollback()
+            raise quota_exceeded
+        await db.commit()
+        # The GPU changed hands: drop its cached unassigned copy.
+        await gpu_cache.invalidate([warm_gpu.id])
+        await quota_backend.commit(str(organization.id), str(warm_gpu.id))
+        await warm_pool_stats.record_hit(time.perf_counter() - started)
+        return {
+            "task_id": None,
+            "gpu_id": warm_gpu.id,
+            "gpu_ids": [warm_gpu.id],
+            "message": "GPU allocated from the warm pool and ready to use.",
+        }
+    if not is_gang:
+        await warm_pool_stats.record_miss()
+
+    # The reservation IDs become the IDs of the GPU rows the worker creates.
+    gpu_ids = [uuid.uuid4() for _ in range(allocation_request.count)]
+    gang_id = uuid.uuid4() if is_gang else None
+    reservation_ids = [str(gpu_id) for gpu_id in gpu_ids]
+    reserved = await quota_backend.reserve_many(
+        str(organization.id), reservation_ids, organization.max_active_gpus
+    )
+    if not reserved:
+        raise quota_exceeded
 
-    task_payload = allocation_request.dict()
+    request_id = str(gang_id or gpu_ids[0])
+    task_payload = allocation_request.model_dump(mode="json")
+    task_payload["gpu_id"] = reservation_ids[0]
+    task_payload["gpu_ids"] = reservation_ids
+    task_payload["gang_id"] = str(gang_id) if gang_id else None
+    task_payload["request_id"] = request_id
+    task_payload["region"] = region
     task_payload["user_id"] = str(current_user.id)
     task_payload["organization_id"] = str(current_user.organization_id)
-    task = provision_gpu.delay(task_payload)
-    
-    return {"task_id": str(task.id), "message": "GPU allocation request has been accepted."}
+    try:
+        queued = await allocation_scheduler.enqueue(
+            request_id=request_id,
+            organization_id=str(organization.id),
+            priority=allocation_request.priority.value,
+            payload=task_payload,
+            cost=allocation_request.count,
+        )
+        dispatch_allocations.delay()
+    except Exception:
+        await quota_backend.release_many(str(organization.id), reservation_ids)
+        raise
+
+    return {
+        "task_id": None,
+        "gpu_id": gpu_ids[0],
+        "gang_id": gang_id,
+        "gpu_ids": gpu_ids,
+        "message": "GPU allocation request has been accepted.",
+        "queue_position": queued["queue_position"],
+        "estimated_wait_seconds": queued["estimated_wait_seconds"],
+    }
+
+
+@router.get(
+    "/allocations/{gpu_id}",
+    response_model=gpu_schema.GPUAllocationStatus,
+    summary="Get the scheduling state of an allocation request.",
+)
+async def get_allocation_status(
+    *,
+    current_user: User = Depends(get_current_user),
+    gpu_id: uuid.UUID,
+):
+    """
+    Get the queue position and estimated wait of a queued allocation request.
+    Gang allocations are looked up by their gang ID.
+    """
+    allocation = await allocation_scheduler.status(str(gpu_id))
+    if allocation is None or allocation["request"].organization_id != str(current_user.organization_id):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Allocation request not found.",
+        )
+    return {
+        "gpu_id": gpu_id,
+        "state": allocation["state"],
+        "queue_position": allocation["queue_position"],
+        "estimated_wait_seconds": allocation["estimated_wait_seconds"],
+    }
 
 
 @router.get(
     "/gpus",
     response_model=List[gpu_schema.GPU],
+    response_class=FastJSONResponse,
     summary="List GPUs for the organization.",
 )
 async def list_gpus(
     *,
-    db: AsyncSession = Depends(get_db),
+    db: AsyncSession = Depends(get_read_db),
     current_user: User = Depends(get_current_user),
     status: Optional[GpuStatus] = None,
+    page: PageParams = Depends(page_params),
 ):
     """
-    List all GPUs for the user's organization.
+    List the GPUs of the user's organization, oldest first. DEPROVISIONED
+    GPUs are only listed when filtered for by `status`. When there are more
+    GPUs, the X-Next-Cursor response header holds the `cursor` of the next page.
+
+    The rows are read as plain columns and encoded straight to JSON, without
+    loading entities or validating each row against the response model.
     """
-    gpus = await gpu_crud.gpu.get_multi_by_owner(
-        db, organization_id=current_user.organization_id, status=status
+    rows, next_key = await gpu_crud.gpu.get_rows_by_owner(
+        db, organization_id=current_user.organization_id, status=status, page=page
+    )
+    response = FastJSONResponse([row._asdict() for row in rows])
+    set_next_cursor(response, next_key)
+    return response
+
+
+@router.get(
+    "/idle",
+    response_model=List[gpu_schema.IdleGPU],
+    summary="List the organization's idle GPUs.",
+)
+async def list_idle_gpus(
+    *,
+    db: AsyncSession = Depends(get_read_db),
+    current_user: User = Depends(get_current_user),
+):
+    """
+    List the organization's GPUs flagged as idle under its idle policy,
+    longest idle first, with what will happen to them if they stay idle.
+    GPUs are unflagged once they are busy again.
+    """
+    organization = await organization_crud.get(db, id=current_user.organization_id)
+    rows = await gpu_crud.gpu.get_idle_by_owner(db, organization_id=current_user.organization_id)
+    grace = timedelta(seconds=organization.idle_grace_seconds)
+    return [
+        {
+            "gpu_id": row.id,
+            "idle_since": row.idle_since,
+            "lease_expires_at": row.lease_expires_at,
+            "action": organization.idle_action,
+            "reclaim_at": (
+                row.idle_since + grace if organization.idle_action == IdleAction.RECLAIM else None
+            ),
+        }
+        for row in rows
+    ]
+
+
+@router.get(
+    "/export",
+    response_class=StreamingResponse,
+    summary="Export the organization's GPUs as NDJSON or CSV.",
+)
+async def export_gpus(
+    *,
+    request: Request,
+    current_user: User = Depends(get_current_user),
+    format: ExportFormat = ExportFormat.NDJSON,
+    status: Optional[GpuStatus] = None,
+    health_state: Optional[GpuHealthState] = None,
+    created_after: Optional[datetime] = None,
+    created_before: Optional[datetime] = None,
+    updated_after: Optional[datetime] = None,
+):
+    """
+    Stream every GPU of the user's organization, DEPROVISIONED ones included,
+    oldest first. Rows are read through a server-side cursor and sent in
+    chunks as they arrive, so exports of any size use bounded memory.
+    """
+    organization_id = current_user.organization_id
+    columns = [column.key for column in gpu_crud.GPU_COLUMNS]
+
+    async def rows():
+        # The export outlives the request's dependencies, so it reads through
+        # a session of its own: one snapshot transaction, as server-side
+        # cursors need a transaction.
+        db = await open_read_session(
+            request, isolation_level="REPEATABLE READ", postgresql_readonly=True
+        )
+        try:
+            partitions = gpu_crud.gpu.stream_export(
+                db,
+                organization_id=organization_id,
+                status=status,
+                health_state=health_state,
+                created_after=created_after,
+                created_before=created_before,
+                updated_after=updated_after,
+                chunk_rows=settings.EXPORT_CHUNK_ROWS,
+            )
+            async for chunk in encode_rows(format, columns, partitions):
+                yield chunk
+        except DBAPIError as e:
+            record_read_failure(db, e)
+            raise
+        finally:
+            await db.close()
+
+    return StreamingResponse(
+        rows(),
+        media_type=MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="gpus.{format.value}"'},
     )
-    return gpus
 
 
 @router.get(
     "/gpu/{gpu_id}",
     response_model=gpu_schema.GPU,
+    response_class=FastJSONResponse,
     summary="Get a specific GPU by ID.",
 )
 async def get_gpu(
@@ -83,15 +309,156 @@ async def get_gpu(
     gpu_id: uuid.UUID,
 ):
     """
-    Get a specific GPU by ID.
+    Get a specific GPU by ID, through the GPU cache.
     """
-    gpu = await gpu_crud.gpu.get(db, id=gpu_id)
-    if not gpu:
+    return FastJSONResponse(await get_owned_gpu(db, current_user, gpu_id))
+
+
+@router.put(
+    "/gpu/{gpu_id}/heartbeat",
+    response_model=gpu_schema.GPUHeartbeatAck,
+    status_code=status.HTTP_202_ACCEPTED,
+    summary="Report the health of a GPU.",
+)
+async def record_heartbeat(
+    *,
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+    gpu_id: uuid.UUID,
+    heartbeat: gpu_schema.GPUHeartbeat,
+):
+    """
+    Used by the on-instance agent to report the GPU's health and telemetry.
+    The heartbeat is acknowledged at once and written to the database
+    asynchronously; telemetry is kept by this process only.
+    """
+    await get_owned_gpu(db, current_user, gpu_id)
+    heartbeat_buffer.record(gpu_id, heartbeat.health_state)
+    record_telemetry(gpu_id, current_user.organization_id, heartbeat)
+    return {"accepted": 1}
+
+
+@router.put(
+    "/heartbeats",
+    response_model=gpu_schema.GPUHeartbeatAck,
+    status_code=status.HTTP_202_ACCEPTED,
+    summary="Report the health of several GPUs.",
+)
+async def record_heartbeats(
+    *,
+    db: AsyncSession = Depends(get_read_db),
+    current_user: User = Depends(get_current_user),
+    batch: gpu_schema.GPUHeartbeatBatch,
+):
+    """
+    Report the health of several GPUs of the organization in one request.
+    The batch is rejected as a whole if any of its GPUs is not the
+    organization's.
+    """
+    gpu_ids = {heartbeat.gpu_id for heartbeat in batch.heartbeats}
+    owned = await gpu_crud.gpu.get_owned_ids(
+        db, organization_id=current_user.organization_id, gpu_ids=gpu_ids
+    )
+    if owned != gpu_ids and db.bind is not replica_router.primary:
+        # A GPU allocated moments ago may not have reached the replica yet.
+        async with AsyncSessionLocal() as primary:
+            owned = await gpu_crud.gpu.get_owned_ids(
+                primary, organization_id=current_user.organization_id, gpu_ids=gpu_ids
+            )
+    if owned != gpu_ids:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="You do not have permission to access this resource.",
+        )
+    for heartbeat in batch.heartbeats:
+        heartbeat_buffer.record(heartbeat.gpu_id, heartbeat.health_state)
+        record_telemetry(heartbeat.gpu_id, current_user.organization_id, heartbeat)
+    return {"accepted": len(batch.heartbeats)}
+
+
+# Telemetry can be queried as far back as the hourly ring reaches.
+MAX_TELEMETRY_WINDOW_SECONDS = settings.TELEMETRY_HOUR_SAMPLES * 3600
+
+
+@router.get(
+    "/gpu/{gpu_id}/telemetry",
+    response_model=gpu_schema.GPUTelemetry,
+    summary="Get the utilization of a GPU over a window.",
+)
+async def get_gpu_telemetry(
+    *,
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+    gpu_id: uuid.UUID,
+    window_seconds: int = Query(3600, ge=1, le=MAX_TELEMETRY_WINDOW_SECONDS),
+):
+    """
+    Mean and p95 of the GPU's reported metrics, and the share of the time it
+    was idle, over the last `window_seconds`. Telemetry is kept by the API
+    process that received the heartbeats, so agents should keep reporting to
+    the same one.
+    """
+    await get_owned_gpu(db, current_user, gpu_id)
+    telemetry = telemetry_store.gpu_telemetry(gpu_id, window_seconds)
+    if telemetry is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
-            detail="GPU not found.",
+            detail="No telemetry has been reported for this GPU.",
         )
-    if gpu.organization_id != current_user.organization_id:
+    return {**telemetry, "gpu_id": gpu_id, "window_seconds": window_seconds}
+
+
+@router.get(
+    "/telemetry",
+    response_model=gpu_schema.OrganizationTelemetry,
+    summary="Get the utilization of the organization's GPUs over a window.",
+)
+async def get_organization_telemetry(
+    *,
+    current_user: User = Depends(get_current_user),
+    window_seconds: int = Query(3600, ge=1, le=MAX_TELEMETRY_WINDOW_SECONDS),
+):
+    """
+    The telemetry of every GPU of the organization that reported any to this
+    process, and their aggregate over the last `window_seconds`.
+    """
+    summary, per_gpu = telemetry_store.organization_telemetry(
+        current_user.organization_id, window_seconds
+    )
+    return {
+        **summary,
+        "window_seconds": window_seconds,
+        "gpus": [
+            {**telemetry, "gpu_id": gpu_id, "window_seconds": window_seconds}
+            for gpu_id, telemetry in per_gpu.items()
+        ],
+    }
+
+
+def record_telemetry(gpu_id: uuid.UUID, organization_id: uuid.UUID, heartbeat: gpu_schema.GPUHeartbeat) -> None:
+    telemetry_store.record(
+        gpu_id, organization_id, [getattr(heartbeat, metric) for metric in TELEMETRY_METRICS]
+    )
+
+
+async def get_owned_gpu(db: AsyncSession, current_user: User, gpu_id: uuid.UUID) -> dict:
+    """
+    Return the caller's GPU from the GPU cache, or raise 404 or 403.
+
+    Misses read the primary, not a replica: a lagging replica could return
+    the row as it was before the write that invalidated the cache.
+    """
+    gpu = await gpu_cache.get(gpu_id)
+    if gpu is None:
+        version = await gpu_cache.version(gpu_id)
+        row = await gpu_crud.gpu.get_row(db, gpu_id)
+        if not row:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="GPU not found.",
+            )
+        gpu = await gpu_cache.fill(gpu_id, row._asdict(), version)
+    if gpu["organization_id"] != str(current_user.organization_id):
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="You do not have permission to access this resource.",
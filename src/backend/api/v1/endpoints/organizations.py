@@ -1,12 +1,18 @@
 from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from src.backend.core.database import get_db
+from src.backend.core.auth import RoleChecker, get_current_user
+from src.backend.core.database import get_db, get_read_db
+from src.backend.core.gpu_cache import gpu_cache
+from src.backend.crud.gpu import gpu as gpu_crud
 from src.backend.crud.organization import organization as organization_crud
+from src.backend.models.user import User
 from src.backend.schemas import organization as organization_schema
 
 router = APIRouter()
 
+admin_role_checker = RoleChecker(["admin"])
+
 
 @router.post(
     "/",
@@ -30,3 +36,50 @@ async def create_organization(
         )
     organization = await organization_crud.create(db=db, obj_in=organization_in)
     return organization
+
+
+
+@router.get(
+    "/idle-policy",
+    response_model=organization_schema.IdlePolicy,
+    summary="Get the organization's idle GPU policy",
+)
+async def get_idle_policy(
+    *,
+    db: AsyncSession = Depends(get_read_db),
+    current_user: User = Depends(get_current_user),
+):
+    """
+    Get how the current user's organization handles GPUs that sit idle.
+    """
+    return await organization_crud.get(db, id=current_user.organization_id)
+
+
+@router.put(
+    "/idle-policy",
+    response_model=organization_schema.IdlePolicy,
+    summary="Set the organization's idle GPU policy",
+    dependencies=[Depends(admin_role_checker)],
+)
+async def set_idle_policy(
+    *,
+    db: AsyncSession = Depends(get_db),
+    policy_in: organization_schema.IdlePolicy,
+    current_user: User = Depends(get_current_user),
+):
+    """
+    Set how the current user's organization handles GPUs that sit idle.
+    Disabling the policy clears the idle flag of the organization's GPUs;
+    leases already cut are left as they are. Only accessible to users with
+    the 'admin' role.
+    """
+    organization = await organization_crud.get(db, id=current_user.organization_id)
+    for field, value in policy_in.model_dump().items():
+        setattr(organization, field, value)
+    cleared = []
+    if policy_in.idle_timeout_seconds is None:
+        cleared = await gpu_crud.clear_idle(db, organization_id=organization.id)
+    await db.commit()
+    await db.refresh(organization)
+    await gpu_cache.invalidate(cleared)
+    return organization
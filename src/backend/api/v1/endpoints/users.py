@@ -1,10 +1,11 @@
 
 import uuid
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Response, status
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from src.backend.core.auth import get_current_user, RoleChecker
-from src.backend.core.database import get_db
+from src.backend.core.database import get_db, get_read_db
+from src.backend.core.pagination import PageParams, page_params, set_next_cursor
 from src.backend.crud.user import user as user_crud
 from src.backend.models.user import User
 from src.backend.schemas import user as user_schema
@@ -49,18 +50,20 @@ async def create_user(
     dependencies=[Depends(admin_role_checker)],
 )
 async def get_users(
-    db: AsyncSession = Depends(get_db),
-    skip: int = 0,
-    limit: int = 100,
+    response: Response,
+    db: AsyncSession = Depends(get_read_db),
+    page: PageParams = Depends(page_params),
     current_user: User = Depends(get_current_user),
 ):
     """
-    Retrieve a list of users for the current user's organization.
+    Retrieve a page of users for the current user's organization, oldest
+    first; X-Next-Cursor holds the `cursor` of the next page, if any.
     Only accessible to users with the 'admin' role.
     """
-    users = await user_crud.get_users_by_organization(
-        db, organization_id=current_user.organization_id, skip=skip, limit=limit
+    users, next_key = await user_crud.get_users_by_organization(
+        db, organization_id=current_user.organization_id, page=page
     )
+    set_next_cursor(response, next_key)
     return users
 
 
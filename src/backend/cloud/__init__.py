@@ -0,0 +1,50 @@
+from src.backend.core.config import settings
+from src.backend.core.rate_limit import CloudAPIGuard
+
+from .base import (
+    CloudError,
+    CloudProvider,
+    InstanceState,
+    InsufficientCapacity,
+    PlacementGroupInUse,
+    chunked,
+)
+from .ec2 import EC2Clients, EC2Provider
+from .simulated import SimulatedProvider
+
+
+def create_cloud_provider(guard: CloudAPIGuard) -> CloudProvider:
+    if settings.CLOUD_PROVIDER == "ec2":
+        return EC2Provider(
+            EC2Clients(guard),
+            image_id=settings.AWS_AMI_ID,
+            security_group_ids=[settings.AWS_SECURITY_GROUP_ID],
+            key_name=settings.AWS_KEY_PAIR_NAME,
+        )
+    if settings.CLOUD_PROVIDER == "simulated":
+        return SimulatedProvider(
+            boot_distribution=settings.SIMULATED_BOOT_DISTRIBUTION,
+            boot_seconds=settings.SIMULATED_BOOT_SECONDS,
+            boot_spread=settings.SIMULATED_BOOT_SPREAD,
+            capacity=settings.SIMULATED_CAPACITY,
+            api_rate_limit=settings.SIMULATED_API_RATE_LIMIT,
+            launch_failure_rate=settings.SIMULATED_LAUNCH_FAILURE_RATE,
+            boot_failure_rate=settings.SIMULATED_BOOT_FAILURE_RATE,
+            guard=guard,
+            seed=settings.SIMULATED_SEED,
+        )
+    raise ValueError(f"Unknown cloud provider: {settings.CLOUD_PROVIDER!r}")
+
+
+__all__ = [
+    "CloudError",
+    "CloudProvider",
+    "EC2Clients",
+    "EC2Provider",
+    "InstanceState",
+    "InsufficientCapacity",
+    "PlacementGroupInUse",
+    "SimulatedProvider",
+    "chunked",
+    "create_cloud_provider",
+]
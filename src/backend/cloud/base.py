@@ -0,0 +1,117 @@
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional
+
+from botocore.exceptions import ClientError
+
+# Most instance IDs a single provider call takes (EC2's limit).
+MAX_BATCH_SIZE = 1000
+
+
+def chunked(items: List, size: int = MAX_BATCH_SIZE) -> Iterable[List]:
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+@dataclass
+class InstanceState:
+    """
+    An instance as the provider reports it. `state` uses the EC2 lifecycle
+    names: pending, running, stopping, stopped, shutting-down, terminated.
+    """
+    instance_id: str
+    state: str
+    public_ip: Optional[str] = None
+
+
+class CloudError(Exception):
+    """A cloud API call failed for a reason retrying will not fix."""
+
+    def __init__(self, code: str, message: str = ""):
+        super().__init__(f"{code}: {message}" if message else code)
+        self.code = code
+
+
+class InsufficientCapacity(CloudError):
+    """The provider cannot launch the requested number of instances."""
+
+
+class PlacementGroupInUse(CloudError):
+    """The placement group still has instances and cannot be deleted yet."""
+
+
+_ERRORS_BY_CODE = {
+    "InsufficientInstanceCapacity": InsufficientCapacity,
+    "InvalidPlacementGroup.InUse": PlacementGroupInUse,
+}
+
+
+def cloud_error(error: ClientError) -> CloudError:
+    """The `CloudError` for a botocore `ClientError`."""
+    code = error.response["Error"]["Code"]
+    return _ERRORS_BY_CODE.get(code, CloudError)(code, error.response["Error"].get("Message", ""))
+
+
+@contextmanager
+def translate_client_errors():
+    """Re-raise botocore `ClientError`s as `CloudError`s."""
+    try:
+        yield
+    except ClientError as e:
+        raise cloud_error(e) from e
+
+
+class CloudProvider(ABC):
+    """
+    The cloud operations the workers need, per region.
+
+    Calls are synchronous. Throttling and transient failures are retried
+    by the provider's `CloudAPIGuard`, which raises `CloudAPIUnavailable`
+    when they persist; every other failure raises `CloudError`.
+    """
+
+    @abstractmethod
+    def launch(
+        self,
+        region: str,
+        *,
+        instance_type: str,
+        min_count: int,
+        max_count: int,
+        client_token: str,
+        tags: Dict[str, str],
+        placement_group: Optional[str] = None,
+    ) -> List[str]:
+        """
+        Launch between `min_count` and `max_count` instances and return their
+        IDs. Repeating a launch with the same `client_token` returns the
+        instances of the original launch instead of starting new ones.
+        """
+
+    @abstractmethod
+    def describe(self, region: str, instance_ids: List[str]) -> Dict[str, InstanceState]:
+        """Look up instances by ID. IDs the provider does not know yet are left out."""
+
+    @abstractmethod
+    def terminate(self, region: str, instance_ids: List[str]) -> None:
+        """Terminate instances."""
+
+    @abstractmethod
+    def stop(self, region: str, instance_ids: List[str]) -> None:
+        """Stop running instances, keeping their disks."""
+
+    @abstractmethod
+    def start(self, region: str, instance_ids: List[str]) -> None:
+        """Start stopped instances."""
+
+    @abstractmethod
+    def create_placement_group(self, region: str, name: str) -> None:
+        """Create a cluster placement group; a no-op if it already exists."""
+
+    @abstractmethod
+    def delete_placement_group(self, region: str, name: str) -> bool:
+        """
+        Delete a placement group. Returns False if it does not exist and raises
+        `PlacementGroupInUse` while instances in it are still terminating.
+        """
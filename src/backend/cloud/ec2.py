@@ -0,0 +1,172 @@
+import re
+import threading
+from typing import Dict, List, Optional
+
+import boto3
+from botocore.config import Config
+from botocore.exceptions import ClientError
+
+from src.backend.cloud.base import (
+    CloudError,
+    CloudProvider,
+    InstanceState,
+    chunked,
+    cloud_error,
+    translate_client_errors,
+)
+from src.backend.core.rate_limit import CloudAPIGuard, GuardedClient
+
+_INSTANCE_ID = re.compile(r"i-[0-9a-f]+")
+
+
+class EC2Clients:
+    """
+    EC2 clients and resources cached per region, sharing one boto3 session
+    so botocore loads the service model once per process.
+
+    Clients are thread-safe once built, so one per region is shared by all
+    threads; building them is not, hence the lock. Resources are not
+    thread-safe, so each thread gets its own.
+
+    With a `guard`, clients are rate limited and retried by it, and
+    botocore's own retries are turned off so the two do not compound.
+    """
+
+    def __init__(self, guard: Optional[CloudAPIGuard] = None):
+        self._guard = guard
+        self._config = Config(retries={"total_max_attempts": 1}) if guard else None
+        self._session = boto3.session.Session()
+        self._clients: Dict[str, object] = {}
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    def client(self, region: str):
+        with self._lock:
+            client = self._clients.get(region)
+            if client is None:
+                client = self._session.client("ec2", region_name=region, config=self._config)
+                if self._guard is not None:
+                    client = GuardedClient(client, region, self._guard)
+                self._clients[region] = client
+            return client
+
+    def resource(self, region: str):
+        resources = getattr(self._local, "resources", None)
+        if resources is None:
+            resources = self._local.resources = {}
+        resource = resources.get(region)
+        if resource is None:
+            with self._lock:
+                resource = self._session.resource("ec2", region_name=region)
+            resources[region] = resource
+        return resource
+
+
+class EC2Provider(CloudProvider):
+    """Amazon EC2, through cached and guarded boto3 clients."""
+
+    def __init__(
+        self,
+        clients: EC2Clients,
+        *,
+        image_id: str,
+        security_group_ids: List[str],
+        key_name: str,
+    ):
+        self.clients = clients
+        self.image_id = image_id
+        self.security_group_ids = security_group_ids
+        self.key_name = key_name
+
+    def launch(
+        self,
+        region: str,
+        *,
+        instance_type: str,
+        min_count: int,
+        max_count: int,
+        client_token: str,
+        tags: Dict[str, str],
+        placement_group: Optional[str] = None,
+    ) -> List[str]:
+        options = {}
+        if placement_group:
+            options["Placement"] = {"GroupName": placement_group}
+        with translate_client_errors():
+            response = self.clients.client(region).run_instances(
+                ImageId=self.image_id,
+                InstanceType=instance_type,
+                MinCount=min_count,
+                MaxCount=max_count,
+                SecurityGroupIds=self.security_group_ids,
+                KeyName=self.key_name,
+                TagSpecifications=[
+                    {
+                        "ResourceType": "instance",
+                        "Tags": [{"Key": key, "Value": value} for key, value in tags.items()],
+                    }
+                ],
+                ClientToken=client_token,
+                **options,
+            )
+        return [instance["InstanceId"] for instance in response["Instances"]]
+
+    def describe(self, region: str, instance_ids: List[str]) -> Dict[str, InstanceState]:
+        instances = {}
+        client = self.clients.client(region)
+        for chunk in chunked(list(instance_ids)):
+            while chunk:
+                try:
+                    # Lookups by ID return every match in one response.
+                    response = client.describe_instances(InstanceIds=chunk)
+                except ClientError as e:
+                    # Freshly launched instances can take a moment to appear;
+                    # drop them from the batch rather than failing it.
+                    if e.response["Error"]["Code"] != "InvalidInstanceID.NotFound":
+                        raise cloud_error(e) from e
+                    unknown = set(_INSTANCE_ID.findall(e.response["Error"].get("Message", "")))
+                    if not unknown & set(chunk):
+                        raise cloud_error(e) from e
+                    chunk = [instance_id for instance_id in chunk if instance_id not in unknown]
+                    continue
+                for reservation in response["Reservations"]:
+                    for instance in reservation["Instances"]:
+                        instances[instance["InstanceId"]] = InstanceState(
+                            instance["InstanceId"],
+                            instance["State"]["Name"],
+                            instance.get("PublicIpAddress"),
+                        )
+                break
+        return instances
+
+    def terminate(self, region: str, instance_ids: List[str]) -> None:
+        for chunk in chunked(list(instance_ids)):
+            with translate_client_errors():
+                self.clients.client(region).terminate_instances(InstanceIds=chunk)
+
+    def stop(self, region: str, instance_ids: List[str]) -> None:
+        for chunk in chunked(list(instance_ids)):
+            with translate_client_errors():
+                self.clients.client(region).stop_instances(InstanceIds=chunk)
+
+    def start(self, region: str, instance_ids: List[str]) -> None:
+        for chunk in chunked(list(instance_ids)):
+            with translate_client_errors():
+                self.clients.client(region).start_instances(InstanceIds=chunk)
+
+    def create_placement_group(self, region: str, name: str) -> None:
+        try:
+            self.clients.client(region).create_placement_group(GroupName=name, Strategy="cluster")
+        except ClientError as e:
+            if e.response["Error"]["Code"] != "InvalidPlacementGroup.Duplicate":
+                raise cloud_error(e) from e
+
+    def delete_placement_group(self, region: str, name: str) -> bool:
+        try:
+            with translate_client_errors():
+                self.clients.client(region).delete_placement_group(GroupName=name)
+        except CloudError as e:
+            if e.code == "InvalidPlacementGroup.Unknown":
+                return False
+            raise
+        return True
@@ -0,0 +1,314 @@
+import itertools
+import random
+import threading
+import time
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional
+
+from botocore.exceptions import ClientError
+
+from src.backend.cloud.base import CloudProvider, InstanceState, translate_client_errors
+from src.backend.core.rate_limit import CloudAPIGuard
+
+BOOT_DISTRIBUTIONS = ("constant", "uniform", "lognormal")
+
+
+@dataclass
+class _Instance:
+    instance_id: str
+    instance_type: str
+    placement_group: Optional[str]
+    state: str
+    # When the current transition (pending, stopping, shutting-down) ends.
+    settles_at: float
+    # Whether the instance dies instead of reaching "running".
+    boot_fails: bool = False
+    public_ip: Optional[str] = None
+
+
+class SimulatedProvider(CloudProvider):
+    """
+    An in-process stand-in for EC2, for running the allocate -> ready
+    pipeline at scale without AWS.
+
+    - Boot times follow `boot_distribution`: "constant" (`boot_seconds`),
+      "uniform" (`boot_seconds` +/- `boot_spread` of it) or "lognormal"
+      (median `boot_seconds`, shape `boot_spread`).
+    - `capacity` caps the instances of each type that can be pending or
+      running at once; launches beyond it fail like EC2's
+      InsufficientInstanceCapacity.
+    - `api_rate_limit` (calls per second per region and action) throttles
+      with RequestLimitExceeded.
+    - A `launch_failure_rate` share of launches fail with InternalError, and
+      a `boot_failure_rate` share of instances terminate instead of booting.
+
+    Failures are raised as botocore `ClientError`s with EC2's error codes and
+    pass through `guard` like real API calls would, so throttling and retries
+    behave as they do against EC2. State is per provider instance: every
+    worker process simulates its own cloud.
+    """
+
+    def __init__(
+        self,
+        *,
+        boot_distribution: str = "lognormal",
+        boot_seconds: float = 60.0,
+        boot_spread: float = 0.3,
+        transition_seconds: float = 5.0,
+        capacity: Optional[Dict[str, int]] = None,
+        api_rate_limit: Optional[float] = None,
+        launch_failure_rate: float = 0.0,
+        boot_failure_rate: float = 0.0,
+        guard: Optional[CloudAPIGuard] = None,
+        seed: Optional[int] = None,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        if boot_distribution not in BOOT_DISTRIBUTIONS:
+            raise ValueError(f"Unknown boot time distribution: {boot_distribution!r}")
+        self.boot_distribution = boot_distribution
+        self.boot_seconds = boot_seconds
+        self.boot_spread = boot_spread
+        self.transition_seconds = transition_seconds
+        self.capacity = capacity or {}
+        self.api_rate_limit = api_rate_limit
+        self.launch_failure_rate = launch_failure_rate
+        self.boot_failure_rate = boot_failure_rate
+        self.guard = guard
+        self.clock = clock
+        self._random = random.Random(seed)
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self._instances: Dict[str, Dict[str, _Instance]] = {}
+        self._placement_groups: Dict[str, set] = {}
+        self._client_tokens: Dict[str, Dict[str, List[str]]] = {}
+        self._buckets: Dict[str, tuple] = {}
+
+    def launch(
+        self,
+        region: str,
+        *,
+        instance_type: str,
+        min_count: int,
+        max_count: int,
+        client_token: str,
+        tags: Dict[str, str],
+        placement_group: Optional[str] = None,
+    ) -> List[str]:
+        return self._call(
+            region,
+            "RunInstances",
+            self._launch,
+            region,
+            instance_type,
+            min_count,
+            max_count,
+            client_token,
+            placement_group,
+        )
+
+    def describe(self, region: str, instance_ids: List[str]) -> Dict[str, InstanceState]:
+        return self._call(region, "DescribeInstances", self._describe, region, instance_ids)
+
+    def terminate(self, region: str, instance_ids: List[str]) -> None:
+        self._call(
+            region,
+            "TerminateInstances",
+            self._transition,
+            region,
+            instance_ids,
+            "shutting-down",
+            "TerminateInstances",
+        )
+
+    def stop(self, region: str, instance_ids: List[str]) -> None:
+        self._call(
+            region, "StopInstances", self._transition, region, instance_ids, "stopping", "StopInstances"
+        )
+
+    def start(self, region: str, instance_ids: List[str]) -> None:
+        self._call(region, "StartInstances", self._start, region, instance_ids)
+
+    def create_placement_group(self, region: str, name: str) -> None:
+        def create():
+            self._placement_groups.setdefault(region, set()).add(name)
+
+        self._call(region, "CreatePlacementGroup", create)
+
+    def delete_placement_group(self, region: str, name: str) -> bool:
+        return self._call(region, "DeletePlacementGroup", self._delete_placement_group, region, name)
+
+    def stats(self) -> dict:
+        """Instance counts per state, across regions."""
+        counts: Dict[str, int] = {}
+        with self._lock:
+            now = self.clock()
+            for instances in self._instances.values():
+                for instance in instances.values():
+                    self._settle(instance, now)
+                    counts[instance.state] = counts.get(instance.state, 0) + 1
+        return counts
+
+    def _call(self, region: str, action: str, fn: Callable, *args):
+        def attempt():
+            with self._lock:
+                self._throttle(region, action)
+                return fn(*args)
+
+        with translate_client_errors():
+            if self.guard is None:
+                return attempt()
+            return self.guard.call(region, action, attempt)
+
+    def _throttle(self, region: str, action: str) -> None:
+        if not self.api_rate_limit:
+            return
+        key = f"{region}:{action}"
+        now = self.clock()
+        burst = max(1.0, self.api_rate_limit)
+        tokens, updated_at = self._buckets.get(key, (burst, now))
+        tokens = min(burst, tokens + (now - updated_at) * self.api_rate_limit)
+        if tokens < 1:
+            self._buckets[key] = (tokens, now)
+            raise _client_error("RequestLimitExceeded", "Request limit exceeded.", action)
+        self._buckets[key] = (tokens - 1, now)
+
+    def _launch(
+        self,
+        region: str,
+        instance_type: str,
+        min_count: int,
+        max_count: int,
+        client_token: str,
+        placement_group: Optional[str],
+    ) -> List[str]:
+        tokens = self._client_tokens.setdefault(region, {})
+        if client_token in tokens:
+            return list(tokens[client_token])
+        if placement_group and placement_group not in self._placement_groups.get(region, ()):
+            raise _client_error(
+                "InvalidPlacementGroup.Unknown",
+                f"The Placement Group '{placement_group}' is unknown.",
+                "RunInstances",
+            )
+        if self._random.random() < self.launch_failure_rate:
+            raise _client_error("InternalError", "An internal error has occurred.", "RunInstances")
+
+        now = self.clock()
+        instances = self._instances.setdefault(region, {})
+        count = max_count
+        if instance_type in self.capacity:
+            in_use = 0
+            for instance in instances.values():
+                self._settle(instance, now)
+                if instance.instance_type == instance_type and instance.state in ("pending", "running"):
+                    in_use += 1
+            count = min(max_count, self.capacity[instance_type] - in_use)
+            if count < min_count:
+                raise _client_error(
+                    "InsufficientInstanceCapacity",
+                    f"We currently do not have sufficient {instance_type} capacity.",
+                    "RunInstances",
+                )
+
+        instance_ids = []
+        for _ in range(count):
+            instance = _Instance(
+                instance_id=f"i-{next(self._ids):017x}",
+                instance_type=instance_type,
+                placement_group=placement_group,
+                state="pending",
+                settles_at=now + self._boot_time(),
+                boot_fails=self._random.random() < self.boot_failure_rate,
+            )
+            instances[instance.instance_id] = instance
+            instance_ids.append(instance.instance_id)
+        tokens[client_token] = instance_ids
+        return list(instance_ids)
+
+    def _describe(self, region: str, instance_ids: List[str]) -> Dict[str, InstanceState]:
+        now = self.clock()
+        instances = self._instances.get(region, {})
+        described = {}
+        for instance_id in instance_ids:
+            instance = instances.get(instance_id)
+            if instance is None:
+                continue
+            self._settle(instance, now)
+            described[instance_id] = InstanceState(instance_id, instance.state, instance.public_ip)
+        return described
+
+    def _transition(self, region: str, instance_ids: List[str], state: str, action: str) -> None:
+        now = self.clock()
+        for instance in self._get_instances(region, instance_ids, action):
+            self._settle(instance, now)
+            if instance.state in ("terminated", "shutting-down"):
+                continue
+            if state == "stopping" and instance.state != "running":
+                continue
+            instance.state = state
+            instance.settles_at = now + self.transition_seconds
+            instance.public_ip = None
+
+    def _start(self, region: str, instance_ids: List[str]) -> None:
+        now = self.clock()
+        for instance in self._get_instances(region, instance_ids, "StartInstances"):
+            self._settle(instance, now)
+            if instance.state == "stopped":
+                instance.state = "pending"
+                instance.settles_at = now + self._boot_time()
+                instance.boot_fails = False
+
+    def _delete_placement_group(self, region: str, name: str) -> bool:
+        groups = self._placement_groups.get(region, set())
+        if name not in groups:
+            return False
+        now = self.clock()
+        for instance in self._instances.get(region, {}).values():
+            self._settle(instance, now)
+            if instance.placement_group == name and instance.state != "terminated":
+                raise _client_error(
+                    "InvalidPlacementGroup.InUse",
+                    f"The placement group '{name}' is in use.",
+                    "DeletePlacementGroup",
+                )
+        groups.discard(name)
+        return True
+
+    def _get_instances(self, region: str, instance_ids: List[str], action: str) -> List[_Instance]:
+        instances = self._instances.get(region, {})
+        unknown = [instance_id for instance_id in instance_ids if instance_id not in instances]
+        if unknown:
+            raise _client_error(
+                "InvalidInstanceID.NotFound",
+                f"The instance IDs '{', '.join(unknown)}' do not exist",
+                action,
+            )
+        return [instances[instance_id] for instance_id in instance_ids]
+
+    def _settle(self, instance: _Instance, now: float) -> None:
+        """Finish the instance's current transition if its time has come."""
+        if now < instance.settles_at:
+            return
+        if instance.state == "pending":
+            if instance.boot_fails:
+                instance.state = "terminated"
+            else:
+                instance.state = "running"
+                number = int(instance.instance_id[2:], 16)
+                instance.public_ip = f"198.18.{number // 256 % 256}.{number % 256}"
+        elif instance.state == "stopping":
+            instance.state = "stopped"
+        elif instance.state == "shutting-down":
+            instance.state = "terminated"
+
+    def _boot_time(self) -> float:
+        if self.boot_distribution == "constant":
+            return self.boot_seconds
+        if self.boot_distribution == "uniform":
+            spread = self.boot_seconds * self.boot_spread
+            return self._random.uniform(self.boot_seconds - spread, self.boot_seconds + spread)
+        return self.boot_seconds * self._random.lognormvariate(0, self.boot_spread)
+
+
+def _client_error(code: str, message: str, action: str) -> ClientError:
+    return ClientError({"Error": {"Code": code, "Message": message}}, action)
@@ -0,0 +1,138 @@
+import asyncio
+import uuid
+from datetime import datetime, timezone
+from typing import Callable, Dict, Optional
+
+from sqlalchemy import DateTime, column, or_, update, values
+from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.backend.core import metrics
+from src.backend.core.config import settings
+from src.backend.core.database import AsyncSessionLocal
+from src.backend.models.api_key import APIKey
+
+
+class APIKeyUsageTracker:
+    """
+    Write-behind tracker for `api_keys.last_used_at`.
+
+    `record` only touches an in-memory map, keeping only the latest use per
+    key. A background task flushes the map as a single
+    `UPDATE ... FROM (VALUES ...)` every `flush_interval` seconds, or sooner
+    once `max_pending` distinct keys are waiting. Call `stop` on shutdown to
+    flush what is left.
+    """
+
+    def __init__(
+        self,
+        session_factory: Callable[[], AsyncSession],
+        flush_interval: float,
+        max_pending: int,
+    ):
+        self.session_factory = session_factory
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self._pending: Dict[uuid.UUID, datetime] = {}
+        self._flush_requested = asyncio.Event()
+        self._flush_lock = asyncio.Lock()
+        self._task: Optional[asyncio.Task] = None
+
+        self.recorded = 0
+        self.flushes = 0
+        self.rows_flushed = 0
+        self.failed_flushes = 0
+
+    def record(self, api_key_id: uuid.UUID, used_at: Optional[datetime] = None) -> None:
+        used_at = used_at or datetime.now(timezone.utc)
+        previous = self._pending.get(api_key_id)
+        if previous is None or used_at > previous:
+            self._pending[api_key_id] = used_at
+        self.recorded += 1
+        if len(self._pending) >= self.max_pending:
+            self._flush_requested.set()
+
+    async def flush(self) -> int:
+        """Write all pending usage in one statement and return the row count."""
+        async with self._flush_lock:
+            if not self._pending:
+                return 0
+            batch, self._pending = self._pending, {}
+
+            try:
+                async with self.session_factory() as db:
+                    await db.execute(build_last_used_update(batch))
+                    await db.commit()
+            except Exception as e:
+                print(f"Error flushing API key usage: {e}")
+                self.failed_flushes += 1
+                # Put the batch back without clobbering newer uses.
+                for api_key_id, used_at in batch.items():
+                    current = self._pending.get(api_key_id)
+                    if current is None or used_at > current:
+                        self._pending[api_key_id] = used_at
+                return 0
+
+            self.flushes += 1
+            self.rows_flushed += len(batch)
+            return len(batch)
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await asyncio.wait_for(self._flush_requested.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._flush_requested.clear()
+            await self.flush()
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush()
+
+    def stats(self) -> dict:
+        return {
+            "pending": len(self._pending),
+            "recorded": self.recorded,
+            "flushes": self.flushes,
+            "rows_flushed": self.rows_flushed,
+            "failed_flushes": self.failed_flushes,
+        }
+
+
+def build_last_used_update(batch: Dict[uuid.UUID, datetime]):
+    """
+    Build `UPDATE api_keys SET last_used_at = usage.last_used_at
+    FROM (VALUES ...) AS usage WHERE ...` for a batch of key uses. Rows are
+    only moved forward, so an older batch can never overwrite a newer one.
+    """
+    usage = values(
+        column("id", UUID(as_uuid=True)),
+        column("last_used_at", DateTime(timezone=True)),
+        name="usage",
+    ).data(list(batch.items()))
+    return (
+        update(APIKey)
+        .where(APIKey.id == usage.c.id)
+        .where(or_(APIKey.last_used_at.is_(None), APIKey.last_used_at < usage.c.last_used_at))
+        .values(last_used_at=usage.c.last_used_at)
+        .execution_options(synchronize_session=False)
+    )
+
+
+api_key_usage_tracker = APIKeyUsageTracker(
+    session_factory=AsyncSessionLocal,
+    flush_interval=settings.API_KEY_USAGE_FLUSH_INTERVAL_SECONDS,
+    max_pending=settings.API_KEY_USAGE_FLUSH_MAX_KEYS,
+)
+metrics.register("api_key_usage", api_key_usage_tracker.stats)
@@ -1,30 +1,27 @@
-import bcrypt
 from datetime import datetime, timezone
 from typing import List
 from fastapi import Depends, HTTPException, status
 from fastapi.security import APIKeyHeader
+from sqlalchemy import update
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from src.backend.core.database import get_db
+from src.backend.core.api_key_usage import api_key_usage_tracker
+from src.backend.core.auth_cache import key_revocations, verified_key_cache
+from src.backend.core.database import AsyncSessionLocal, get_read_db, replica_router
+from src.backend.core.security import (
+    api_key_hash_needs_upgrade,
+    hash_api_key_secret,
+    verify_api_key_secret_async,
+)
 from src.backend.crud.api_key import api_key as api_key_crud
+from src.backend.models.api_key import APIKey
 from src.backend.models.user import User
 
 api_key_scheme = APIKeyHeader(name="Authorization")
 
-class RoleChecker:
-    def __init__(self, allowed_roles: List[str]):
-        self.allowed_roles = allowed_roles
-
-    def __call__(self, current_user: User = Depends(get_current_user)) -> User:
-        if current_user.role not in self.allowed_roles:
-            raise HTTPException(
-                status_code=status.HTTP_403_FORBIDDEN,
-                detail="The user does not have enough privileges",
-            )
-        return current_user
 
 async def get_current_user(
-    api_key: str = Depends(api_key_scheme), db: AsyncSession = Depends(get_db)
+    api_key: str = Depends(api_key_scheme), db: AsyncSession = Depends(get_read_db)
 ) -> User:
     if not api_key.startswith("Bearer "):
         raise HTTPException(
@@ -34,6 +31,25 @@ async def get_current_user(
         )
 
     token = api_key.split(" ")[1]
+    invalid_api_key = HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid API key"
+    )
+
+    # Keys that were verified recently skip both the lookup and the hash check,
+    # unless another process has revoked them since.
+    cache_key = verified_key_cache.digest(token)
+    cached = verified_key_cache.get(cache_key)
+    if cached is not None:
+        if await key_revocations.is_revoked(cached.api_key_id):
+            verified_key_cache.invalidate_key(cached.api_key_id)
+            raise invalid_api_key
+        user = await db.get(User, cached.user_id)
+        if user is None:
+            verified_key_cache.invalidate_key(cached.api_key_id)
+            raise invalid_api_key
+        api_key_usage_tracker.record(cached.api_key_id)
+        return user
+
     try:
         prefix, secret = token.split(".")
     except ValueError:
@@ -42,20 +58,60 @@ async def get_current_user(
             detail="Invalid API key format",
         )
 
+    if verified_key_cache.is_unknown_prefix(prefix):
+        raise invalid_api_key
+
     db_api_key = await api_key_crud.get_by_prefix(db, prefix=prefix)
+    if db_api_key is None and db.bind is not replica_router.primary:
+        # A key created moments ago may not have reached the replica yet.
+        async with AsyncSessionLocal() as primary:
+            db_api_key = await api_key_crud.get_by_prefix(primary, prefix=prefix)
     if db_api_key is None:
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid API key"
-        )
+        # Repeats of a bogus key would otherwise all reach the primary.
+        verified_key_cache.mark_unknown_prefix(prefix)
+        raise invalid_api_key
 
-    if not bcrypt.checkpw(secret.encode("utf-8"), db_api_key.key_hash.encode("utf-8")):
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid API key"
-        )
+    if not await verify_api_key_secret_async(secret, db_api_key.key_hash):
+        raise invalid_api_key
+    # A replica may not have seen the deletion of a key revoked moments ago.
+    if await key_revocations.is_revoked(db_api_key.id):
+        raise invalid_api_key
 
     if db_api_key.expires_at and db_api_key.expires_at < datetime.now(timezone.utc):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED, detail="API key has expired"
         )
 
+    # Legacy bcrypt hashes are migrated to the current HMAC scheme on first
+    # successful use. The lookup may have come from a read replica, so the
+    # new hash is written on the primary.
+    if api_key_hash_needs_upgrade(db_api_key.key_hash):
+        async with AsyncSessionLocal() as primary:
+            await primary.execute(
+                update(APIKey)
+                .where(APIKey.id == db_api_key.id)
+                .values(key_hash=hash_api_key_secret(secret))
+            )
+            await primary.commit()
+
+    api_key_usage_tracker.record(db_api_key.id)
+    verified_key_cache.put(
+        cache_key,
+        api_key_id=db_api_key.id,
+        user_id=db_api_key.user_id,
+        key_expires_at=db_api_key.expires_at,
+    )
     return db_api_key.user
+
+
+class RoleChecker:
+    def __init__(self, allowed_roles: List[str]):
+        self.allowed_roles = allowed_roles
+
+    def __call__(self, current_user: User = Depends(get_current_user)) -> User:
+        if current_user.role not in self.allowed_roles:
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN,
+                detail="The user does not have enough privileges",
+            )
+        return current_user
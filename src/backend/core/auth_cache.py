@@ -0,0 +1,250 @@
+import hashlib
+import hmac
+import secrets
+import threading
+import time
+import uuid
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Dict, Optional
+
+import redis.asyncio as redis
+
+from src.backend.core import metrics
+from src.backend.core.config import settings
+
+
+@dataclass
+class CachedPrincipal:
+    api_key_id: uuid.UUID
+    user_id: uuid.UUID
+    key_expires_at: Optional[datetime]
+    deadline: float
+
+
+class VerifiedKeyCache:
+    """
+    A bounded LRU cache of API keys that have already passed verification.
+
+    Entries are keyed by a keyed digest of the presented token, so the raw
+    secret is never held in memory. An entry is dropped when its TTL elapses,
+    when the API key reaches `expires_at`, or when the key is revoked through
+    `invalidate_key`. Other API processes learn of revocations through
+    `KeyRevocations`, which callers check on every hit. Only ids are cached;
+    the user is loaded on every request, so role changes apply at once.
+
+    Key prefixes that even the primary does not know are remembered for
+    `negative_ttl_seconds`, so repeated requests with a bogus key are turned
+    away without reaching the database. Prefixes are generated with their
+    key, so one that was unknown cannot become valid later.
+    """
+
+    def __init__(self, max_entries: int, ttl_seconds: float, negative_ttl_seconds: float = 0.0):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.negative_ttl_seconds = negative_ttl_seconds
+        self._digest_key = secrets.token_bytes(32)
+        self._entries: "OrderedDict[bytes, CachedPrincipal]" = OrderedDict()
+        self._digests_by_key_id: Dict[uuid.UUID, set] = {}
+        self._unknown_prefixes: "OrderedDict[str, float]" = OrderedDict()
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+        self.negative_hits = 0
+
+    def digest(self, token: str) -> bytes:
+        return hmac.new(self._digest_key, token.encode("utf-8"), hashlib.sha256).digest()
+
+    def get(self, digest: bytes) -> Optional[CachedPrincipal]:
+        with self._lock:
+            entry = self._entries.get(digest)
+            if entry is None:
+                self.misses += 1
+                return None
+
+            if time.monotonic() >= entry.deadline or (
+                entry.key_expires_at and entry.key_expires_at <= datetime.now(timezone.utc)
+            ):
+                self._remove(digest)
+                self.expirations += 1
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(digest)
+            self.hits += 1
+            return entry
+
+    def put(
+        self,
+        digest: bytes,
+        *,
+        api_key_id: uuid.UUID,
+        user_id: uuid.UUID,
+        key_expires_at: Optional[datetime],
+    ) -> None:
+        if self.max_entries <= 0:
+            return
+
+        entry = CachedPrincipal(
+            api_key_id=api_key_id,
+            user_id=user_id,
+            key_expires_at=key_expires_at,
+            deadline=time.monotonic() + self.ttl_seconds,
+        )
+        with self._lock:
+            if digest in self._entries:
+                self._remove(digest)
+            self._entries[digest] = entry
+            self._digests_by_key_id.setdefault(api_key_id, set()).add(digest)
+
+            while len(self._entries) > self.max_entries:
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+                self.evictions += 1
+
+    def is_unknown_prefix(self, prefix: str) -> bool:
+        with self._lock:
+            deadline = self._unknown_prefixes.get(prefix)
+            if deadline is None or deadline <= time.monotonic():
+                return False
+            self.negative_hits += 1
+            return True
+
+    def mark_unknown_prefix(self, prefix: str) -> None:
+        """Remember a key prefix that the primary database does not know."""
+        if self.max_entries <= 0 or self.negative_ttl_seconds <= 0:
+            return
+        now = time.monotonic()
+        with self._lock:
+            self._unknown_prefixes[prefix] = now + self.negative_ttl_seconds
+            self._unknown_prefixes.move_to_end(prefix)
+            # Deadlines are in insertion order, so expired prefixes are at the front.
+            while self._unknown_prefixes:
+                oldest, deadline = next(iter(self._unknown_prefixes.items()))
+                if deadline > now and len(self._unknown_prefixes) <= self.max_entries:
+                    break
+                del self._unknown_prefixes[oldest]
+
+    def invalidate_key(self, api_key_id: uuid.UUID) -> None:
+        """Drop every cached entry for an API key, e.g. when it is revoked."""
+        with self._lock:
+            for digest in list(self._digests_by_key_id.get(api_key_id, ())):
+                self._remove(digest)
+                self.invalidations += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._digests_by_key_id.clear()
+            self._unknown_prefixes.clear()
+
+    def stats(self) -> dict:
+        return {
+            "size": len(self._entries),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "invalidations": self.invalidations,
+            "unknown_prefixes": len(self._unknown_prefixes),
+            "negative_hits": self.negative_hits,
+        }
+
+    def _remove(self, digest: bytes) -> None:
+        entry = self._entries.pop(digest, None)
+        if entry is None:
+            return
+        digests = self._digests_by_key_id.get(entry.api_key_id)
+        if digests is not None:
+            digests.discard(digest)
+            if not digests:
+                del self._digests_by_key_id[entry.api_key_id]
+
+
+verified_key_cache = VerifiedKeyCache(
+    max_entries=settings.AUTH_CACHE_MAX_ENTRIES,
+    ttl_seconds=settings.AUTH_CACHE_TTL_SECONDS,
+    negative_ttl_seconds=settings.AUTH_CACHE_NEGATIVE_TTL_SECONDS,
+)
+metrics.register("auth_cache", verified_key_cache.stats)
+
+
+class KeyRevocations(ABC):
+    """
+    API keys revoked within the last `ttl_seconds`, shared by every API
+    process. A revoked key may still sit in another process's verified key
+    cache for up to the cache TTL, so revocations are kept at least that
+    long and checked on every cache hit.
+    """
+
+    def __init__(self, ttl_seconds: float):
+        self.ttl_seconds = ttl_seconds
+
+    @abstractmethod
+    async def revoke(self, api_key_id: uuid.UUID) -> None:
+        """Record that an API key was revoked."""
+
+    @abstractmethod
+    async def is_revoked(self, api_key_id: uuid.UUID) -> bool:
+        """Whether an API key was revoked within the last `ttl_seconds`."""
+
+    async def close(self) -> None:
+        """Release any connections held by the backend."""
+
+
+class InMemoryKeyRevocations(KeyRevocations):
+    """Revocations held in this process, for tests and single-process deployments."""
+
+    def __init__(self, ttl_seconds: float):
+        super().__init__(ttl_seconds)
+        self._deadlines: Dict[uuid.UUID, float] = {}
+        self._lock = threading.Lock()
+
+    async def revoke(self, api_key_id: uuid.UUID) -> None:
+        now = time.monotonic()
+        with self._lock:
+            self._deadlines[api_key_id] = now + self.ttl_seconds
+            for expired in [k for k, deadline in self._deadlines.items() if deadline <= now]:
+                del self._deadlines[expired]
+
+    async def is_revoked(self, api_key_id: uuid.UUID) -> bool:
+        with self._lock:
+            deadline = self._deadlines.get(api_key_id)
+        return deadline is not None and deadline > time.monotonic()
+
+
+class RedisKeyRevocations(KeyRevocations):
+    """Revocations as `auth:revoked:{api_key_id}` keys in Redis that expire on their own."""
+
+    def __init__(self, redis_url: str, ttl_seconds: float):
+        super().__init__(ttl_seconds)
+        self._redis = redis.from_url(redis_url)
+
+    async def revoke(self, api_key_id: uuid.UUID) -> None:
+        await self._redis.set(f"auth:revoked:{api_key_id}", 1, px=int(self.ttl_seconds * 1000))
+
+    async def is_revoked(self, api_key_id: uuid.UUID) -> bool:
+        return bool(await self._redis.exists(f"auth:revoked:{api_key_id}"))
+
+    async def close(self) -> None:
+        await self._redis.aclose()
+
+
+def create_key_revocations() -> KeyRevocations:
+    # Entries cached just before a revocation live for one more cache TTL.
+    ttl_seconds = max(settings.AUTH_CACHE_TTL_SECONDS, 1.0)
+    if settings.AUTH_REVOCATION_BACKEND == "memory":
+        return InMemoryKeyRevocations(ttl_seconds)
+    if settings.AUTH_REVOCATION_BACKEND == "redis":
+        return RedisKeyRevocations(settings.REDIS_URL, ttl_seconds)
+    raise ValueError(f"Unknown API key revocation backend: {settings.AUTH_REVOCATION_BACKEND!r}")
+
+
+key_revocations = create_key_revocations()
@@ -1,6 +1,17 @@
-from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
-from sqlalchemy.orm import declarative_base
+import hashlib
+import itertools
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional
 
+from fastapi import Request
+from sqlalchemy import event
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.orm import Session, declarative_base
+
+from src.backend.core import metrics
 from src.backend.core.config import settings
 
 # The base class for all our ORM models.
@@ -10,17 +21,224 @@ Base = declarative_base()
 # The `echo=True` flag is useful for debugging as it logs all generated SQL.
 async_engine = create_async_engine(settings.DATABASE_URL, echo=True)
 
+# Read-only sessions run in autocommit mode: every SELECT is its own
+# transaction, so there is no BEGIN, COMMIT or ROLLBACK round trip.
+read_replica_engines = [
+    create_async_engine(url, isolation_level="AUTOCOMMIT")
+    for url in settings.DATABASE_REPLICA_URLS
+]
+primary_read_engine = async_engine.execution_options(isolation_level="AUTOCOMMIT")
+
+
+class PrimarySession(Session):
+    """Session class of `get_db`, which notes whether the session wrote anything."""
+
+
+@event.listens_for(PrimarySession, "after_flush")
+def _flushed(session, flush_context):
+    session.info["wrote"] = True
+
+
+@event.listens_for(PrimarySession, "do_orm_execute")
+def _executed(orm_execute_state):
+    if orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete:
+        orm_execute_state.session.info["wrote"] = True
+
+
 # Create a configured "AsyncSession" class.
 AsyncSessionLocal = async_sessionmaker(
     bind=async_engine,
     autocommit=False,
     autoflush=False,
     expire_on_commit=False,
+    sync_session_class=PrimarySession,
+)
+
+ReadSessionLocal = async_sessionmaker(
+    autoflush=False,
+    expire_on_commit=False,
+)
+
+
+class ReplicaRouter:
+    """
+    Picks the engines read-only sessions try, in order: the replicas in
+    round-robin order, minus those that failed to connect within the last
+    `retry_after` seconds, then the primary as the last resort.
+    """
+
+    def __init__(self, primary: AsyncEngine, replicas: List[AsyncEngine], retry_after: float):
+        self.primary = primary
+        self.replicas = replicas
+        self.retry_after = retry_after
+        self._next = itertools.count()
+        self._down_until: Dict[int, float] = {}
+        self._lock = threading.Lock()
+
+        self.replica_reads = 0
+        self.primary_reads = 0
+        self.failovers = 0
+
+    def candidates(self) -> List[AsyncEngine]:
+        if not self.replicas:
+            return [self.primary]
+        start = next(self._next)
+        now = time.monotonic()
+        with self._lock:
+            healthy = [
+                self.replicas[(start + offset) % len(self.replicas)]
+                for offset in range(len(self.replicas))
+                if self._down_until.get((start + offset) % len(self.replicas), 0.0) <= now
+            ]
+        return healthy + [self.primary]
+
+    def mark_down(self, engine: AsyncEngine) -> None:
+        with self._lock:
+            self.failovers += 1
+            for index, replica in enumerate(self.replicas):
+                if replica is engine:
+                    self._down_until[index] = time.monotonic() + self.retry_after
+
+    def record_read(self, engine: AsyncEngine) -> None:
+        if engine is self.primary:
+            self.primary_reads += 1
+        else:
+            self.replica_reads += 1
+
+    def stats(self) -> dict:
+        now = time.monotonic()
+        with self._lock:
+            down = sum(1 for until in self._down_until.values() if until > now)
+        return {
+            "replicas": len(self.replicas),
+            "replicas_down": down,
+            "replica_reads": self.replica_reads,
+            "primary_reads": self.primary_reads,
+            "failovers": self.failovers,
+        }
+
+
+class RecentWrites:
+    """
+    Callers that wrote within the last `ttl_seconds`, keyed by a digest of
+    their credentials, so their reads can go to the primary. The marks are
+    per process: behind a load balancer without sticky sessions, clients
+    that must see their own writes send `X-Read-Consistency: primary`.
+    """
+
+    def __init__(self, ttl_seconds: float, max_entries: int = 100000):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._deadlines: "OrderedDict[bytes, float]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(credentials: str) -> bytes:
+        return hashlib.sha256(credentials.encode("utf-8")).digest()
+
+    def mark(self, key: bytes) -> None:
+        now = time.monotonic()
+        with self._lock:
+            self._deadlines[key] = now + self.ttl_seconds
+            self._deadlines.move_to_end(key)
+            # Deadlines are in insertion order, so expired marks are at the front.
+            while self._deadlines:
+                oldest, deadline = next(iter(self._deadlines.items()))
+                if deadline > now and len(self._deadlines) <= self.max_entries:
+                    break
+                del self._deadlines[oldest]
+
+    def is_recent(self, key: bytes) -> bool:
+        with self._lock:
+            deadline = self._deadlines.get(key)
+        return deadline is not None and deadline > time.monotonic()
+
+
+replica_router = ReplicaRouter(
+    primary_read_engine, read_replica_engines, settings.DATABASE_REPLICA_RETRY_SECONDS
 )
+recent_writes = RecentWrites(settings.READ_YOUR_WRITES_SECONDS)
+metrics.register("database", replica_router.stats)
+
+
+def _caller_key(request: Request) -> Optional[bytes]:
+    credentials = request.headers.get("Authorization")
+    return RecentWrites.key(credentials) if credentials else None
 
 
-async def get_db():
-    """FastAPI dependency to get a DB session for a single request."""
+def reads_from_primary(request: Request) -> bool:
+    """Whether the request must read its caller's latest writes."""
+    if request.headers.get("X-Read-Consistency", "").lower() == "primary":
+        return True
+    key = _caller_key(request)
+    return key is not None and recent_writes.is_recent(key)
+
+
+async def get_db(request: Request):
+    """
+    FastAPI dependency to get a DB session on the primary for a single
+    request. Callers that write read from the primary for a while afterwards.
+    Sessions of callers that must read their own writes are flagged with
+    `read_your_writes`, which keeps their reads out of the single-flight layer.
+    """
     async with AsyncSessionLocal() as session:
+        session.info["read_your_writes"] = reads_from_primary(request)
+        yield session
+        await session.commit()
+        if session.sync_session.info.get("wrote"):
+            key = _caller_key(request)
+            if key is not None:
+                recent_writes.mark(key)
+
+
+async def open_read_session(request: Request, **execution_options) -> AsyncSession:
+    """
+    Open a read-only session for `request` on the first replica that can be
+    reached, or the primary. `execution_options` apply to its connection,
+    e.g. an `isolation_level` that opens a transaction instead of the
+    default autocommit. The caller must close the session.
+    """
+    read_your_writes = reads_from_primary(request)
+    if read_your_writes:
+        engines = [replica_router.primary]
+    else:
+        engines = replica_router.candidates()
+
+    for engine in engines:
+        session = ReadSessionLocal(bind=engine)
+        session.info["read_your_writes"] = read_your_writes
+        try:
+            # Check out a connection now, so a replica that cannot be reached
+            # fails over before the session is used.
+            await session.connection(execution_options=execution_options or None)
+        except (DBAPIError, OSError):
+            await session.close()
+            if engine is engines[-1]:
+                raise
+            replica_router.mark_down(engine)
+            continue
+        replica_router.record_read(engine)
+        return session
+
+
+def record_read_failure(session: AsyncSession, error: DBAPIError) -> None:
+    """Skip the session's replica for a while if it dropped its connections."""
+    if error.connection_invalidated and session.bind is not replica_router.primary:
+        replica_router.mark_down(session.bind)
+
+
+async def get_read_db(request: Request):
+    """
+    FastAPI dependency to get a read-only DB session for a single request,
+    on a replica when one is healthy. Nothing is committed: changes made
+    through the session are discarded.
+    """
+    session = await open_read_session(request)
+    try:
         yield session
-        await session.commit()
\ No newline at end of file
+    except DBAPIError as e:
+        # Otherwise the next requests would hit the same replica again.
+        record_read_failure(session, e)
+        raise
+    finally:
+        await session.close()
@@ -0,0 +1,61 @@
+import csv
+import enum
+import io
+import json
+import uuid
+from datetime import datetime
+from typing import AsyncIterator, Iterable, List, Sequence
+
+
+class ExportFormat(str, enum.Enum):
+    NDJSON = "ndjson"
+    CSV = "csv"
+
+
+MEDIA_TYPES = {
+    ExportFormat.NDJSON: "application/x-ndjson",
+    ExportFormat.CSV: "text/csv",
+}
+
+
+def _text(value):
+    if isinstance(value, enum.Enum):
+        return value.value
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, uuid.UUID):
+        return str(value)
+    return value
+
+
+def ndjson_chunk(columns: Sequence[str], rows: Iterable[Sequence]) -> bytes:
+    """One JSON object per row, each on its own line."""
+    return "".join(
+        json.dumps(dict(zip(columns, map(_text, row))), separators=(",", ":")) + "\n"
+        for row in rows
+    ).encode("utf-8")
+
+
+def csv_chunk(columns: Sequence[str], rows: Iterable[Sequence], header: bool = False) -> bytes:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    if header:
+        writer.writerow(columns)
+    writer.writerows([["" if value is None else _text(value) for value in row] for row in rows])
+    return buffer.getvalue().encode("utf-8")
+
+
+async def encode_rows(
+    export_format: ExportFormat, columns: Sequence[str], partitions: AsyncIterator[List[Sequence]]
+) -> AsyncIterator[bytes]:
+    """
+    Encode partitions of rows as they arrive, one chunk per partition, so
+    only a single partition is ever held in memory.
+    """
+    if export_format == ExportFormat.CSV:
+        yield csv_chunk(columns, [], header=True)
+        async for rows in partitions:
+            yield csv_chunk(columns, rows)
+    else:
+        async for rows in partitions:
+            yield ndjson_chunk(columns, rows)
@@ -0,0 +1,252 @@
+import threading
+import time
+import uuid
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+import orjson
+import redis.asyncio as redis
+
+from src.backend.core import metrics
+from src.backend.core.config import settings
+
+
+class GPUCacheBackend(ABC):
+    """
+    The tier of the GPU cache shared by every API and worker process.
+
+    Each GPU has a version that every invalidation bumps. A reader takes the
+    version before it reads the database and stores what it read under that
+    version; the store is refused if the GPU was invalidated in between, so a
+    slow reader can never put back a row older than the latest write.
+    """
+
+    @abstractmethod
+    async def get(self, gpu_id: str) -> Optional[bytes]:
+        """Return the cached GPU, encoded as JSON, if any."""
+
+    @abstractmethod
+    async def version(self, gpu_id: str) -> int:
+        """Return the GPU's current version."""
+
+    @abstractmethod
+    async def put(self, gpu_id: str, payload: bytes, version: int, ttl: float) -> bool:
+        """Cache `payload` if the GPU is still at `version`."""
+
+    @abstractmethod
+    async def invalidate_many(self, gpu_ids: Iterable[str]) -> None:
+        """Drop the cached GPUs and bump their versions."""
+
+    async def close(self) -> None:
+        """Release any connections held by the backend."""
+
+
+class InMemoryGPUCacheBackend(GPUCacheBackend):
+    """
+    A shared tier local to this process, for tests and single-process
+    deployments. Versions are kept for every GPU ever invalidated.
+    """
+
+    def __init__(self):
+        self._entries: Dict[str, Tuple[float, bytes]] = {}
+        self._versions: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    async def get(self, gpu_id: str) -> Optional[bytes]:
+        with self._lock:
+            entry = self._entries.get(gpu_id)
+            if entry is None or entry[0] <= time.monotonic():
+                return None
+            return entry[1]
+
+    async def version(self, gpu_id: str) -> int:
+        with self._lock:
+            return self._versions.get(gpu_id, 0)
+
+    async def put(self, gpu_id: str, payload: bytes, version: int, ttl: float) -> bool:
+        with self._lock:
+            if self._versions.get(gpu_id, 0) != version:
+                return False
+            self._entries[gpu_id] = (time.monotonic() + ttl, payload)
+            return True
+
+    async def invalidate_many(self, gpu_ids: Iterable[str]) -> None:
+        with self._lock:
+            for gpu_id in gpu_ids:
+                self._versions[gpu_id] = self._versions.get(gpu_id, 0) + 1
+                self._entries.pop(gpu_id, None)
+
+
+# KEYS: entry, version. ARGV: payload, version, ttl in milliseconds.
+_PUT_SCRIPT = """
+if (redis.call('GET', KEYS[2]) or '0') ~= ARGV[2] then
+    return 0
+end
+redis.call('SET', KEYS[1], ARGV[1], 'PX', ARGV[3])
+return 1
+"""
+
+
+class RedisGPUCacheBackend(GPUCacheBackend):
+    """
+    A shared tier in Redis: the entry at `gpu:{id}` and its version counter
+    at `gpu:{id}:version`. Counters expire after `version_ttl` seconds
+    without an invalidation, which must be far longer than any read takes.
+    """
+
+    def __init__(self, redis_url: str, version_ttl: float = 86400):
+        self._redis = redis.from_url(redis_url)
+        self._put = self._redis.register_script(_PUT_SCRIPT)
+        self.version_ttl = int(version_ttl)
+
+    async def get(self, gpu_id: str) -> Optional[bytes]:
+        return await self._redis.get(f"gpu:{gpu_id}")
+
+    async def version(self, gpu_id: str) -> int:
+        return int(await self._redis.get(f"gpu:{gpu_id}:version") or 0)
+
+    async def put(self, gpu_id: str, payload: bytes, version: int, ttl: float) -> bool:
+        stored = await self._put(
+            keys=[f"gpu:{gpu_id}", f"gpu:{gpu_id}:version"],
+            args=[payload, version, int(ttl * 1000)],
+        )
+        return bool(stored)
+
+    async def invalidate_many(self, gpu_ids: Iterable[str]) -> None:
+        gpu_ids = list(gpu_ids)
+        if not gpu_ids:
+            return
+        async with self._redis.pipeline(transaction=True) as pipe:
+            for gpu_id in gpu_ids:
+                pipe.incr(f"gpu:{gpu_id}:version")
+                pipe.expire(f"gpu:{gpu_id}:version", self.version_ttl)
+                pipe.delete(f"gpu:{gpu_id}")
+            await pipe.execute()
+
+    async def close(self) -> None:
+        await self._redis.aclose()
+
+
+class GPUCache:
+    """
+    A read-through cache of `GET /gpu/{gpu_id}` in two tiers: a small LRU in
+    this process in front of the shared `backend`.
+
+    Entries are the GPU's columns as JSON-compatible dicts; they hold the
+    GPU's organization, so callers check ownership on hits as on misses.
+    Invalidation drops both tiers here and the shared tier everywhere, but
+    other processes keep their local copy for up to `local_ttl` seconds.
+    """
+
+    def __init__(
+        self,
+        backend: GPUCacheBackend,
+        *,
+        ttl_seconds: float,
+        local_ttl_seconds: float,
+        local_max_entries: int,
+    ):
+        self.backend = backend
+        self.ttl_seconds = ttl_seconds
+        self.local_ttl_seconds = local_ttl_seconds
+        self.local_max_entries = local_max_entries
+        self._local: "OrderedDict[str, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+        self.local_hits = 0
+        self.shared_hits = 0
+        self.misses = 0
+        self.stale_fills = 0
+        self.invalidations = 0
+
+    async def get(self, gpu_id: uuid.UUID) -> Optional[Dict[str, Any]]:
+        key = str(gpu_id)
+        with self._lock:
+            entry = self._local.get(key)
+            if entry is not None:
+                if entry[0] > time.monotonic():
+                    self._local.move_to_end(key)
+                    self.local_hits += 1
+                    return entry[1]
+                del self._local[key]
+
+        payload = await self.backend.get(key)
+        if payload is None:
+            self.misses += 1
+            return None
+        self.shared_hits += 1
+        gpu = orjson.loads(payload)
+        self._put_local(key, gpu)
+        return gpu
+
+    async def version(self, gpu_id: uuid.UUID) -> int:
+        """The version to `fill` with; take it before reading the database."""
+        return await self.backend.version(str(gpu_id))
+
+    async def fill(self, gpu_id: uuid.UUID, gpu: Dict[str, Any], version: int) -> Dict[str, Any]:
+        """
+        Cache `gpu`, read from the primary after taking `version`, and return
+        it as it will be served from the cache.
+        """
+        key = str(gpu_id)
+        payload = orjson.dumps(gpu, option=orjson.OPT_UTC_Z)
+        gpu = orjson.loads(payload)
+        if await self.backend.put(key, payload, version, self.ttl_seconds):
+            self._put_local(key, gpu)
+        else:
+            self.stale_fills += 1
+        return gpu
+
+    async def invalidate(self, gpu_ids: Iterable[uuid.UUID]) -> None:
+        """Drop GPUs after a change to them has been committed."""
+        keys = [str(gpu_id) for gpu_id in gpu_ids]
+        if not keys:
+            return
+        with self._lock:
+            for key in keys:
+                self._local.pop(key, None)
+        self.invalidations += len(keys)
+        await self.backend.invalidate_many(keys)
+
+    async def close(self) -> None:
+        await self.backend.close()
+
+    def stats(self) -> dict:
+        return {
+            "backend": type(self.backend).__name__,
+            "local_size": len(self._local),
+            "local_hits": self.local_hits,
+            "shared_hits": self.shared_hits,
+            "misses": self.misses,
+            "stale_fills": self.stale_fills,
+            "invalidations": self.invalidations,
+        }
+
+    def _put_local(self, key: str, gpu: Dict[str, Any]) -> None:
+        if self.local_max_entries <= 0:
+            return
+        with self._lock:
+            self._local[key] = (time.monotonic() + self.local_ttl_seconds, gpu)
+            self._local.move_to_end(key)
+            while len(self._local) > self.local_max_entries:
+                self._local.popitem(last=False)
+
+
+def create_gpu_cache() -> GPUCache:
+    if settings.GPU_CACHE_BACKEND == "memory":
+        backend = InMemoryGPUCacheBackend()
+    elif settings.GPU_CACHE_BACKEND == "redis":
+        backend = RedisGPUCacheBackend(settings.REDIS_URL)
+    else:
+        raise ValueError(f"Unknown GPU cache backend: {settings.GPU_CACHE_BACKEND!r}")
+    return GPUCache(
+        backend,
+        ttl_seconds=settings.GPU_CACHE_TTL_SECONDS,
+        local_ttl_seconds=settings.GPU_CACHE_LOCAL_TTL_SECONDS,
+        local_max_entries=settings.GPU_CACHE_LOCAL_MAX_ENTRIES,
+    )
+
+
+gpu_cache = create_gpu_cache()
+metrics.register("gpu_cache", gpu_cache.stats)
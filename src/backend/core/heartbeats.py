@@ -0,0 +1,198 @@
+import asyncio
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Dict, Optional, Tuple
+
+from sqlalchemy import DateTime, String, and_, case, cast, column, func, or_, update, values
+from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.backend.core import metrics
+from src.backend.core.config import settings
+from src.backend.core.database import AsyncSessionLocal
+from src.backend.core.gpu_cache import GPUCache, gpu_cache
+from src.backend.models.gpu import GPU, GpuHealthState
+
+# The latest heartbeat of a GPU: its health and when it was received.
+Heartbeat = Tuple[GpuHealthState, datetime]
+
+
+class HeartbeatBuffer:
+    """
+    Write-behind buffer for the heartbeats of on-instance agents.
+
+    `record` only touches an in-memory map, keeping only the latest
+    heartbeat per GPU. A background task flushes the map as a single
+    `UPDATE ... FROM (VALUES ...)` every `flush_interval` seconds, or sooner
+    once `max_pending` GPUs are waiting. The statement only writes a GPU
+    whose health changed or whose `last_seen` is more than `staleness`
+    seconds behind, so a healthy fleet costs one write per GPU per
+    `staleness` seconds however often its agents beat. GPUs whose health
+    changed are dropped from `cache`. Call `stop` on shutdown to flush what is left.
+    """
+
+    def __init__(
+        self,
+        session_factory: Callable[[], AsyncSession],
+        cache: GPUCache,
+        flush_interval: float,
+        max_pending: int,
+        staleness: float,
+    ):
+        self.session_factory = session_factory
+        self.cache = cache
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self.staleness = staleness
+        self._pending: Dict[uuid.UUID, Heartbeat] = {}
+        self._flush_requested = asyncio.Event()
+        self._flush_lock = asyncio.Lock()
+        self._task: Optional[asyncio.Task] = None
+
+        self.recorded = 0
+        self.flushes = 0
+        self.rows_flushed = 0
+        self.rows_written = 0
+        self.failed_flushes = 0
+        self.failed_invalidations = 0
+
+    def record(
+        self, gpu_id: uuid.UUID, health_state: GpuHealthState, seen_at: Optional[datetime] = None
+    ) -> None:
+        seen_at = seen_at or datetime.now(timezone.utc)
+        previous = self._pending.get(gpu_id)
+        if previous is None or seen_at >= previous[1]:
+            self._pending[gpu_id] = (health_state, seen_at)
+        self.recorded += 1
+        if len(self._pending) >= self.max_pending:
+            self._flush_requested.set()
+
+    async def flush(self) -> int:
+        """Apply all pending heartbeats in one statement and return the rows written."""
+        async with self._flush_lock:
+            if not self._pending:
+                return 0
+            batch, self._pending = self._pending, {}
+
+            try:
+                async with self.session_factory() as db:
+                    result = await db.execute(
+                        build_heartbeat_update(batch, timedelta(seconds=self.staleness))
+                    )
+                    written = result.all()
+                    await db.commit()
+            except Exception as e:
+                print(f"Error flushing heartbeats: {e}")
+                self.failed_flushes += 1
+                # Put the batch back without clobbering newer heartbeats.
+                for gpu_id, heartbeat in batch.items():
+                    current = self._pending.get(gpu_id)
+                    if current is None or heartbeat[1] > current[1]:
+                        self._pending[gpu_id] = heartbeat
+                return 0
+
+            self.flushes += 1
+            self.rows_flushed += len(batch)
+            self.rows_written += len(written)
+        # Cached GPUs hold their health but not last_seen. If the cache is
+        # unreachable its entries keep the old health until their TTL runs out.
+        try:
+            await self.cache.invalidate([row.id for row in written if row.health_changed])
+        except Exception as e:
+            print(f"Error invalidating cached GPUs after a heartbeat flush: {e}")
+            self.failed_invalidations += 1
+        return len(written)
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await asyncio.wait_for(self._flush_requested.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._flush_requested.clear()
+            try:
+                await self.flush()
+            except Exception as e:
+                print(f"Error in the heartbeat flush loop: {e}")
+                self.failed_flushes += 1
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush()
+
+    def stats(self) -> dict:
+        return {
+            "pending": len(self._pending),
+            "recorded": self.recorded,
+            "flushes": self.flushes,
+            "rows_flushed": self.rows_flushed,
+            "rows_written": self.rows_written,
+            "failed_flushes": self.failed_flushes,
+            "failed_invalidations": self.failed_invalidations,
+        }
+
+
+def build_heartbeat_update(batch: Dict[uuid.UUID, Heartbeat], staleness: timedelta):
+    """
+    Build `UPDATE gpus SET health_state = ..., last_seen = ... FROM
+    (VALUES ...) AS heartbeat WHERE ... RETURNING ...` for a batch of
+    heartbeats. A GPU is only written if the heartbeat is newer than its
+    `last_seen` and either changes its health or is more than `staleness`
+    past it. `updated_at` only moves when the health does, which is how the
+    returned `health_changed` tells the two apart: now() is the time the
+    transaction started, which no earlier write can have set.
+    """
+    heartbeat = values(
+        column("id", UUID(as_uuid=True)),
+        column("health_state", String),
+        column("last_seen", DateTime(timezone=True)),
+        column("stale_before", DateTime(timezone=True)),
+        name="heartbeat",
+    ).data(
+        [
+            (gpu_id, health_state.value, seen_at, seen_at - staleness)
+            for gpu_id, (health_state, seen_at) in batch.items()
+        ]
+    )
+    health_state = cast(heartbeat.c.health_state, GPU.__table__.c.health_state.type)
+    health_changed = GPU.health_state != health_state
+    return (
+        update(GPU)
+        .where(GPU.id == heartbeat.c.id)
+        .where(
+            or_(
+                GPU.last_seen.is_(None),
+                and_(
+                    GPU.last_seen < heartbeat.c.last_seen,
+                    or_(health_changed, GPU.last_seen < heartbeat.c.stale_before),
+                ),
+            )
+        )
+        .values(
+            health_state=health_state,
+            last_seen=heartbeat.c.last_seen,
+            updated_at=case((health_changed, func.now()), else_=GPU.updated_at),
+        )
+        .returning(GPU.id, (GPU.updated_at == func.now()).label("health_changed"))
+        .execution_options(synchronize_session=False)
+    )
+
+
+heartbeat_buffer = HeartbeatBuffer(
+    session_factory=AsyncSessionLocal,
+    cache=gpu_cache,
+    flush_interval=settings.HEARTBEAT_FLUSH_INTERVAL_SECONDS,
+    max_pending=settings.HEARTBEAT_FLUSH_MAX_GPUS,
+    staleness=settings.HEARTBEAT_STALENESS_SECONDS,
+)
+metrics.register("heartbeats", heartbeat_buffer.stats)
@@ -0,0 +1,258 @@
+import asyncio
+import base64
+import hashlib
+import json
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+import redis.asyncio as redis
+from starlette.middleware.base import BaseHTTPMiddleware
+from starlette.requests import Request
+from starlette.responses import JSONResponse, Response
+
+from src.backend.core import metrics
+from src.backend.core.config import settings
+
+IDEMPOTENCY_HEADER = "Idempotency-Key"
+REPLAYED_HEADER = "Idempotent-Replayed"
+
+
+@dataclass
+class StoredResponse:
+    status_code: int
+    headers: List[Tuple[str, str]]
+    body: bytes
+    fingerprint: str
+
+    def to_json(self) -> str:
+        return json.dumps(
+            {
+                "status_code": self.status_code,
+                "headers": self.headers,
+                "body": base64.b64encode(self.body).decode("ascii"),
+                "fingerprint": self.fingerprint,
+            }
+        )
+
+    @classmethod
+    def from_json(cls, raw) -> "StoredResponse":
+        data = json.loads(raw)
+        return cls(
+            status_code=data["status_code"],
+            headers=[tuple(header) for header in data["headers"]],
+            body=base64.b64decode(data["body"]),
+            fingerprint=data["fingerprint"],
+        )
+
+
+class IdempotencyStore(ABC):
+    """
+    Stores the response to a state-changing request under its idempotency
+    key, plus a short-lived lock marking the key as in flight.
+    """
+
+    @abstractmethod
+    async def get(self, key: str) -> Optional[StoredResponse]:
+        """Return the stored response for `key`, if any."""
+
+    @abstractmethod
+    async def acquire(self, key: str, lock_ttl: float) -> bool:
+        """Take the in-flight lock for `key`; False if another request holds it."""
+
+    @abstractmethod
+    async def save(self, key: str, response: StoredResponse, ttl: float) -> None:
+        """Store the response for `key` and release its lock."""
+
+    @abstractmethod
+    async def release(self, key: str) -> None:
+        """Release the lock for `key` without storing a response."""
+
+
+class InMemoryIdempotencyStore(IdempotencyStore):
+    """An LRU store local to this process, bounded to `max_entries` responses."""
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._responses: "OrderedDict[str, Tuple[float, StoredResponse]]" = OrderedDict()
+        self._locks: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    async def get(self, key: str) -> Optional[StoredResponse]:
+        with self._lock:
+            entry = self._responses.get(key)
+            if entry is None:
+                return None
+            expires_at, response = entry
+            if expires_at <= time.monotonic():
+                del self._responses[key]
+                return None
+            self._responses.move_to_end(key)
+            return response
+
+    async def acquire(self, key: str, lock_ttl: float) -> bool:
+        now = time.monotonic()
+        with self._lock:
+            expires_at = self._locks.get(key)
+            if expires_at is not None and expires_at > now:
+                return False
+            self._locks[key] = now + lock_ttl
+            return True
+
+    async def save(self, key: str, response: StoredResponse, ttl: float) -> None:
+        with self._lock:
+            self._responses[key] = (time.monotonic() + ttl, response)
+            self._responses.move_to_end(key)
+            while len(self._responses) > self.max_entries:
+                self._responses.popitem(last=False)
+            self._locks.pop(key, None)
+
+    async def release(self, key: str) -> None:
+        with self._lock:
+            self._locks.pop(key, None)
+
+
+class RedisIdempotencyStore(IdempotencyStore):
+    """A store shared by every API replica through Redis."""
+
+    def __init__(self, redis_url: str):
+        self._redis = redis.from_url(redis_url)
+
+    async def get(self, key: str) -> Optional[StoredResponse]:
+        raw = await self._redis.get(f"{key}:response")
+        return StoredResponse.from_json(raw) if raw is not None else None
+
+    async def acquire(self, key: str, lock_ttl: float) -> bool:
+        return bool(await self._redis.set(f"{key}:lock", 1, nx=True, px=int(lock_ttl * 1000)))
+
+    async def save(self, key: str, response: StoredResponse, ttl: float) -> None:
+        async with self._redis.pipeline(transaction=True) as pipe:
+            pipe.set(f"{key}:response", response.to_json(), px=int(ttl * 1000))
+            pipe.delete(f"{key}:lock")
+            await pipe.execute()
+
+    async def release(self, key: str) -> None:
+        await self._redis.delete(f"{key}:lock")
+
+
+class IdempotencyMiddleware(BaseHTTPMiddleware):
+    """
+    Replays the stored response for POST/DELETE requests that repeat an
+    `Idempotency-Key` already used with the same API key.
+
+    A duplicate that arrives while the original is still running waits for
+    its response instead of executing again. Reusing a key with a different
+    request body is rejected with 422. Server errors and 429s are not
+    stored, so those requests can be retried with the same key.
+    """
+
+    methods = ("POST", "DELETE")
+
+    def __init__(self, app, store: IdempotencyStore):
+        super().__init__(app)
+        self.store = store
+        self.ttl = settings.IDEMPOTENCY_TTL_SECONDS
+        self.lock_ttl = settings.IDEMPOTENCY_LOCK_TTL_SECONDS
+        self.wait_timeout = settings.IDEMPOTENCY_WAIT_SECONDS
+        self.poll_interval = 0.05
+
+        self.executed = 0
+        self.replayed = 0
+        self.waited = 0
+        self.conflicts = 0
+        metrics.register("idempotency", self.stats)
+
+    async def dispatch(self, request: Request, call_next):
+        idempotency_key = request.headers.get(IDEMPOTENCY_HEADER)
+        if request.method not in self.methods or not idempotency_key:
+            return await call_next(request)
+        if len(idempotency_key) > 255:
+            return JSONResponse(
+                status_code=400, content={"detail": "Idempotency-Key must be at most 255 characters."}
+            )
+
+        body = await request.body()
+        fingerprint = hashlib.sha256(body).hexdigest()
+        key = self._key(request, idempotency_key)
+
+        stored = await self.store.get(key)
+        if stored is None and not await self.store.acquire(key, self.lock_ttl):
+            self.waited += 1
+            stored = await self._wait_for_response(key)
+            if stored is None:
+                self.conflicts += 1
+                return JSONResponse(
+                    status_code=409,
+                    content={"detail": "A request with this Idempotency-Key is still in progress."},
+                )
+        if stored is not None:
+            return self._replay(stored, fingerprint)
+
+        try:
+            response = await call_next(request)
+            response_body = b"".join([chunk async for chunk in response.body_iterator])
+        except BaseException:
+            await self.store.release(key)
+            raise
+        self.executed += 1
+
+        headers = [(name, value) for name, value in response.headers.items()]
+        if response.status_code < 500 and response.status_code != 429:
+            await self.store.save(
+                key,
+                StoredResponse(response.status_code, headers, response_body, fingerprint),
+                self.ttl,
+            )
+        else:
+            await self.store.release(key)
+
+        return Response(
+            content=response_body, status_code=response.status_code, headers=dict(headers)
+        )
+
+    @staticmethod
+    def _key(request: Request, idempotency_key: str) -> str:
+        # Scope keys to the presented credential without storing it.
+        credential = request.headers.get("Authorization", "")
+        principal = hashlib.sha256(credential.encode("utf-8")).hexdigest()
+        return f"idempotency:{principal}:{request.method}:{request.url.path}:{idempotency_key}"
+
+    async def _wait_for_response(self, key: str) -> Optional[StoredResponse]:
+        deadline = time.monotonic() + self.wait_timeout
+        while time.monotonic() < deadline:
+            await asyncio.sleep(self.poll_interval)
+            stored = await self.store.get(key)
+            if stored is not None:
+                return stored
+        return None
+
+    def _replay(self, stored: StoredResponse, fingerprint: str) -> Response:
+        if stored.fingerprint != fingerprint:
+            self.conflicts += 1
+            return JSONResponse(
+                status_code=422,
+                content={"detail": "Idempotency-Key was already used with a different request body."},
+            )
+        self.replayed += 1
+        headers = dict(stored.headers)
+        headers[REPLAYED_HEADER] = "true"
+        return Response(content=stored.body, status_code=stored.status_code, headers=headers)
+
+    def stats(self) -> dict:
+        return {
+            "executed": self.executed,
+            "replayed": self.replayed,
+            "waited": self.waited,
+            "conflicts": self.conflicts,
+        }
+
+
+def create_idempotency_store() -> IdempotencyStore:
+    if settings.IDEMPOTENCY_BACKEND == "memory":
+        return InMemoryIdempotencyStore(settings.IDEMPOTENCY_MAX_ENTRIES)
+    if settings.IDEMPOTENCY_BACKEND == "redis":
+        return RedisIdempotencyStore(settings.REDIS_URL)
+    raise ValueError(f"Unknown idempotency backend: {settings.IDEMPOTENCY_BACKEND!r}")
@@ -0,0 +1,209 @@
+import asyncio
+import uuid
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Dict, List, Optional
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.backend.cloud import chunked
+from src.backend.core import metrics
+from src.backend.core.config import settings
+from src.backend.core.database import AsyncSessionLocal
+from src.backend.core.gpu_cache import GPUCache, gpu_cache
+from src.backend.core.quota import QuotaBackend, quota_backend
+from src.backend.core.telemetry import TelemetryStore, telemetry_store
+from src.backend.crud.gpu import IdleGPU, gpu as gpu_crud
+from src.backend.crud.organization import organization as organization_crud
+from src.backend.models.organization import IdleAction
+from src.backend.worker import dispatch_allocations, reclaim_gpus
+
+
+class IdleReclaimer:
+    """
+    Acts on GPUs that the telemetry of this process shows idle for longer
+    than their organization's policy allows, in one pass every `interval`
+    seconds:
+
+    - Flagged GPUs that are busy again are cleared.
+    - Under RECLAIM, GPUs still idle `idle_grace_seconds` after they were
+      flagged are moved to DEPROVISIONING. Those that fill a warm pool below
+      its target in `warm_pool_targets` are put back in it, and their
+      telemetry dropped; the rest are passed to `reclaim` to be terminated.
+    - GPUs idle for `idle_timeout_seconds` are flagged (`idle_since`), which
+      is the organization's notice through the API. Under SHORTEN_LEASE their
+      lease is cut to the grace period, for the lease sweeper to reclaim.
+
+    Each step is one statement per `batch_size` GPUs, and all run in one
+    transaction. The statements check owner, status and flag in the
+    database, so passes of several API processes may overlap safely.
+    """
+
+    def __init__(
+        self,
+        session_factory: Callable[[], AsyncSession],
+        store: TelemetryStore,
+        cache: GPUCache,
+        quota: QuotaBackend,
+        *,
+        interval: float,
+        min_idle_fraction: float,
+        batch_size: int,
+        warm_pool_targets: Optional[Dict[str, Dict[str, int]]],
+        reclaim: Callable[[List[str]], None],
+        dispatch: Callable[[], None],
+    ):
+        self.session_factory = session_factory
+        self.store = store
+        self.cache = cache
+        self.quota = quota
+        self.interval = interval
+        self.min_idle_fraction = min_idle_fraction
+        self.batch_size = batch_size
+        self.warm_pool_targets = warm_pool_targets
+        self.reclaim = reclaim
+        self.dispatch = dispatch
+        self._task: Optional[asyncio.Task] = None
+
+        self.passes = 0
+        self.failed_passes = 0
+        self.flagged = 0
+        self.cleared = 0
+        self.reclaimed = 0
+        self.returned = 0
+
+    async def run_once(self) -> Dict[str, int]:
+        async with self.session_factory() as db:
+            policies = await organization_crud.get_idle_policies(db)
+
+        now = datetime.now(timezone.utc)
+        flag: List[IdleGPU] = []
+        claim: List[IdleGPU] = []
+        active: List[uuid.UUID] = []
+        for policy in policies:
+            idle_ids, active_ids = self.store.idle_gpus(
+                policy.id, policy.idle_timeout_seconds, self.min_idle_fraction
+            )
+            active += active_ids
+            grace = timedelta(seconds=policy.idle_grace_seconds)
+            lease = now + grace if policy.idle_action == IdleAction.SHORTEN_LEASE else None
+            flag += [IdleGPU(gpu_id, policy.id, lease, None) for gpu_id in idle_ids]
+            if policy.idle_action == IdleAction.RECLAIM:
+                claim += [IdleGPU(gpu_id, policy.id, None, now - grace) for gpu_id in idle_ids]
+
+        cleared: List[uuid.UUID] = []
+        claimed: List = []
+        flagged: List[uuid.UUID] = []
+        if active or flag:
+            async with self.session_factory() as db:
+                for batch in chunked(active, self.batch_size):
+                    cleared += await gpu_crud.clear_idle(db, gpu_ids=batch)
+                # Claimed before flagging, so every GPU stays flagged for at
+                # least one pass.
+                for batch in chunked(claim, self.batch_size):
+                    claimed += await gpu_crud.claim_idle(db, batch)
+                for batch in chunked(flag, self.batch_size):
+                    flagged += await gpu_crud.flag_idle(db, batch)
+                returned = await self._return_to_warm_pools(db, claimed, now)
+                await db.commit()
+        else:
+            returned = []
+
+        await self.cache.invalidate([*cleared, *(gpu.id for gpu in claimed), *flagged])
+
+        released = defaultdict(list)
+        for gpu in returned:
+            released[str(gpu.organization_id)].append(str(gpu.id))
+        for organization_id, gpu_ids in released.items():
+            await self.quota.release_many(organization_id, gpu_ids)
+
+        returned_ids = {gpu.id for gpu in returned}
+        # Whoever claims a returned GPU must not inherit its idle history.
+        self.store.forget(returned_ids)
+        terminated = [str(gpu.id) for gpu in claimed if gpu.id not in returned_ids]
+        for batch in chunked(terminated, self.batch_size):
+            self.reclaim(batch)
+        if returned:
+            # Queued requests can use the freed quota, and the warm GPUs.
+            self.dispatch()
+
+        self.passes += 1
+        self.flagged += len(flagged)
+        self.cleared += len(cleared)
+        self.reclaimed += len(terminated)
+        self.returned += len(returned)
+        return {
+            "flagged": len(flagged),
+            "cleared": len(cleared),
+            "reclaimed": len(terminated),
+            "returned": len(returned),
+        }
+
+    async def _return_to_warm_pools(self, db: AsyncSession, claimed: List, now: datetime) -> List:
+        """Put claimed GPUs outside gangs back in warm pools below their target."""
+        if not self.warm_pool_targets or not claimed:
+            return []
+        pool_sizes = await gpu_crud.count_warm_pool(db)
+        returned = []
+        for gpu in claimed:
+            if gpu.gang_id:
+                continue
+            pool = (gpu.gpu_model, gpu.region or settings.AWS_REGION)
+            target = self.warm_pool_targets.get(pool[0], {}).get(pool[1], 0)
+            if pool_sizes.get(pool, 0) < target:
+                pool_sizes[pool] = pool_sizes.get(pool, 0) + 1
+                returned.append(gpu)
+        await gpu_crud.return_to_warm_pool(
+            db,
+            [gpu.id for gpu in returned],
+            lease_expires_at=now + timedelta(seconds=settings.WARM_POOL_MAX_IDLE_SECONDS),
+        )
+        return returned
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await self.run_once()
+            except Exception as e:
+                print(f"Error reclaiming idle GPUs: {e}")
+                self.failed_passes += 1
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    def stats(self) -> dict:
+        return {
+            "passes": self.passes,
+            "failed_passes": self.failed_passes,
+            "flagged": self.flagged,
+            "cleared": self.cleared,
+            "reclaimed": self.reclaimed,
+            "returned": self.returned,
+        }
+
+
+idle_reclaimer = IdleReclaimer(
+    AsyncSessionLocal,
+    telemetry_store,
+    gpu_cache,
+    quota_backend,
+    interval=settings.IDLE_RECLAIM_INTERVAL_SECONDS,
+    min_idle_fraction=settings.IDLE_RECLAIM_MIN_IDLE_FRACTION,
+    batch_size=settings.IDLE_RECLAIM_BATCH_SIZE,
+    warm_pool_targets=settings.WARM_POOL_TARGETS if settings.IDLE_RECLAIM_TO_WARM_POOL else None,
+    reclaim=lambda gpu_ids: reclaim_gpus.delay(gpu_ids),
+    dispatch=lambda: dispatch_allocations.delay(),
+)
+metrics.register("idle_reclaimer", idle_reclaimer.stats)
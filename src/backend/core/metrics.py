@@ -0,0 +1,22 @@
+import inspect
+from typing import Awaitable, Callable, Dict, Union
+
+# Components register a zero-argument callable that returns their current
+# counters, or a coroutine function for counters kept outside the process;
+# `/metrics` renders a snapshot of every registered collector.
+_collectors: Dict[str, Callable[[], Union[dict, Awaitable[dict]]]] = {}
+
+
+def register(name: str, collector: Callable[[], Union[dict, Awaitable[dict]]]) -> None:
+    """Register (or replace) the counter collector for a named component."""
+    _collectors[name] = collector
+
+
+async def snapshot() -> Dict[str, dict]:
+    """Return the current counters of every registered component."""
+    counters = {}
+    for name, collector in _collectors.items():
+        counters[name] = collector()
+        if inspect.isawaitable(counters[name]):
+            counters[name] = await counters[name]
+    return counters
@@ -0,0 +1,63 @@
+import base64
+import json
+import uuid
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Optional, Tuple
+
+from fastapi import HTTPException, Query, Response, status
+
+from src.backend.core.config import settings
+
+# The (created_at, id) of the last row of a page; the next page starts after it.
+PageKey = Tuple[datetime, uuid.UUID]
+
+
+def encode_cursor(key: PageKey) -> str:
+    created_at, row_id = key
+    payload = json.dumps([created_at.isoformat(), str(row_id)], separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> PageKey:
+    """Decode a cursor from `encode_cursor`; raises ValueError if it is malformed."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        created_at, row_id = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        return datetime.fromisoformat(created_at), uuid.UUID(row_id)
+    except (TypeError, ValueError, UnicodeError) as e:
+        raise ValueError(f"Invalid cursor: {cursor!r}") from e
+
+
+@dataclass
+class PageParams:
+    after: Optional[PageKey]
+    limit: int
+    skip: int = 0
+
+
+def page_params(
+    cursor: Optional[str] = Query(
+        None, description="The X-Next-Cursor header of the previous page. Omit for the first page."
+    ),
+    limit: int = Query(
+        settings.PAGE_SIZE_DEFAULT, ge=1, le=settings.PAGE_SIZE_MAX, description="Page size."
+    ),
+    skip: int = Query(
+        0, ge=0, deprecated=True, description="Offset of the first page. Use `cursor` instead."
+    ),
+) -> PageParams:
+    """FastAPI dependency for the paging parameters of a list endpoint."""
+    after = None
+    if cursor:
+        try:
+            after = decode_cursor(cursor)
+        except ValueError:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor.")
+    return PageParams(after=after, limit=limit, skip=0 if cursor else skip)
+
+
+def set_next_cursor(response: Response, next_key: Optional[PageKey]) -> None:
+    """Point the client at the next page, if there is one."""
+    if next_key is not None:
+        response.headers["X-Next-Cursor"] = encode_cursor(next_key)
@@ -0,0 +1,55 @@
+import uuid
+from collections import defaultdict
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional
+
+from src.backend.cloud.base import InstanceState
+from src.backend.models.gpu import GpuStatus
+
+# EC2 states from which an instance will never reach "running".
+FAILED_INSTANCE_STATES = ("shutting-down", "terminated", "stopping", "stopped")
+
+
+@dataclass
+class Transition:
+    gpu_id: uuid.UUID
+    status: GpuStatus
+    instance_public_ip: Optional[str] = None
+
+
+def plan_transitions(
+    gpus: Iterable, instances: Dict[str, InstanceState], now: datetime, timeout: float
+) -> List[Transition]:
+    """
+    Decide which launching GPUs leave PROVISIONING, given their instances.
+
+    The GPUs of a gang become AVAILABLE together, once every one of them is
+    running. A GPU whose instance failed goes to ERROR, taking the rest of an
+    all-or-nothing gang with it; anything still pending after `timeout`
+    seconds goes to ERROR as well.
+    """
+    groups = defaultdict(list)
+    for gpu in gpus:
+        groups[gpu.gang_id or gpu.id].append(gpu)
+
+    transitions = []
+    for members in groups.values():
+        def state_of(gpu):
+            instance = instances.get(gpu.instance_id)
+            return instance.state if instance else "pending"
+
+        failed = [gpu for gpu in members if state_of(gpu) in FAILED_INSTANCE_STATES]
+        timed_out = any((now - gpu.created_at).total_seconds() > timeout for gpu in members)
+        if timed_out or (failed and members[0].all_or_nothing):
+            transitions.extend(Transition(gpu.id, GpuStatus.ERROR) for gpu in members)
+            continue
+
+        transitions.extend(Transition(gpu.id, GpuStatus.ERROR) for gpu in failed)
+        healthy = [gpu for gpu in members if gpu not in failed]
+        if all(state_of(gpu) == "running" for gpu in healthy):
+            transitions.extend(
+                Transition(gpu.id, GpuStatus.AVAILABLE, instances[gpu.instance_id].public_ip)
+                for gpu in healthy
+            )
+    return transitions
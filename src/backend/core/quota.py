@@ -0,0 +1,320 @@
+import threading
+import time
+from abc import ABC, abstractmethod
+from typing import Dict, Iterable, List, Sequence
+
+import redis.asyncio as redis
+
+from src.backend.core import metrics
+from src.backend.core.config import settings
+
+
+class QuotaExceeded(Exception):
+    """The organization has no quota left for the GPUs being reserved."""
+
+
+class QuotaBackend(ABC):
+    """
+    Per-organization GPU quota with reservations.
+
+    Every GPU counts against its organization from the moment it is reserved
+    (on allocate) until it is released (on error or de-provisioning). A
+    reservation is committed once provisioning has started, which turns it
+    into an active GPU. Reservation IDs are the IDs of the GPU rows they
+    will become, so every transition is idempotent. Reservations that are
+    never committed expire after `reservation_ttl` seconds, and a request
+    that waited longer must reserve again before it commits, since its GPUs
+    no longer count against the limit. A gang of GPUs is reserved in one
+    step, all or nothing.
+
+    `reconcile` replaces the active set with what the `gpus` table says,
+    ignoring anything committed within the last `grace` seconds so it cannot
+    race with in-flight provisioning.
+    """
+
+    def __init__(self, reservation_ttl: float):
+        self.reservation_ttl = reservation_ttl
+        self.reserved_count = 0
+        self.denied_count = 0
+
+    @abstractmethod
+    async def reserve_many(
+        self, organization_id: str, reservation_ids: Sequence[str], limit: int
+    ) -> bool:
+        """Atomically reserve every GPU in `reservation_ids`, or none of them."""
+
+    @abstractmethod
+    async def commit_many(
+        self, organization_id: str, reservation_ids: Sequence[str]
+    ) -> List[str]:
+        """
+        Turn reservations into active GPUs. Returns the IDs that were neither
+        reserved nor active (their reservation expired), which are left out.
+        """
+
+    @abstractmethod
+    async def release_many(self, organization_id: str, reservation_ids: Sequence[str]) -> None:
+        """Drop reservations or active GPUs."""
+
+    async def reserve(self, organization_id: str, reservation_id: str, limit: int) -> bool:
+        """Atomically reserve one GPU if active + reserved is below `limit`."""
+        return await self.reserve_many(organization_id, [reservation_id], limit)
+
+    async def commit(self, organization_id: str, reservation_id: str) -> bool:
+        """Turn a reservation into an active GPU. False if it had expired."""
+        return not await self.commit_many(organization_id, [reservation_id])
+
+    async def release(self, organization_id: str, reservation_id: str) -> None:
+        """Drop a reservation or an active GPU."""
+        await self.release_many(organization_id, [reservation_id])
+
+    @abstractmethod
+    async def reconcile(
+        self, organization_id: str, active_ids: Iterable[str], grace: float
+    ) -> None:
+        """Reset the active set to `active_ids` (the source of truth)."""
+
+    @abstractmethod
+    async def usage(self, organization_id: str) -> Dict[str, int]:
+        """Return the active and reserved counts for an organization."""
+
+    async def close(self) -> None:
+        """Release any connections held by the backend."""
+
+    def stats(self) -> dict:
+        return {
+            "backend": type(self).__name__,
+            "reserved": self.reserved_count,
+            "denied": self.denied_count,
+        }
+
+
+class InMemoryQuotaBackend(QuotaBackend):
+    """
+    Quota state held in this process. Only correct when the API and the
+    workers share a process (development, eager Celery, tests).
+    """
+
+    def __init__(self, reservation_ttl: float):
+        super().__init__(reservation_ttl)
+        self._active: Dict[str, Dict[str, float]] = {}
+        self._reserved: Dict[str, Dict[str, float]] = {}
+        self._lock = threading.Lock()
+
+    def _expire(self, organization_id: str, now: float) -> Dict[str, float]:
+        reserved = self._reserved.setdefault(organization_id, {})
+        for reservation_id in [r for r, deadline in reserved.items() if deadline <= now]:
+            del reserved[reservation_id]
+        return reserved
+
+    async def reserve_many(
+        self, organization_id: str, reservation_ids: Sequence[str], limit: int
+    ) -> bool:
+        now = time.time()
+        with self._lock:
+            reserved = self._expire(organization_id, now)
+            active = self._active.setdefault(organization_id, {})
+            new_ids = {r for r in reservation_ids if r not in reserved and r not in active}
+            if not new_ids:
+                return True
+            if len(active) + len(reserved) + len(new_ids) > limit:
+                self.denied_count += 1
+                return False
+            for reservation_id in new_ids:
+                reserved[reservation_id] = now + self.reservation_ttl
+            self.reserved_count += len(new_ids)
+            return True
+
+    async def commit_many(
+        self, organization_id: str, reservation_ids: Sequence[str]
+    ) -> List[str]:
+        now = time.time()
+        expired = []
+        with self._lock:
+            reserved = self._expire(organization_id, now)
+            active = self._active.setdefault(organization_id, {})
+            for reservation_id in reservation_ids:
+                if reserved.pop(reservation_id, None) is not None:
+                    active.setdefault(reservation_id, now)
+                elif reservation_id not in active:
+                    expired.append(reservation_id)
+        return expired
+
+    async def release_many(self, organization_id: str, reservation_ids: Sequence[str]) -> None:
+        with self._lock:
+            reserved = self._reserved.setdefault(organization_id, {})
+            active = self._active.setdefault(organization_id, {})
+            for reservation_id in reservation_ids:
+                reserved.pop(reservation_id, None)
+                active.pop(reservation_id, None)
+
+    async def reconcile(
+        self, organization_id: str, active_ids: Iterable[str], grace: float
+    ) -> None:
+        now = time.time()
+        keep = set(active_ids)
+        with self._lock:
+            active = self._active.setdefault(organization_id, {})
+            reserved = self._reserved.setdefault(organization_id, {})
+            for gpu_id in keep:
+                active.setdefault(gpu_id, now)
+                reserved.pop(gpu_id, None)
+            for gpu_id, committed_at in list(active.items()):
+                if gpu_id not in keep and committed_at <= now - grace:
+                    del active[gpu_id]
+
+    async def usage(self, organization_id: str) -> Dict[str, int]:
+        with self._lock:
+            reserved = self._expire(organization_id, time.time())
+            return {
+                "active": len(self._active.get(organization_id, {})),
+                "reserved": len(reserved),
+            }
+
+
+# KEYS: active zset, reserved zset.
+# Both sorted sets hold GPU IDs: active scored by commit time, reserved by
+# expiry time.
+# ARGV: limit, now, expiry, GPU IDs...
+# Returns the number of new reservations, or -1 if the limit would be exceeded.
+_RESERVE_SCRIPT = """
+redis.call('ZREMRANGEBYSCORE', KEYS[2], '-inf', ARGV[2])
+local new_ids = {}
+for i = 4, #ARGV do
+    if not (redis.call('ZSCORE', KEYS[2], ARGV[i]) or redis.call('ZSCORE', KEYS[1], ARGV[i])) then
+        table.insert(new_ids, ARGV[i])
+    end
+end
+if #new_ids == 0 then
+    return 0
+end
+if redis.call('ZCARD', KEYS[1]) + redis.call('ZCARD', KEYS[2]) + #new_ids > tonumber(ARGV[1]) then
+    return -1
+end
+for _, gpu_id in ipairs(new_ids) do
+    redis.call('ZADD', KEYS[2], ARGV[3], gpu_id)
+end
+return #new_ids
+"""
+
+# ARGV: now, GPU IDs...
+# Returns the GPU IDs whose reservation expired before they were committed.
+_COMMIT_SCRIPT = """
+redis.call('ZREMRANGEBYSCORE', KEYS[2], '-inf', ARGV[1])
+local expired = {}
+for i = 2, #ARGV do
+    if redis.call('ZREM', KEYS[2], ARGV[i]) == 1 then
+        redis.call('ZADD', KEYS[1], 'NX', ARGV[1], ARGV[i])
+    elseif not redis.call('ZSCORE', KEYS[1], ARGV[i]) then
+        table.insert(expired, ARGV[i])
+    end
+end
+return expired
+"""
+
+_RECONCILE_SCRIPT = """
+local keep = {}
+for i = 3, #ARGV do
+    keep[ARGV[i]] = true
+    redis.call('ZADD', KEYS[1], 'NX', ARGV[2], ARGV[i])
+    redis.call('ZREM', KEYS[2], ARGV[i])
+end
+for _, gpu_id in ipairs(redis.call('ZRANGEBYSCORE', KEYS[1], '-inf', ARGV[1])) do
+    if not keep[gpu_id] then
+        redis.call('ZREM', KEYS[1], gpu_id)
+    end
+end
+return 1
+"""
+
+
+class RedisQuotaBackend(QuotaBackend):
+    """
+    Quota state shared by every API replica and worker through Redis. Each
+    transition is a single Lua script, so concurrent reservations cannot
+    overshoot the limit.
+    """
+
+    def __init__(self, redis_url: str, reservation_ttl: float):
+        super().__init__(reservation_ttl)
+        self._redis = redis.from_url(redis_url)
+        self._reserve = self._redis.register_script(_RESERVE_SCRIPT)
+        self._commit = self._redis.register_script(_COMMIT_SCRIPT)
+        self._reconcile = self._redis.register_script(_RECONCILE_SCRIPT)
+
+    @staticmethod
+    def _keys(organization_id: str) -> list:
+        return [f"quota:{{{organization_id}}}:active", f"quota:{{{organization_id}}}:reserved"]
+
+    async def reserve_many(
+        self, organization_id: str, reservation_ids: Sequence[str], limit: int
+    ) -> bool:
+        now = time.time()
+        granted = await self._reserve(
+            keys=self._keys(organization_id),
+            args=[limit, now, now + self.reservation_ttl, *reservation_ids],
+        )
+        if granted < 0:
+            self.denied_count += 1
+            return False
+        self.reserved_count += granted
+        return True
+
+    async def commit_many(
+        self, organization_id: str, reservation_ids: Sequence[str]
+    ) -> List[str]:
+        expired = await self._commit(
+            keys=self._keys(organization_id), args=[time.time(), *reservation_ids]
+        )
+        return [gpu_id.decode() for gpu_id in expired]
+
+    async def release_many(self, organization_id: str, reservation_ids: Sequence[str]) -> None:
+        active_key, reserved_key = self._keys(organization_id)
+        async with self._redis.pipeline(transaction=True) as pipe:
+            pipe.zrem(reserved_key, *reservation_ids)
+            pipe.zrem(active_key, *reservation_ids)
+            await pipe.execute()
+
+    async def reconcile(
+        self, organization_id: str, active_ids: Iterable[str], grace: float
+    ) -> None:
+        now = time.time()
+        await self._reconcile(
+            keys=self._keys(organization_id), args=[now - grace, now, *active_ids]
+        )
+
+    async def usage(self, organization_id: str) -> Dict[str, int]:
+        active_key, reserved_key = self._keys(organization_id)
+        now = time.time()
+        async with self._redis.pipeline(transaction=True) as pipe:
+            pipe.zremrangebyscore(reserved_key, "-inf", now)
+            pipe.zcard(active_key)
+            pipe.zcard(reserved_key)
+            _, active, reserved = await pipe.execute()
+        return {"active": active, "reserved": reserved}
+
+    async def close(self) -> None:
+        await self._redis.aclose()
+
+
+_in_memory_backend = None
+
+
+def create_quota_backend() -> QuotaBackend:
+    """
+    Build the configured quota backend. Redis backends hold a connection pool
+    bound to the running event loop, so callers on a short-lived loop should
+    create their own instance; the in-memory backend is a process singleton.
+    """
+    global _in_memory_backend
+    if settings.QUOTA_BACKEND == "memory":
+        if _in_memory_backend is None:
+            _in_memory_backend = InMemoryQuotaBackend(settings.QUOTA_RESERVATION_TTL_SECONDS)
+        return _in_memory_backend
+    if settings.QUOTA_BACKEND == "redis":
+        return RedisQuotaBackend(settings.REDIS_URL, settings.QUOTA_RESERVATION_TTL_SECONDS)
+    raise ValueError(f"Unknown quota backend: {settings.QUOTA_BACKEND!r}")
+
+
+quota_backend = create_quota_backend()
+metrics.register("quota", quota_backend.stats)
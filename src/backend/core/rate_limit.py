@@ -0,0 +1,331 @@
+import random
+import threading
+import time
+from abc import ABC, abstractmethod
+from typing import Callable, Dict, Optional
+
+import redis
+from botocore.exceptions import ClientError, ConnectionError as BotocoreConnectionError, HTTPClientError
+
+from src.backend.core.config import settings
+
+# Error codes AWS returns when a caller exceeds its request rate.
+THROTTLING_ERROR_CODES = {
+    "RequestLimitExceeded",
+    "Throttling",
+    "ThrottlingException",
+    "RequestThrottled",
+    "RequestThrottledException",
+    "TooManyRequestsException",
+}
+
+# Error codes for AWS-side failures that are worth retrying.
+TRANSIENT_ERROR_CODES = {"InternalError", "InternalFailure", "ServiceUnavailable", "Unavailable"}
+
+# Network-level failures, also worth retrying.
+NETWORK_ERRORS = (BotocoreConnectionError, HTTPClientError)
+
+
+class CloudAPIUnavailable(Exception):
+    """
+    The cloud API is throttling or failing: the circuit breaker is open, or
+    a call kept failing after every retry. The operation may be retried later.
+    """
+
+
+class RateLimitBackend(ABC):
+    """
+    State shared by the cloud API guards of every worker process: a token
+    bucket and an adaptive rate per region and API action, and a circuit
+    breaker per region.
+
+    The guards call the backend from synchronous boto3 code paths, so its
+    methods are synchronous too.
+    """
+
+    @abstractmethod
+    def take(self, key: str, rate: float, burst: float) -> float:
+        """
+        Take a token from the bucket at `key`, refilled at `rate` per second up
+        to `burst`. Returns 0 if a token was taken, or the seconds to wait.
+        """
+
+    @abstractmethod
+    def get_rate(self, key: str) -> Optional[float]:
+        """Return the adapted rate for `key`, if one has been stored."""
+
+    @abstractmethod
+    def set_rate(self, key: str, rate: float) -> None:
+        """Store the adapted rate for `key`."""
+
+    @abstractmethod
+    def record_failure(self, key: str, threshold: int, cooldown: float) -> None:
+        """Count a failure; open the breaker for `cooldown` seconds at `threshold`."""
+
+    @abstractmethod
+    def record_success(self, key: str) -> None:
+        """Reset the breaker's failure count."""
+
+    @abstractmethod
+    def open_until(self, key: str) -> float:
+        """Return the time until which the breaker is open (0 when closed)."""
+
+
+class InMemoryRateLimitBackend(RateLimitBackend):
+    """
+    Limiter state held in this process. Each worker process then throttles
+    on its own, so fleet-wide rates scale with the number of processes.
+    """
+
+    def __init__(self):
+        self._buckets: Dict[str, tuple] = {}
+        self._rates: Dict[str, float] = {}
+        self._failures: Dict[str, int] = {}
+        self._open_until: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def take(self, key: str, rate: float, burst: float) -> float:
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated_at = self._buckets.get(key, (burst, now))
+            tokens = min(burst, tokens + (now - updated_at) * rate)
+            if tokens >= 1:
+                self._buckets[key] = (tokens - 1, now)
+                return 0.0
+            self._buckets[key] = (tokens, now)
+            return (1 - tokens) / rate
+
+    def get_rate(self, key: str) -> Optional[float]:
+        with self._lock:
+            return self._rates.get(key)
+
+    def set_rate(self, key: str, rate: float) -> None:
+        with self._lock:
+            self._rates[key] = rate
+
+    def record_failure(self, key: str, threshold: int, cooldown: float) -> None:
+        with self._lock:
+            self._failures[key] = self._failures.get(key, 0) + 1
+            if self._failures[key] >= threshold:
+                self._open_until[key] = time.time() + cooldown
+
+    def record_success(self, key: str) -> None:
+        with self._lock:
+            self._failures.pop(key, None)
+
+    def open_until(self, key: str) -> float:
+        with self._lock:
+            return self._open_until.get(key, 0.0)
+
+
+# KEYS: bucket hash. ARGV: rate, burst, now.
+# Returns 0 if a token was taken, otherwise the milliseconds to wait.
+_TAKE_SCRIPT = """
+local rate = tonumber(ARGV[1])
+local burst = tonumber(ARGV[2])
+local now = tonumber(ARGV[3])
+local bucket = redis.call('HMGET', KEYS[1], 'tokens', 'updated_at')
+local tokens = tonumber(bucket[1]) or burst
+local updated_at = tonumber(bucket[2]) or now
+tokens = math.min(burst, tokens + math.max(now - updated_at, 0) * rate)
+local wait = 0
+if tokens >= 1 then
+    tokens = tokens - 1
+else
+    wait = math.ceil((1 - tokens) / rate * 1000)
+end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'updated_at', tostring(now))
+redis.call('PEXPIRE', KEYS[1], math.ceil(burst / rate * 1000) + 1000)
+return wait
+"""
+
+# KEYS: failure counter, open-until key. ARGV: threshold, cooldown, now.
+_FAILURE_SCRIPT = """
+local failures = redis.call('INCR', KEYS[1])
+redis.call('EXPIRE', KEYS[1], math.ceil(tonumber(ARGV[2])) * 10)
+if failures >= tonumber(ARGV[1]) then
+    redis.call('SET', KEYS[2], tonumber(ARGV[3]) + tonumber(ARGV[2]), 'EX', math.ceil(tonumber(ARGV[2])) + 1)
+end
+return failures
+"""
+
+
+class RedisRateLimitBackend(RateLimitBackend):
+    """Limiter state shared by every worker process through Redis."""
+
+    prefix = "cloud_rate_limit"
+
+    def __init__(self, redis_url: str):
+        self._redis = redis.Redis.from_url(redis_url)
+        self._take = self._redis.register_script(_TAKE_SCRIPT)
+        self._failure = self._redis.register_script(_FAILURE_SCRIPT)
+
+    def take(self, key: str, rate: float, burst: float) -> float:
+        wait_ms = self._take(keys=[f"{self.prefix}:bucket:{key}"], args=[rate, burst, time.time()])
+        return int(wait_ms) / 1000
+
+    def get_rate(self, key: str) -> Optional[float]:
+        rate = self._redis.get(f"{self.prefix}:rate:{key}")
+        return float(rate) if rate is not None else None
+
+    def set_rate(self, key: str, rate: float) -> None:
+        self._redis.set(f"{self.prefix}:rate:{key}", rate, ex=3600)
+
+    def record_failure(self, key: str, threshold: int, cooldown: float) -> None:
+        self._failure(
+            keys=[f"{self.prefix}:failures:{key}", f"{self.prefix}:open_until:{key}"],
+            args=[threshold, cooldown, time.time()],
+        )
+
+    def record_success(self, key: str) -> None:
+        self._redis.delete(f"{self.prefix}:failures:{key}")
+
+    def open_until(self, key: str) -> float:
+        open_until = self._redis.get(f"{self.prefix}:open_until:{key}")
+        return float(open_until) if open_until is not None else 0.0
+
+
+class CloudAPIGuard:
+    """
+    Wraps every call to a cloud API with:
+
+    - a token bucket per region and action, whose rate adapts to throttling
+      (AIMD): each success raises it by `increase` up to the configured
+      ceiling, each throttling response multiplies it by `decrease`;
+    - retries of throttled and transient failures with jittered
+      exponential backoff;
+    - a circuit breaker per region that fails fast with
+      `CloudAPIUnavailable` once `failure_threshold` calls in a row have
+      failed, for `cooldown` seconds. The first call after the cooldown
+      probes the API; a failure reopens the breaker straight away.
+    """
+
+    def __init__(
+        self,
+        backend: RateLimitBackend,
+        *,
+        rates: Dict[str, float],
+        default_rate: float,
+        min_rate: float,
+        increase: float,
+        decrease: float,
+        max_attempts: int,
+        base_delay: float,
+        max_delay: float,
+        failure_threshold: int,
+        cooldown: float,
+        sleep: Callable[[float], None] = time.sleep,
+    ):
+        self.backend = backend
+        self.rates = rates
+        self.default_rate = default_rate
+        self.min_rate = min_rate
+        self.increase = increase
+        self.decrease = decrease
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.sleep = sleep
+
+        self.calls = 0
+        self.throttled = 0
+        self.retries = 0
+        self.rejected = 0
+
+    def call(self, region: str, action: str, fn: Callable, *args, **kwargs):
+        if self.backend.open_until(region) > time.time():
+            self.rejected += 1
+            raise CloudAPIUnavailable(f"Circuit open for cloud API calls in {region}.")
+
+        key = f"{region}:{action}"
+        ceiling = self.rates.get(action, self.default_rate)
+        for attempt in range(1, self.max_attempts + 1):
+            rate = self.backend.get_rate(key) or ceiling
+            self._wait_for_token(key, rate)
+            self.calls += 1
+            try:
+                result = fn(*args, **kwargs)
+            except (ClientError, *NETWORK_ERRORS) as e:
+                code = e.response["Error"]["Code"] if isinstance(e, ClientError) else None
+                throttled = code in THROTTLING_ERROR_CODES
+                transient = code is None or code in TRANSIENT_ERROR_CODES
+                if throttled:
+                    self.throttled += 1
+                    self.backend.set_rate(key, max(self.min_rate, rate * self.decrease))
+                if not (throttled or transient):
+                    raise
+                self.backend.record_failure(region, self.failure_threshold, self.cooldown)
+                if attempt == self.max_attempts:
+                    raise CloudAPIUnavailable(f"{action} in {region} kept failing: {e}") from e
+                self.retries += 1
+                self.sleep(self._backoff(attempt))
+                continue
+
+            self.backend.record_success(region)
+            if rate < ceiling:
+                self.backend.set_rate(key, min(ceiling, rate + self.increase))
+            return result
+
+    def _wait_for_token(self, key: str, rate: float) -> None:
+        burst = max(1.0, rate)
+        while True:
+            wait = self.backend.take(key, rate, burst)
+            if wait <= 0:
+                return
+            self.sleep(wait)
+
+    def _backoff(self, attempt: int) -> float:
+        # "Full jitter": a uniformly random delay up to the exponential cap.
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** (attempt - 1)))
+
+    def stats(self) -> dict:
+        return {
+            "calls": self.calls,
+            "throttled": self.throttled,
+            "retries": self.retries,
+            "rejected": self.rejected,
+        }
+
+
+class GuardedClient:
+    """A boto3 client whose API calls all go through a `CloudAPIGuard`."""
+
+    def __init__(self, client, region: str, guard: CloudAPIGuard):
+        self._client = client
+        self._region = region
+        self._guard = guard
+
+    def __getattr__(self, name):
+        attribute = getattr(self._client, name)
+        action = self._client.meta.method_to_api_mapping.get(name)
+        if action is None or not callable(attribute):
+            return attribute
+
+        def guarded(*args, **kwargs):
+            return self._guard.call(self._region, action, attribute, *args, **kwargs)
+
+        return guarded
+
+
+def create_cloud_api_guard() -> CloudAPIGuard:
+    if settings.CLOUD_RATE_LIMIT_BACKEND == "memory":
+        backend = InMemoryRateLimitBackend()
+    elif settings.CLOUD_RATE_LIMIT_BACKEND == "redis":
+        backend = RedisRateLimitBackend(settings.REDIS_URL)
+    else:
+        raise ValueError(f"Unknown cloud rate limit backend: {settings.CLOUD_RATE_LIMIT_BACKEND!r}")
+    return CloudAPIGuard(
+        backend,
+        rates=settings.CLOUD_RATE_LIMITS,
+        default_rate=settings.CLOUD_RATE_LIMIT_DEFAULT,
+        min_rate=settings.CLOUD_RATE_LIMIT_MIN,
+        increase=settings.CLOUD_RATE_LIMIT_INCREASE,
+        decrease=settings.CLOUD_RATE_LIMIT_DECREASE,
+        max_attempts=settings.CLOUD_RETRY_MAX_ATTEMPTS,
+        base_delay=settings.CLOUD_RETRY_BASE_DELAY_SECONDS,
+        max_delay=settings.CLOUD_RETRY_MAX_DELAY_SECONDS,
+        failure_threshold=settings.CLOUD_BREAKER_FAILURE_THRESHOLD,
+        cooldown=settings.CLOUD_BREAKER_COOLDOWN_SECONDS,
+    )
@@ -0,0 +1,536 @@
+import json
+import math
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import deque
+from dataclasses import asdict, dataclass, field
+from typing import Callable, Dict, List, Optional
+
+import redis.asyncio as redis
+
+from src.backend.core import metrics
+from src.backend.core.config import settings
+from src.backend.schemas.gpu import AllocationPriority
+
+# Within one organization's queue, higher classes are always dispatched first.
+PRIORITY_ORDER = [AllocationPriority.HIGH, AllocationPriority.NORMAL, AllocationPriority.LOW]
+
+
+@dataclass
+class QueuedAllocation:
+    request_id: str
+    organization_id: str
+    priority: str
+    payload: dict
+    cost: int = 1
+    enqueued_at: float = field(default_factory=time.time)
+    state: str = "queued"
+
+    def to_json(self) -> str:
+        return json.dumps(asdict(self))
+
+    @classmethod
+    def from_json(cls, raw) -> "QueuedAllocation":
+        return cls(**json.loads(raw))
+
+
+class SchedulerBackend(ABC):
+    """
+    State behind the fair-share scheduler: one FIFO per organization and
+    priority class, a round-robin ring of organizations with queued work,
+    per-organization deficit counters, and the set of dispatched requests
+    that are still provisioning.
+
+    `push` adds an organization to the ring together with its request, and
+    `deactivate` only drops it while all of its queues are empty, each as one
+    atomic step, so a request is never left queued outside the ring. Beyond
+    that only the dispatcher (serialized by `acquire_dispatch_lock`) changes
+    the ring and the deficits, so its other operations need not be atomic
+    with one another.
+    """
+
+    @abstractmethod
+    async def push(self, request: QueuedAllocation) -> None:
+        """Queue a request and add its organization to the ring."""
+
+    @abstractmethod
+    async def get(self, request_id: str) -> Optional[QueuedAllocation]:
+        """Return a queued or recently dispatched request."""
+
+    @abstractmethod
+    async def ring(self) -> List[str]:
+        """Organizations with queued work, in round-robin order."""
+
+    @abstractmethod
+    async def rotate(self, organization_id: str) -> None:
+        """Move an organization from the head of the ring to its tail."""
+
+    @abstractmethod
+    async def deactivate(self, organization_id: str) -> bool:
+        """
+        Drop an organization from the ring and reset its deficit if all of its
+        queues are empty. Returns False, leaving it in place, if they are not.
+        """
+
+    @abstractmethod
+    async def head(self, organization_id: str) -> Optional[QueuedAllocation]:
+        """The next request of an organization, highest priority class first."""
+
+    @abstractmethod
+    async def pop(self, request: QueuedAllocation, in_flight_deadline: float) -> None:
+        """Remove a request from its queue and count it as in flight."""
+
+    @abstractmethod
+    async def position(self, request: QueuedAllocation) -> int:
+        """Number of the organization's requests that will be dispatched first."""
+
+    @abstractmethod
+    async def get_deficit(self, organization_id: str) -> int:
+        """Return the organization's deficit counter."""
+
+    @abstractmethod
+    async def set_deficit(self, organization_id: str, deficit: int) -> None:
+        """Store the organization's deficit counter."""
+
+    @abstractmethod
+    async def in_flight(self) -> int:
+        """Total cost of dispatched requests still provisioning, dropping timed-out ones."""
+
+    @abstractmethod
+    async def complete(self, request_id: str) -> None:
+        """Stop counting a dispatched request as in flight."""
+
+    @abstractmethod
+    async def acquire_dispatch_lock(self, ttl: float) -> bool:
+        """Take the single-dispatcher lock."""
+
+    @abstractmethod
+    async def release_dispatch_lock(self) -> None:
+        """Release the single-dispatcher lock."""
+
+    async def close(self) -> None:
+        """Release any connections held by the backend."""
+
+
+class InMemorySchedulerBackend(SchedulerBackend):
+    """
+    Scheduler state held in this process. Only correct when the API and the
+    workers share a process (development, eager Celery, tests).
+    """
+
+    def __init__(self, retention: float):
+        self.retention = retention
+        self._queues: Dict[str, Dict[str, deque]] = {}
+        self._requests: Dict[str, QueuedAllocation] = {}
+        self._dispatched_at: Dict[str, float] = {}
+        self._ring: deque = deque()
+        self._deficits: Dict[str, int] = {}
+        self._in_flight: Dict[str, tuple] = {}
+        self._dispatching = False
+        self._lock = threading.Lock()
+
+    async def push(self, request: QueuedAllocation) -> None:
+        with self._lock:
+            queues = self._queues.setdefault(
+                request.organization_id, {priority.value: deque() for priority in PRIORITY_ORDER}
+            )
+            queues[request.priority].append(request.request_id)
+            self._requests[request.request_id] = request
+            if request.organization_id not in self._ring:
+                self._ring.append(request.organization_id)
+
+    async def get(self, request_id: str) -> Optional[QueuedAllocation]:
+        with self._lock:
+            cutoff = time.time() - self.retention
+            for expired in [r for r, at in self._dispatched_at.items() if at <= cutoff]:
+                self._dispatched_at.pop(expired)
+                self._requests.pop(expired, None)
+            return self._requests.get(request_id)
+
+    async def ring(self) -> List[str]:
+        with self._lock:
+            return list(self._ring)
+
+    async def rotate(self, organization_id: str) -> None:
+        with self._lock:
+            if self._ring and self._ring[0] == organization_id:
+                self._ring.rotate(-1)
+
+    async def deactivate(self, organization_id: str) -> bool:
+        with self._lock:
+            if any(self._queues.get(organization_id, {}).values()):
+                return False
+            if organization_id in self._ring:
+                self._ring.remove(organization_id)
+            self._deficits.pop(organization_id, None)
+            return True
+
+    async def head(self, organization_id: str) -> Optional[QueuedAllocation]:
+        with self._lock:
+            for priority in PRIORITY_ORDER:
+                queue = self._queues.get(organization_id, {}).get(priority.value)
+                if queue:
+                    return self._requests[queue[0]]
+            return None
+
+    async def pop(self, request: QueuedAllocation, in_flight_deadline: float) -> None:
+        with self._lock:
+            self._queues[request.organization_id][request.priority].remove(request.request_id)
+            request.state = "dispatched"
+            self._dispatched_at[request.request_id] = time.time()
+            self._in_flight[request.request_id] = (request.cost, in_flight_deadline)
+
+    async def position(self, request: QueuedAllocation) -> int:
+        with self._lock:
+            ahead = 0
+            for priority in PRIORITY_ORDER:
+                queue = self._queues.get(request.organization_id, {}).get(priority.value, deque())
+                if priority.value == request.priority:
+                    return ahead + (queue.index(request.request_id) if request.request_id in queue else 0)
+                ahead += len(queue)
+            return ahead
+
+    async def get_deficit(self, organization_id: str) -> int:
+        with self._lock:
+            return self._deficits.get(organization_id, 0)
+
+    async def set_deficit(self, organization_id: str, deficit: int) -> None:
+        with self._lock:
+            self._deficits[organization_id] = deficit
+
+    async def in_flight(self) -> int:
+        now = time.time()
+        with self._lock:
+            for request_id in [r for r, (_, deadline) in self._in_flight.items() if deadline <= now]:
+                del self._in_flight[request_id]
+            return sum(cost for cost, _ in self._in_flight.values())
+
+    async def complete(self, request_id: str) -> None:
+        with self._lock:
+            self._in_flight.pop(request_id, None)
+
+    async def acquire_dispatch_lock(self, ttl: float) -> bool:
+        with self._lock:
+            if self._dispatching:
+                return False
+            self._dispatching = True
+            return True
+
+    async def release_dispatch_lock(self) -> None:
+        with self._lock:
+            self._dispatching = False
+
+
+# KEYS: request, queue, ring members, ring. ARGV: request JSON, request ID,
+# organization ID.
+_PUSH_SCRIPT = """
+redis.call('SET', KEYS[1], ARGV[1])
+redis.call('RPUSH', KEYS[2], ARGV[2])
+if redis.call('SADD', KEYS[3], ARGV[3]) == 1 then
+    redis.call('RPUSH', KEYS[4], ARGV[3])
+end
+"""
+
+# KEYS: ring, ring members, deficits, then the organization's queues.
+# ARGV: organization ID.
+_DEACTIVATE_SCRIPT = """
+for i = 4, #KEYS do
+    if redis.call('LLEN', KEYS[i]) > 0 then
+        return 0
+    end
+end
+redis.call('LREM', KEYS[1], 0, ARGV[1])
+redis.call('SREM', KEYS[2], ARGV[1])
+redis.call('HDEL', KEYS[3], ARGV[1])
+return 1
+"""
+
+
+class RedisSchedulerBackend(SchedulerBackend):
+    """Scheduler state shared by every API replica and worker through Redis."""
+
+    prefix = "scheduler"
+
+    def __init__(self, redis_url: str, retention: float):
+        self.retention = retention
+        self._redis = redis.from_url(redis_url, decode_responses=True)
+        self._push = self._redis.register_script(_PUSH_SCRIPT)
+        self._deactivate = self._redis.register_script(_DEACTIVATE_SCRIPT)
+
+    def _queue_key(self, organization_id: str, priority: str) -> str:
+        return f"{self.prefix}:queue:{organization_id}:{priority}"
+
+    def _request_key(self, request_id: str) -> str:
+        return f"{self.prefix}:request:{request_id}"
+
+    async def push(self, request: QueuedAllocation) -> None:
+        await self._push(
+            keys=[
+                self._request_key(request.request_id),
+                self._queue_key(request.organization_id, request.priority),
+                f"{self.prefix}:ring:members",
+                f"{self.prefix}:ring",
+            ],
+            args=[request.to_json(), request.request_id, request.organization_id],
+        )
+
+    async def get(self, request_id: str) -> Optional[QueuedAllocation]:
+        raw = await self._redis.get(self._request_key(request_id))
+        return QueuedAllocation.from_json(raw) if raw is not None else None
+
+    async def ring(self) -> List[str]:
+        return await self._redis.lrange(f"{self.prefix}:ring", 0, -1)
+
+    async def rotate(self, organization_id: str) -> None:
+        ring_key = f"{self.prefix}:ring"
+        if await self._redis.lindex(ring_key, 0) == organization_id:
+            await self._redis.lmove(ring_key, ring_key, "LEFT", "RIGHT")
+
+    async def deactivate(self, organization_id: str) -> bool:
+        deactivated = await self._deactivate(
+            keys=[
+                f"{self.prefix}:ring",
+                f"{self.prefix}:ring:members",
+                f"{self.prefix}:deficits",
+                *(self._queue_key(organization_id, priority.value) for priority in PRIORITY_ORDER),
+            ],
+            args=[organization_id],
+        )
+        return bool(deactivated)
+
+    async def head(self, organization_id: str) -> Optional[QueuedAllocation]:
+        for priority in PRIORITY_ORDER:
+            request_id = await self._redis.lindex(self._queue_key(organization_id, priority.value), 0)
+            if request_id is not None:
+                return await self.get(request_id)
+        return None
+
+    async def pop(self, request: QueuedAllocation, in_flight_deadline: float) -> None:
+        request.state = "dispatched"
+        async with self._redis.pipeline(transaction=True) as pipe:
+            pipe.lrem(self._queue_key(request.organization_id, request.priority), 1, request.request_id)
+            pipe.set(
+                self._request_key(request.request_id), request.to_json(), px=int(self.retention * 1000)
+            )
+            pipe.hset(f"{self.prefix}:in_flight", request.request_id, request.cost)
+            pipe.zadd(f"{self.prefix}:in_flight:deadlines", {request.request_id: in_flight_deadline})
+            await pipe.execute()
+
+    async def position(self, request: QueuedAllocation) -> int:
+        ahead = 0
+        for priority in PRIORITY_ORDER:
+            queue_key = self._queue_key(request.organization_id, priority.value)
+            if priority.value == request.priority:
+                index = await self._redis.lpos(queue_key, request.request_id)
+                return ahead + (index or 0)
+            ahead += await self._redis.llen(queue_key)
+        return ahead
+
+    async def get_deficit(self, organization_id: str) -> int:
+        return int(await self._redis.hget(f"{self.prefix}:deficits", organization_id) or 0)
+
+    async def set_deficit(self, organization_id: str, deficit: int) -> None:
+        await self._redis.hset(f"{self.prefix}:deficits", organization_id, deficit)
+
+    async def in_flight(self) -> int:
+        deadlines_key = f"{self.prefix}:in_flight:deadlines"
+        expired = await self._redis.zrangebyscore(deadlines_key, "-inf", time.time())
+        for request_id in expired:
+            await self.complete(request_id)
+        costs = await self._redis.hvals(f"{self.prefix}:in_flight")
+        return sum(int(cost) for cost in costs)
+
+    async def complete(self, request_id: str) -> None:
+        async with self._redis.pipeline(transaction=True) as pipe:
+            pipe.hdel(f"{self.prefix}:in_flight", request_id)
+            pipe.zrem(f"{self.prefix}:in_flight:deadlines", request_id)
+            await pipe.execute()
+
+    async def acquire_dispatch_lock(self, ttl: float) -> bool:
+        return bool(
+            await self._redis.set(f"{self.prefix}:dispatch_lock", 1, nx=True, px=int(ttl * 1000))
+        )
+
+    async def release_dispatch_lock(self) -> None:
+        await self._redis.delete(f"{self.prefix}:dispatch_lock")
+
+    async def close(self) -> None:
+        await self._redis.aclose()
+
+
+class FairShareScheduler:
+    """
+    Sits between `/allocate` and the provisioning workers.
+
+    Requests wait in per-organization queues and are released to the workers
+    by deficit round-robin: each visit adds the organization's weight to its
+    deficit, and requests are dispatched while their cost (the number of
+    GPUs) fits in it. Organizations therefore share provisioning capacity in
+    proportion to their weights, however many requests any one of them
+    queues. Dispatch stops while `max_in_flight` GPUs are provisioning.
+    """
+
+    def __init__(
+        self,
+        backend: SchedulerBackend,
+        max_in_flight: int,
+        avg_provision_seconds: float,
+        in_flight_timeout: float,
+        weights: Optional[Dict[str, int]] = None,
+    ):
+        self.backend = backend
+        self.max_in_flight = max_in_flight
+        self.avg_provision_seconds = avg_provision_seconds
+        self.in_flight_timeout = in_flight_timeout
+        self.weights = weights or {}
+
+        self.enqueued = 0
+        self.dispatched = 0
+
+    def weight(self, organization_id: str) -> int:
+        return max(int(self.weights.get(organization_id, 1)), 1)
+
+    async def enqueue(
+        self,
+        *,
+        request_id: str,
+        organization_id: str,
+        priority: str,
+        payload: dict,
+        cost: int = 1,
+    ) -> dict:
+        request = QueuedAllocation(
+            request_id=request_id,
+            organization_id=organization_id,
+            priority=priority,
+            payload=payload,
+            cost=cost,
+        )
+        await self.backend.push(request)
+        self.enqueued += 1
+        return await self.status(request_id)
+
+    async def status(self, request_id: str) -> Optional[dict]:
+        """
+        Return the state of a request and, while it is queued, its position
+        in its organization's queue and an estimated wait. The estimate
+        assumes the organization receives its weighted share of the
+        provisioning capacity for as long as it waits.
+        """
+        request = await self.backend.get(request_id)
+        if request is None:
+            return None
+        if request.state != "queued":
+            return {
+                "request": request,
+                "state": request.state,
+                "queue_position": None,
+                "estimated_wait_seconds": None,
+            }
+
+        position = await self.backend.position(request)
+        ring = await self.backend.ring()
+        total_weight = sum(self.weight(organization_id) for organization_id in ring) or 1
+        share = self.weight(request.organization_id) / total_weight
+        throughput = self.max_in_flight * share / self.avg_provision_seconds
+        estimated_wait = math.ceil((position + request.cost) / throughput) if throughput else None
+        return {
+            "request": request,
+            "state": request.state,
+            "queue_position": position,
+            "estimated_wait_seconds": estimated_wait,
+        }
+
+    async def dispatch(self, submit: Callable[[dict], None], lock_ttl: float = 30.0) -> int:
+        """
+        Release as many queued requests as the in-flight cap allows, calling
+        `submit` with each payload. Returns the number of requests released.
+        """
+        if not await self.backend.acquire_dispatch_lock(lock_ttl):
+            return 0
+
+        released = 0
+        try:
+            budget = self.max_in_flight - await self.backend.in_flight()
+            while budget > 0:
+                ring = await self.backend.ring()
+                if not ring:
+                    break
+                organization_id = ring[0]
+                request = await self.backend.head(organization_id)
+                if request is None:
+                    # A request pushed meanwhile keeps the organization in
+                    # the ring, and the next pass over it finds the request.
+                    await self.backend.deactivate(organization_id)
+                    continue
+
+                deficit = await self.backend.get_deficit(organization_id)
+                if deficit < request.cost:
+                    deficit += self.weight(organization_id)
+                while request is not None and request.cost <= deficit:
+                    if request.cost > budget and budget < self.max_in_flight:
+                        # Wait for capacity rather than skipping a large request.
+                        await self.backend.set_deficit(organization_id, deficit)
+                        return released
+                    await self.backend.pop(request, time.time() + self.in_flight_timeout)
+                    submit(request.payload)
+                    deficit -= request.cost
+                    budget -= request.cost
+                    released += 1
+                    request = await self.backend.head(organization_id)
+
+                if request is None and await self.backend.deactivate(organization_id):
+                    continue
+                await self.backend.set_deficit(organization_id, deficit)
+                await self.backend.rotate(organization_id)
+        finally:
+            await self.backend.release_dispatch_lock()
+
+        self.dispatched += released
+        return released
+
+    async def complete(self, request_id: str) -> None:
+        """Free the in-flight capacity held by a dispatched request."""
+        await self.backend.complete(request_id)
+
+    async def close(self) -> None:
+        await self.backend.close()
+
+    def stats(self) -> dict:
+        return {
+            "enqueued": self.enqueued,
+            "dispatched": self.dispatched,
+            "max_in_flight": self.max_in_flight,
+        }
+
+
+_in_memory_backend = None
+
+
+def create_scheduler() -> FairShareScheduler:
+    """
+    Build a scheduler over the configured backend. As with quotas, Redis
+    backends are bound to the running event loop, while the in-memory
+    backend is a process singleton.
+    """
+    global _in_memory_backend
+    if settings.SCHEDULER_BACKEND == "memory":
+        if _in_memory_backend is None:
+            _in_memory_backend = InMemorySchedulerBackend(settings.SCHEDULER_RETENTION_SECONDS)
+        backend = _in_memory_backend
+    elif settings.SCHEDULER_BACKEND == "redis":
+        backend = RedisSchedulerBackend(settings.REDIS_URL, settings.SCHEDULER_RETENTION_SECONDS)
+    else:
+        raise ValueError(f"Unknown scheduler backend: {settings.SCHEDULER_BACKEND!r}")
+    return FairShareScheduler(
+        backend,
+        max_in_flight=settings.SCHEDULER_MAX_IN_FLIGHT,
+        avg_provision_seconds=settings.SCHEDULER_AVG_PROVISION_SECONDS,
+        in_flight_timeout=settings.SCHEDULER_IN_FLIGHT_TIMEOUT_SECONDS,
+        weights=settings.SCHEDULER_ORGANIZATION_WEIGHTS,
+    )
+
+
+allocation_scheduler = create_scheduler()
+metrics.register("scheduler", allocation_scheduler.stats)
@@ -1,7 +1,21 @@
+import hashlib
+import hmac
+from typing import Optional
+
+import bcrypt
 from passlib.context import CryptContext
 
+from src.backend.core.config import settings
+from src.backend.core.hashing import hashing_executor
+
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
+# API key hashes are stored as "$hmac-sha256$<pepper id>$<hex digest>".
+# Keys carry 256 bits of entropy, so a keyed HMAC is as strong as an adaptive
+# hash while costing microseconds. Hashes without this prefix are legacy
+# bcrypt hashes and are re-hashed on their next successful use.
+API_KEY_HASH_SCHEME = "hmac-sha256"
+
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     return pwd_context.verify(plain_password, hashed_password)
@@ -9,3 +23,62 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
 
 def get_password_hash(password: str) -> str:
     return pwd_context.hash(password)
+
+
+def _api_key_pepper(pepper_id: int) -> Optional[bytes]:
+    if pepper_id == settings.API_KEY_PEPPER_ID:
+        return settings.API_KEY_PEPPER.encode("utf-8")
+    retired = settings.API_KEY_RETIRED_PEPPERS.get(pepper_id)
+    return retired.encode("utf-8") if retired is not None else None
+
+
+def _hmac_api_key_digest(secret: str, pepper: bytes) -> str:
+    return hmac.new(pepper, secret.encode("utf-8"), hashlib.sha256).hexdigest()
+
+
+def hash_api_key_secret(secret: str) -> str:
+    pepper = _api_key_pepper(settings.API_KEY_PEPPER_ID)
+    digest = _hmac_api_key_digest(secret, pepper)
+    return f"${API_KEY_HASH_SCHEME}${settings.API_KEY_PEPPER_ID}${digest}"
+
+
+def is_hmac_api_key_hash(key_hash: str) -> bool:
+    return key_hash.startswith(f"${API_KEY_HASH_SCHEME}$")
+
+
+def api_key_hash_needs_upgrade(key_hash: str) -> bool:
+    """True for legacy bcrypt hashes and HMAC hashes made with a retired pepper."""
+    return not key_hash.startswith(f"${API_KEY_HASH_SCHEME}${settings.API_KEY_PEPPER_ID}$")
+
+
+def verify_hmac_api_key_secret(secret: str, key_hash: str) -> bool:
+    try:
+        _, _, pepper_id, expected = key_hash.split("$")
+        pepper = _api_key_pepper(int(pepper_id))
+    except ValueError:
+        return False
+    if pepper is None:
+        return False
+    return hmac.compare_digest(_hmac_api_key_digest(secret, pepper), expected)
+
+
+def verify_bcrypt_api_key_secret(secret: str, key_hash: str) -> bool:
+    return bcrypt.checkpw(secret.encode("utf-8"), key_hash.encode("utf-8"))
+
+
+# Async variants run on the hashing executor so request handlers never block
+# the event loop on bcrypt.
+
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    return await hashing_executor.run(verify_password, plain_password, hashed_password)
+
+
+async def get_password_hash_async(password: str) -> str:
+    return await hashing_executor.run(get_password_hash, password)
+
+
+async def verify_api_key_secret_async(secret: str, key_hash: str) -> bool:
+    if is_hmac_api_key_hash(key_hash):
+        return verify_hmac_api_key_secret(secret, key_hash)
+    return await hashing_executor.run(verify_bcrypt_api_key_secret, secret, key_hash)
@@ -0,0 +1,81 @@
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Hashable, List, Optional, Tuple
+
+from src.backend.core import metrics
+
+# What a follower's future resolves to when the leader was cancelled.
+_RETRY = object()
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent identical calls in this process: the first caller
+    for a key (the leader) runs the call, and callers that arrive while it
+    is in flight (followers) wait for its result instead of running their
+    own. Nothing is kept once the call finishes: a follower gets the result
+    of a read that was already running when it arrived, never an older one.
+
+    Followers can pass `share`, which the leader applies to the result for
+    each of them before anyone resumes, e.g. to attach ORM entities to the
+    follower's own session. Errors are shared too. If the leader is
+    cancelled, its followers run the call themselves.
+    """
+
+    def __init__(self):
+        self._flights: Dict[Hashable, List[Tuple[asyncio.Future, Optional[Callable]]]] = {}
+
+        self.leaders = 0
+        self.coalesced = 0
+
+    async def do(
+        self,
+        key: Hashable,
+        call: Callable[[], Awaitable[Any]],
+        share: Optional[Callable[[Any], Any]] = None,
+    ) -> Any:
+        followers = self._flights.get(key)
+        if followers is not None:
+            future = asyncio.get_running_loop().create_future()
+            followers.append((future, share))
+            self.coalesced += 1
+            result = await future
+            if result is not _RETRY:
+                return result
+            return await call()
+
+        followers = self._flights[key] = []
+        self.leaders += 1
+        try:
+            result = await call()
+        except asyncio.CancelledError:
+            self._finish(key, lambda future, share: future.set_result(_RETRY))
+            raise
+        except Exception as e:
+            self._finish(key, lambda future, share: future.set_exception(e))
+            raise
+
+        def resolve(future, share):
+            try:
+                future.set_result(share(result) if share else result)
+            except Exception as e:
+                future.set_exception(e)
+
+        self._finish(key, resolve)
+        return result
+
+    def _finish(self, key: Hashable, resolve: Callable) -> None:
+        for future, share in self._flights.pop(key):
+            # A follower that was cancelled no longer waits for anything.
+            if not future.done():
+                resolve(future, share)
+
+    def stats(self) -> dict:
+        return {
+            "in_flight": len(self._flights),
+            "leaders": self.leaders,
+            "coalesced": self.coalesced,
+        }
+
+
+single_flight = SingleFlight()
+metrics.register("single_flight", single_flight.stats)
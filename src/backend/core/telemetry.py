@@ -0,0 +1,477 @@
+import asyncio
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from typing import Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+import numpy as np
+
+from src.backend.core import metrics
+from src.backend.core.config import settings
+
+# Metrics an agent can report with a heartbeat, in column order.
+METRICS = ("utilization", "memory_utilization", "temperature_c", "power_w")
+
+# Every row holds the metrics, then the share of its raw samples that were idle.
+_IDLE = len(METRICS)
+_COLUMNS = len(METRICS) + 1
+
+# Bucket sizes of the downsampled tiers, in seconds.
+MINUTE = 60
+HOUR = 3600
+
+
+class _Ring:
+    """A preallocated ring of rows: start time, raw sample count, column means."""
+
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self.times = np.zeros(capacity, dtype=np.float64)
+        self.weights = np.zeros(capacity, dtype=np.float32)
+        self.values = np.full((capacity, _COLUMNS), np.nan, dtype=np.float32)
+        self.head = 0
+        self.size = 0
+
+    def append(self, at: float, weight: float, row: np.ndarray) -> None:
+        self.times[self.head] = at
+        self.weights[self.head] = weight
+        self.values[self.head] = row
+        self.head = (self.head + 1) % self.capacity
+        self.size = min(self.size + 1, self.capacity)
+
+    def covers(self, since: float) -> bool:
+        """Whether the ring still holds everything recorded since `since`."""
+        if self.size < self.capacity:
+            return True
+        return self.times[self.head] <= since
+
+    def rows(self) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """The rows, oldest first."""
+        if self.size < self.capacity:
+            return self.times[:self.size], self.weights[:self.size], self.values[:self.size]
+        order = np.r_[self.head:self.capacity, 0:self.head]
+        return self.times[order], self.weights[order], self.values[order]
+
+
+class _Bucket:
+    """The running, weighted means of the tier bucket being filled."""
+
+    def __init__(self, seconds: int):
+        self.seconds = seconds
+        self.start: Optional[float] = None
+        self.weight = 0.0
+        self.sums = np.zeros(_COLUMNS)
+        self.column_weights = np.zeros(_COLUMNS)
+
+    def add(self, weight: float, row: np.ndarray) -> None:
+        present = ~np.isnan(row)
+        self.weight += weight
+        self.sums[present] += row[present] * weight
+        self.column_weights[present] += weight
+
+    def mean(self) -> np.ndarray:
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return self.sums / self.column_weights
+
+    def reset(self, start: float) -> None:
+        self.start = start
+        self.weight = 0.0
+        self.sums[:] = 0
+        self.column_weights[:] = 0
+
+
+class _Series:
+    """
+    The telemetry of one GPU: raw samples, 1 minute means and 1 hour means,
+    each in a ring of fixed size. The minute and hour being filled are kept
+    as running means and written to their ring once the next one starts.
+    """
+
+    def __init__(self, organization_id: Optional[uuid.UUID], capacities: Sequence[int]):
+        self.organization_id = organization_id
+        self.first_seen: Optional[float] = None
+        self.rings = [_Ring(capacity) for capacity in capacities]
+        self.buckets = [_Bucket(MINUTE), _Bucket(HOUR)]
+
+    def record(self, at: float, row: np.ndarray) -> None:
+        if self.first_seen is None or at < self.first_seen:
+            self.first_seen = at
+        self.rings[0].append(at, 1.0, row)
+        self._roll_up(0, at, 1.0, row)
+
+    def _roll_up(self, level: int, at: float, weight: float, row: np.ndarray) -> None:
+        """Add a row of ring `level` to the bucket of ring `level + 1`."""
+        bucket = self.buckets[level]
+        start = at - at % bucket.seconds
+        if bucket.start is None:
+            bucket.reset(start)
+        elif start > bucket.start:
+            finished_start, finished_weight, finished = bucket.start, bucket.weight, bucket.mean()
+            self.rings[level + 1].append(finished_start, finished_weight, finished)
+            if level + 1 < len(self.buckets):
+                self._roll_up(level + 1, finished_start, finished_weight, finished)
+            bucket.reset(start)
+        # Late samples count towards the bucket being filled.
+        bucket.add(weight, row)
+
+    def window(self, since: float) -> Tuple[int, np.ndarray, np.ndarray]:
+        """
+        The rows since `since` from the finest ring that still holds all of
+        them, with the buckets being filled appended as partial rows.
+        Returns the rows' resolution in seconds (0 for raw samples), their
+        weights and their values.
+        """
+        level = next(
+            (level for level, ring in enumerate(self.rings) if ring.covers(since)),
+            len(self.rings) - 1,
+        )
+        times, weights, values = self.rings[level].rows()
+        resolution = self.buckets[level - 1].seconds if level else 0
+        # Each bucket below `level` holds what the next ring up does not yet.
+        pending = [bucket for bucket in self.buckets[:level] if bucket.weight]
+        if pending:
+            times = np.concatenate([times, [bucket.start for bucket in pending]])
+            weights = np.concatenate([weights, [bucket.weight for bucket in pending]])
+            values = np.concatenate([values, [bucket.mean() for bucket in pending]])
+        selected = times + resolution > since
+        return resolution, weights[selected], values[selected]
+
+    @property
+    def nbytes(self) -> int:
+        return sum(ring.times.nbytes + ring.weights.nbytes + ring.values.nbytes for ring in self.rings)
+
+
+def aggregate(windows: List[Tuple[int, np.ndarray, np.ndarray]]) -> Dict:
+    """
+    Mean, p95 and idle fraction over windows of rows. Means and the idle
+    fraction are weighted by raw sample count, so they are exact at any
+    resolution; p95 is over rows, i.e. over minute or hour means when the
+    window reaches past the raw samples.
+    """
+    resolution = max((window[0] for window in windows), default=0)
+    weights = np.concatenate([window[1] for window in windows] or [np.zeros(0, np.float32)])
+    values = np.concatenate(
+        [window[2] for window in windows] or [np.zeros((0, _COLUMNS), np.float32)]
+    ).astype(np.float64)
+    present = ~np.isnan(values)
+    column_weights = (present * weights[:, None]).sum(axis=0)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        means = np.where(present, values, 0.0).T @ weights / column_weights
+    p95 = np.full(_COLUMNS, np.nan)
+    for column in range(_COLUMNS):
+        if present[:, column].any():
+            p95[column] = np.percentile(values[present[:, column], column], 95)
+    return {
+        "samples": int(weights.sum()),
+        "resolution_seconds": resolution,
+        "mean": _metrics(means),
+        "p95": _metrics(p95),
+        "idle_fraction": _value(means[_IDLE]),
+    }
+
+
+def _value(value: float) -> Optional[float]:
+    return None if np.isnan(value) else round(float(value), 3)
+
+
+def _metrics(row: np.ndarray) -> Dict[str, Optional[float]]:
+    return {metric: _value(row[column]) for column, metric in enumerate(METRICS)}
+
+
+class TelemetryStore:
+    """
+    Per-GPU utilization, memory, temperature and power time series reported
+    with heartbeats, kept in this process.
+
+    Every GPU gets three preallocated rings: the last `raw_samples` samples,
+    `minute_samples` 1 minute means and `hour_samples` 1 hour means, so its
+    memory is fixed however long it reports. At most `max_gpus` GPUs are
+    tracked; the one that reported least recently is dropped to make room.
+    Queries use the finest ring that covers their window.
+
+    Like heartbeats, samples stay in the API process that received them.
+    The store is written to `snapshot_path` every `snapshot_interval`
+    seconds and on shutdown, and loaded from it on start.
+    """
+
+    def __init__(
+        self,
+        *,
+        raw_samples: int,
+        minute_samples: int,
+        hour_samples: int,
+        idle_utilization: float,
+        max_gpus: int,
+        snapshot_path: Optional[str] = None,
+        snapshot_interval: float = 300.0,
+        clock=time.time,
+    ):
+        self.capacities = (raw_samples, minute_samples, hour_samples)
+        self.idle_utilization = idle_utilization
+        self.max_gpus = max_gpus
+        self.snapshot_path = snapshot_path
+        self.snapshot_interval = snapshot_interval
+        self.clock = clock
+        self._series: "OrderedDict[uuid.UUID, _Series]" = OrderedDict()
+        self._by_organization: Dict[uuid.UUID, Set[uuid.UUID]] = {}
+        self._lock = threading.Lock()
+        self._task: Optional[asyncio.Task] = None
+
+        self.recorded = 0
+        self.evicted = 0
+        self.snapshots = 0
+        self.failed_snapshots = 0
+
+    def record(
+        self,
+        gpu_id: uuid.UUID,
+        organization_id: Optional[uuid.UUID],
+        sample: Sequence[Optional[float]],
+        at: Optional[float] = None,
+    ) -> None:
+        """Record a sample of `METRICS`; missing metrics are None."""
+        if all(value is None for value in sample):
+            return
+        row = np.array([np.nan if value is None else value for value in sample] + [np.nan])
+        if not np.isnan(row[0]):
+            row[_IDLE] = float(row[0] < self.idle_utilization)
+        with self._lock:
+            series = self._get_series(gpu_id, organization_id)
+            series.record(self.clock() if at is None else at, row)
+            self.recorded += 1
+
+    def gpu_telemetry(self, gpu_id: uuid.UUID, window_seconds: float) -> Optional[Dict]:
+        since = self.clock() - window_seconds
+        with self._lock:
+            series = self._series.get(gpu_id)
+            if series is None:
+                return None
+            window = series.window(since)
+        return aggregate([window])
+
+    def organization_telemetry(
+        self, organization_id: uuid.UUID, window_seconds: float
+    ) -> Tuple[Dict, Dict[uuid.UUID, Dict]]:
+        """The organization's aggregate over all its GPUs, and each GPU's."""
+        since = self.clock() - window_seconds
+        with self._lock:
+            windows = {
+                gpu_id: self._series[gpu_id].window(since)
+                for gpu_id in self._by_organization.get(organization_id, ())
+            }
+        per_gpu = {gpu_id: aggregate([window]) for gpu_id, window in windows.items()}
+        return aggregate(list(windows.values())), per_gpu
+
+    def idle_gpus(
+        self, organization_id: uuid.UUID, window_seconds: float, min_idle_fraction: float
+    ) -> Tuple[List[uuid.UUID], List[uuid.UUID]]:
+        """
+        Split the organization's GPUs that reported in the last
+        `window_seconds` into idle and active ones. A GPU is idle if at least
+        `min_idle_fraction` of its samples in the window were, and it has
+        reported for the whole window; a GPU that has not yet is neither.
+        """
+        since = self.clock() - window_seconds
+        idle, active = [], []
+        with self._lock:
+            for gpu_id in self._by_organization.get(organization_id, ()):
+                series = self._series[gpu_id]
+                _, weights, values = series.window(since)
+                reported = ~np.isnan(values[:, _IDLE])
+                samples = weights[reported].sum()
+                if not samples:
+                    continue
+                idle_fraction = (values[reported, _IDLE] * weights[reported]).sum() / samples
+                if idle_fraction < min_idle_fraction:
+                    active.append(gpu_id)
+                elif series.first_seen <= since:
+                    idle.append(gpu_id)
+        return idle, active
+
+    def _get_series(self, gpu_id: uuid.UUID, organization_id: Optional[uuid.UUID]) -> _Series:
+        series = self._series.get(gpu_id)
+        if series is None:
+            series = self._series[gpu_id] = _Series(organization_id, self.capacities)
+            while len(self._series) > self.max_gpus:
+                evicted_id, evicted = self._series.popitem(last=False)
+                self._unindex(evicted_id, evicted.organization_id)
+                self.evicted += 1
+        elif series.organization_id != organization_id:
+            # The GPU changed hands, e.g. it was claimed from the warm pool.
+            # The new owner starts from an empty series, so neither sees the
+            # other's samples or is judged idle on them.
+            self._unindex(gpu_id, series.organization_id)
+            series = self._series[gpu_id] = _Series(organization_id, self.capacities)
+        self._series.move_to_end(gpu_id)
+        if organization_id is not None:
+            self._by_organization.setdefault(organization_id, set()).add(gpu_id)
+        return series
+
+    def forget(self, gpu_ids: Iterable[uuid.UUID]) -> None:
+        """Drop the series of GPUs that left their organization."""
+        with self._lock:
+            for gpu_id in gpu_ids:
+                series = self._series.pop(gpu_id, None)
+                if series is not None:
+                    self._unindex(gpu_id, series.organization_id)
+
+    def _unindex(self, gpu_id: uuid.UUID, organization_id: Optional[uuid.UUID]) -> None:
+        gpu_ids = self._by_organization.get(organization_id)
+        if gpu_ids is not None:
+            gpu_ids.discard(gpu_id)
+            if not gpu_ids:
+                del self._by_organization[organization_id]
+
+    def snapshot(self, path: str) -> None:
+        """
+        Write every series to `path`, compacted: only the filled rows of each
+        ring, oldest first, concatenated across GPUs. The file is replaced
+        atomically.
+        """
+        with self._lock:
+            series = list(self._series.items())
+            arrays = {
+                "gpu_ids": np.array([str(gpu_id) for gpu_id, _ in series]),
+                "organization_ids": np.array(
+                    [str(s.organization_id or "") for _, s in series]
+                ),
+                "capacities": np.array(self.capacities),
+                "first_seen": np.array([s.first_seen for _, s in series], dtype=np.float64),
+            }
+            for level in range(len(self.capacities)):
+                rows = [s.rings[level].rows() for _, s in series]
+                arrays[f"sizes_{level}"] = np.array([len(times) for times, _, _ in rows], dtype=np.int64)
+                arrays[f"times_{level}"] = np.concatenate([r[0] for r in rows] or [np.zeros(0)])
+                arrays[f"weights_{level}"] = np.concatenate(
+                    [r[1] for r in rows] or [np.zeros(0, np.float32)]
+                )
+                arrays[f"values_{level}"] = np.concatenate(
+                    [r[2] for r in rows] or [np.zeros((0, _COLUMNS), np.float32)]
+                )
+            for level, seconds in enumerate((MINUTE, HOUR)):
+                buckets = [s.buckets[level] for _, s in series]
+                arrays[f"bucket_starts_{level}"] = np.array(
+                    [np.nan if b.start is None else b.start for b in buckets]
+                )
+                arrays[f"bucket_weights_{level}"] = np.array([b.weight for b in buckets])
+                arrays[f"bucket_sums_{level}"] = np.array(
+                    [b.sums for b in buckets]
+                ).reshape(-1, _COLUMNS)
+                arrays[f"bucket_column_weights_{level}"] = np.array(
+                    [b.column_weights for b in buckets]
+                ).reshape(-1, _COLUMNS)
+
+        temporary = f"{path}.tmp"
+        with open(temporary, "wb") as file:
+            np.savez_compressed(file, **arrays)
+        os.replace(temporary, path)
+
+    def load(self, path: str) -> None:
+        """Replace the store's contents with the snapshot at `path`."""
+        with np.load(path) as snapshot:
+            gpu_ids = [uuid.UUID(gpu_id) for gpu_id in snapshot["gpu_ids"]]
+            organization_ids = [
+                uuid.UUID(organization_id) if organization_id else None
+                for organization_id in snapshot["organization_ids"]
+            ]
+            first_seen = snapshot["first_seen"]
+            levels = []
+            for level in range(len(self.capacities)):
+                offsets = np.concatenate([[0], np.cumsum(snapshot[f"sizes_{level}"])])
+                levels.append(
+                    (
+                        offsets,
+                        snapshot[f"times_{level}"],
+                        snapshot[f"weights_{level}"],
+                        snapshot[f"values_{level}"],
+                    )
+                )
+            buckets = [
+                (
+                    snapshot[f"bucket_starts_{level}"],
+                    snapshot[f"bucket_weights_{level}"],
+                    snapshot[f"bucket_sums_{level}"],
+                    snapshot[f"bucket_column_weights_{level}"],
+                )
+                for level in range(2)
+            ]
+
+        with self._lock:
+            self._series.clear()
+            self._by_organization.clear()
+            for index, (gpu_id, organization_id) in enumerate(zip(gpu_ids, organization_ids)):
+                series = self._get_series(gpu_id, organization_id)
+                series.first_seen = float(first_seen[index])
+                for ring, (offsets, times, weights, values) in zip(series.rings, levels):
+                    # Rings may have shrunk since the snapshot: keep the newest rows.
+                    start = max(offsets[index], offsets[index + 1] - ring.capacity)
+                    for row in range(start, offsets[index + 1]):
+                        ring.append(times[row], weights[row], values[row])
+                for bucket, (starts, weights, sums, column_weights) in zip(series.buckets, buckets):
+                    if not np.isnan(starts[index]):
+                        bucket.start = float(starts[index])
+                        bucket.weight = float(weights[index])
+                        bucket.sums[:] = sums[index]
+                        bucket.column_weights[:] = column_weights[index]
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.snapshot_interval)
+            await self._snapshot()
+
+    async def _snapshot(self) -> None:
+        try:
+            await asyncio.to_thread(self.snapshot, self.snapshot_path)
+        except Exception as e:
+            print(f"Error writing telemetry snapshot: {e}")
+            self.failed_snapshots += 1
+            return
+        self.snapshots += 1
+
+    def start(self) -> None:
+        if not self.snapshot_path or self._task is not None:
+            return
+        if os.path.exists(self.snapshot_path):
+            try:
+                self.load(self.snapshot_path)
+            except Exception as e:
+                print(f"Error loading telemetry snapshot: {e}")
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+        await self._snapshot()
+
+    def stats(self) -> dict:
+        with self._lock:
+            nbytes = sum(series.nbytes for series in self._series.values())
+            gpus = len(self._series)
+        return {
+            "gpus": gpus,
+            "bytes": nbytes,
+            "recorded": self.recorded,
+            "evicted": self.evicted,
+            "snapshots": self.snapshots,
+            "failed_snapshots": self.failed_snapshots,
+        }
+
+
+telemetry_store = TelemetryStore(
+    raw_samples=settings.TELEMETRY_RAW_SAMPLES,
+    minute_samples=settings.TELEMETRY_MINUTE_SAMPLES,
+    hour_samples=settings.TELEMETRY_HOUR_SAMPLES,
+    idle_utilization=settings.TELEMETRY_IDLE_UTILIZATION,
+    max_gpus=settings.TELEMETRY_MAX_GPUS,
+    snapshot_path=settings.TELEMETRY_SNAPSHOT_PATH,
+    snapshot_interval=settings.TELEMETRY_SNAPSHOT_INTERVAL_SECONDS,
+)
+metrics.register("telemetry", telemetry_store.stats)
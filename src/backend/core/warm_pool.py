@@ -0,0 +1,143 @@
+import threading
+from abc import ABC, abstractmethod
+from typing import Dict, Iterable
+
+import redis.asyncio as redis
+
+from src.backend.core import metrics
+from src.backend.core.config import settings
+
+
+class WarmPoolStatsBackend(ABC):
+    """
+    Named counters shared by the API processes, which record hits and
+    misses, and the workers, which record cold starts and replenishment.
+    """
+
+    @abstractmethod
+    async def increment(self, counters: Dict[str, float]) -> None:
+        """Add each amount to its counter, creating counters as needed."""
+
+    @abstractmethod
+    async def read(self) -> Dict[str, float]:
+        """Return every counter."""
+
+    async def close(self) -> None:
+        """Release any connections held by the backend."""
+
+
+class InMemoryWarmPoolStatsBackend(WarmPoolStatsBackend):
+    """
+    Counters held in this process. Only complete when the API and the
+    workers share a process (development, eager Celery, tests).
+    """
+
+    def __init__(self):
+        self._counters: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    async def increment(self, counters: Dict[str, float]) -> None:
+        with self._lock:
+            for name, amount in counters.items():
+                self._counters[name] = self._counters.get(name, 0) + amount
+
+    async def read(self) -> Dict[str, float]:
+        with self._lock:
+            return dict(self._counters)
+
+
+class RedisWarmPoolStatsBackend(WarmPoolStatsBackend):
+    """Counters in the Redis hash `warm_pool:stats`, shared by every process."""
+
+    key = "warm_pool:stats"
+
+    def __init__(self, redis_url: str):
+        self._redis = redis.from_url(redis_url, decode_responses=True)
+
+    async def increment(self, counters: Dict[str, float]) -> None:
+        async with self._redis.pipeline(transaction=False) as pipe:
+            for name, amount in counters.items():
+                pipe.hincrbyfloat(self.key, name, amount)
+            await pipe.execute()
+
+    async def read(self) -> Dict[str, float]:
+        return {name: float(value) for name, value in (await self._redis.hgetall(self.key)).items()}
+
+    async def close(self) -> None:
+        await self._redis.aclose()
+
+
+class WarmPoolStats:
+    """
+    Hit rate and time-to-ready for allocations.
+
+    A hit is an allocation served from the warm pool, ready as soon as the
+    claim commits; a miss falls back to cold provisioning, whose time-to-ready
+    is recorded by the worker once the instance is running. The counters live
+    in `backend`, so `/metrics` on any API process reports the whole fleet.
+    """
+
+    def __init__(self, backend: WarmPoolStatsBackend):
+        self.backend = backend
+
+    async def record_hit(self, ready_seconds: float) -> None:
+        await self.backend.increment({"hits": 1, "hit_ready_seconds": ready_seconds})
+
+    async def record_miss(self) -> None:
+        await self.backend.increment({"misses": 1})
+
+    async def record_cold_ready(self, ready_seconds: Iterable[float]) -> None:
+        ready_seconds = list(ready_seconds)
+        if ready_seconds:
+            await self.backend.increment(
+                {"cold_ready_count": len(ready_seconds), "cold_ready_seconds": sum(ready_seconds)}
+            )
+
+    async def record_launched(self, count: int) -> None:
+        if count:
+            await self.backend.increment({"launched": count})
+
+    async def close(self) -> None:
+        await self.backend.close()
+
+    async def stats(self) -> dict:
+        counters = await self.backend.read()
+        hits = int(counters.get("hits", 0))
+        misses = int(counters.get("misses", 0))
+        cold_ready_count = int(counters.get("cold_ready_count", 0))
+        total = hits + misses
+        return {
+            "hits": hits,
+            "misses": misses,
+            "hit_rate": hits / total if total else 0.0,
+            "avg_hit_ready_seconds": counters.get("hit_ready_seconds", 0.0) / hits if hits else 0.0,
+            "avg_cold_ready_seconds": (
+                counters.get("cold_ready_seconds", 0.0) / cold_ready_count
+                if cold_ready_count
+                else 0.0
+            ),
+            "replenish_launched": int(counters.get("launched", 0)),
+        }
+
+
+_in_memory_backend = None
+
+
+def create_warm_pool_stats() -> WarmPoolStats:
+    """
+    Build warm pool stats over the configured backend. As with quotas, Redis
+    backends are bound to the running event loop, while the in-memory
+    backend is a process singleton.
+    """
+    global _in_memory_backend
+    if settings.WARM_POOL_STATS_BACKEND == "memory":
+        if _in_memory_backend is None:
+            _in_memory_backend = InMemoryWarmPoolStatsBackend()
+        return WarmPoolStats(_in_memory_backend)
+    if settings.WARM_POOL_STATS_BACKEND == "redis":
+        return WarmPoolStats(RedisWarmPoolStatsBackend(settings.REDIS_URL))
+    raise ValueError(f"Unknown warm pool stats backend: {settings.WARM_POOL_STATS_BACKEND!r}")
+
+
+warm_pool_stats = create_warm_pool_stats()
+metrics.register("warm_pool", warm_pool_stats.stats)
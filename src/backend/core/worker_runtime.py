@@ -0,0 +1,126 @@
+import asyncio
+import threading
+from typing import Coroutine, Optional
+
+from celery.concurrency import get_implementation
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker, create_async_engine
+
+from src.backend.cloud import CloudProvider, create_cloud_provider
+from src.backend.core.config import settings
+from src.backend.core.gpu_cache import GPUCache, create_gpu_cache
+from src.backend.core.rate_limit import create_cloud_api_guard
+from src.backend.core.quota import QuotaBackend, create_quota_backend
+from src.backend.core.scheduler import FairShareScheduler, create_scheduler
+from src.backend.core.warm_pool import WarmPoolStats, create_warm_pool_stats
+
+
+class WorkerRuntime:
+    """
+    Long-lived state of a Celery worker process: one event loop that every
+    task runs on, a pooled database engine and the Redis-backed quota,
+    scheduler, GPU cache and warm pool stats clients bound to that loop, and
+    the cloud provider with its cached API clients.
+
+    `start` runs from the `worker_process_init` hook, after the fork, so
+    nothing is shared with the parent process. Pools that do not fork (solo,
+    eager tasks) start the runtime lazily on the first task.
+
+    Tasks must run one at a time on the thread that started the runtime, so
+    only the prefork and solo pools are supported. The threads, gevent and
+    eventlet pools are refused by `check_pool` at worker start, and any task
+    run concurrently or from another thread fails.
+    """
+
+    supported_pools = ("prefork", "solo")
+
+    def __init__(self):
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+        self.engine: Optional[AsyncEngine] = None
+        self._session_factory: Optional[async_sessionmaker] = None
+        self.quota: Optional[QuotaBackend] = None
+        self.scheduler: Optional[FairShareScheduler] = None
+        self.gpu_cache: Optional[GPUCache] = None
+        self.warm_pool_stats: Optional[WarmPoolStats] = None
+        self.cloud: Optional[CloudProvider] = None
+        self._thread: Optional[int] = None
+        self._lock = threading.Lock()
+
+    @property
+    def started(self) -> bool:
+        return self.loop is not None
+
+    def start(self) -> None:
+        with self._lock:
+            if self.started:
+                return
+            self.loop = asyncio.new_event_loop()
+            asyncio.set_event_loop(self.loop)
+            self._thread = threading.get_ident()
+            self.engine = create_async_engine(
+                settings.DATABASE_URL,
+                pool_size=settings.WORKER_DB_POOL_SIZE,
+                max_overflow=settings.WORKER_DB_MAX_OVERFLOW,
+                pool_pre_ping=True,
+            )
+            self._session_factory = async_sessionmaker(
+                bind=self.engine,
+                autocommit=False,
+                autoflush=False,
+                expire_on_commit=False,
+            )
+            self.quota = create_quota_backend()
+            self.scheduler = create_scheduler()
+            self.gpu_cache = create_gpu_cache()
+            self.warm_pool_stats = create_warm_pool_stats()
+            self.cloud = create_cloud_provider(create_cloud_api_guard())
+
+    def shutdown(self) -> None:
+        with self._lock:
+            if not self.started:
+                return
+            try:
+                self.loop.run_until_complete(self._close())
+            finally:
+                self.loop.close()
+                self.loop = None
+                self._thread = None
+                self.engine = None
+                self._session_factory = None
+                self.quota = None
+                self.scheduler = None
+                self.gpu_cache = None
+                self.warm_pool_stats = None
+                self.cloud = None
+
+    async def _close(self) -> None:
+        await self.quota.close()
+        await self.scheduler.close()
+        await self.gpu_cache.close()
+        await self.warm_pool_stats.close()
+        await self.engine.dispose()
+
+    def check_pool(self, pool) -> None:
+        """Raise if `pool`, a Celery pool alias or class, runs tasks concurrently."""
+        if get_implementation(pool) not in {get_implementation(p) for p in self.supported_pools}:
+            raise RuntimeError(
+                f"Unsupported Celery pool {pool!r}: the worker runtime supports "
+                f"only {', '.join(self.supported_pools)}"
+            )
+
+    def run(self, coro: Coroutine):
+        """Run a task's coroutine to completion on the process event loop."""
+        if not self.started:
+            self.start()
+        if threading.get_ident() != self._thread or self.loop.is_running():
+            coro.close()
+            raise RuntimeError(
+                "Worker tasks must run one at a time on one thread; "
+                f"use one of the {', '.join(self.supported_pools)} pools"
+            )
+        return self.loop.run_until_complete(coro)
+
+    def session(self) -> AsyncSession:
+        return self._session_factory()
+
+
+runtime = WorkerRuntime()
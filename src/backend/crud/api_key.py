@@ -1,15 +1,18 @@
 import secrets
-import bcrypt
 from datetime import datetime, timedelta, timezone
-from typing import Optional
+from typing import List, Optional, Tuple
 import uuid
 
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
 from sqlalchemy.orm import selectinload
 
+from src.backend.core.auth_cache import key_revocations, verified_key_cache
+from src.backend.core.pagination import PageKey, PageParams
+from src.backend.core.security import hash_api_key_secret
 from src.backend.crud.base import CRUDBase
-from src.backend.models.user import APIKey, User
+from src.backend.models.api_key import APIKey
+from src.backend.models.user import User
 from src.backend.schemas.api_key import APIKeyCreate, APIKeyUpdate
 
 
@@ -20,7 +23,7 @@ class CRUDAPIKey(CRUDBase[APIKey, APIKeyCreate, APIKeyUpdate]):
         return f"{prefix}.{secret}", prefix, secret
 
     def hash_secret(self, secret: str) -> str:
-        return bcrypt.hashpw(secret.encode("utf-8"), bcrypt.gensalt()).decode("utf-8")
+        return hash_api_key_secret(secret)
 
     async def create_with_owner(
         self, db: AsyncSession, *, obj_in: APIKeyCreate, owner: User
@@ -45,15 +48,10 @@ class CRUDAPIKey(CRUDBase[APIKey, APIKeyCreate, APIKeyUpdate]):
         return db_obj, key
 
     async def get_multi_by_user(
-        self, db: AsyncSession, *, user_id: uuid.UUID, skip: int = 0, limit: int = 100
-    ) -> list[APIKey]:
-        result = await db.execute(
-            select(self.model)
-            .filter(self.model.user_id == user_id)
-            .offset(skip)
-            .limit(limit)
-        )
-        return result.scalars().all()
+        self, db: AsyncSession, *, user_id: uuid.UUID, page: PageParams
+    ) -> Tuple[List[APIKey], Optional[PageKey]]:
+        query = select(self.model).filter(self.model.user_id == user_id)
+        return await self.get_page(db, query, page=page)
 
     async def get_by_prefix(self, db: AsyncSession, *, prefix: str) -> Optional[APIKey]:
         result = await db.execute(
@@ -63,5 +61,18 @@ class CRUDAPIKey(CRUDBase[APIKey, APIKeyCreate, APIKeyUpdate]):
         )
         return result.scalars().first()
 
+    async def revoke(self, db: AsyncSession, *, db_obj: APIKey) -> APIKey:
+        """
+        Delete an API key and drop it from the verified key cache so it stops
+        authenticating immediately, in every API process. The revocation is
+        shared first, so a key is never deleted while other processes could
+        keep accepting it from their cache.
+        """
+        await key_revocations.revoke(db_obj.id)
+        await db.delete(db_obj)
+        await db.commit()
+        verified_key_cache.invalidate_key(db_obj.id)
+        return db_obj
+
 
 api_key = CRUDAPIKey(APIKey)
@@ -1,11 +1,27 @@
-from typing import Any, Dict, Generic, List, Optional, Type, TypeVar, Union
+from typing import (
+    Any,
+    Awaitable,
+    Callable,
+    Dict,
+    Generic,
+    Hashable,
+    List,
+    Optional,
+    Tuple,
+    Type,
+    TypeVar,
+    Union,
+)
 
 from fastapi.encoders import jsonable_encoder
 from pydantic import BaseModel
+from sqlalchemy import Select, tuple_
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
 
 from src.backend.core.database import Base
+from src.backend.core.pagination import PageKey, PageParams
+from src.backend.core.single_flight import single_flight
 
 ModelType = TypeVar("ModelType", bound=Base)
 CreateSchemaType = TypeVar("CreateSchemaType", bound=BaseModel)
@@ -22,8 +38,75 @@ class CRUDBase(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
         self.model = model
 
     async def get(self, db: AsyncSession, id: Any) -> Optional[ModelType]:
-        result = await db.execute(select(self.model).filter(self.model.id == id))
-        return result.scalars().first()
+        async def get():
+            result = await db.execute(select(self.model).filter(self.model.id == id))
+            return result.scalars().first()
+
+        def share(obj):
+            return obj and db.sync_session.merge(obj, load=False)
+
+        return await self.coalesce(db, ("get", id), get, share)
+
+    async def coalesce(
+        self,
+        db: AsyncSession,
+        key: Hashable,
+        call: Callable[[], Awaitable[Any]],
+        share: Optional[Callable[[Any], Any]] = None,
+    ) -> Any:
+        """
+        Run the read `call` once for every concurrent caller with the same
+        `key` and database. Entities in the result must be handed to each
+        follower's session by `share`. Sessions that must see their own
+        writes always run their own read.
+        """
+        info = db.sync_session.info
+        if info.get("wrote") or info.get("read_your_writes") or db.new or db.dirty or db.deleted:
+            return await call()
+        return await single_flight.do((self.model, db.bind, key), call, share)
+
+    async def get_page(
+        self, db: AsyncSession, query: Select, *, page: PageParams, key: Optional[Hashable] = None
+    ) -> Tuple[List[ModelType], Optional[PageKey]]:
+        """
+        Return a page of `query` in (created_at, id) order, and the key the
+        next page starts after (None on the last page). Pages are found with
+        `(created_at, id) > key` rather than OFFSET, so with an index ending
+        in (created_at, id) every page costs the same however deep it is.
+
+        A query for the model returns entities; a query for columns, which
+        must include created_at and id, returns rows. Concurrent reads of
+        the same page are coalesced when `key` identifies the query.
+        """
+        if page.after is not None:
+            query = query.where(tuple_(self.model.created_at, self.model.id) > tuple_(*page.after))
+        elif page.skip:
+            query = query.offset(page.skip)
+        entities = query.column_descriptions[0]["type"] is self.model
+
+        async def get_page():
+            result = await db.execute(
+                query.order_by(self.model.created_at, self.model.id).limit(page.limit + 1)
+            )
+            rows = result.scalars().all() if entities else result.all()
+            if len(rows) <= page.limit:
+                return rows, None
+            rows = rows[:page.limit]
+            return rows, (rows[-1].created_at, rows[-1].id)
+
+        if key is None:
+            return await get_page()
+
+        def share(result):
+            rows, next_key = result
+            return [db.sync_session.merge(row, load=False) for row in rows], next_key
+
+        return await self.coalesce(
+            db,
+            ("page", key, page.after, page.limit, page.skip),
+            get_page,
+            share if entities else None,
+        )
 
     async def create(self, db: AsyncSession, *, obj_in: CreateSchemaType) -> ModelType:
         obj_in_data = jsonable_encoder(obj_in)
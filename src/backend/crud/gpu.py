@@ -1,23 +1,522 @@
-from typing import List, Optional
+from datetime import datetime
+from typing import AsyncIterator, Dict, Iterable, List, NamedTuple, Optional, Set, Tuple
 import uuid
 
+from sqlalchemy import DateTime, String, case, cast, column, func, update, values
+from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
 
+from src.backend.core.pagination import PageKey, PageParams
+from src.backend.core.provisioning import Transition
 from src.backend.crud.base import CRUDBase
-from src.backend.models.gpu import GPU, GpuStatus
+from src.backend.models.gpu import (
+    ACTIVE_GPU_STATUSES,
+    GPU,
+    LEASED_GPU_STATUSES,
+    GpuHealthState,
+    GpuStatus,
+)
 from src.backend.schemas.gpu import GPUCreate, GPUUpdate
 
 
+class IdleGPU(NamedTuple):
+    """A GPU the idle reclaimer found idle, and what its policy allows."""
+    id: uuid.UUID
+    organization_id: uuid.UUID
+    # The lease to cut the GPU's to when it is flagged, if any.
+    lease_expires_at: Optional[datetime]
+    # Flagged GPUs are reclaimed if flagged before this, if at all.
+    flagged_before: Optional[datetime]
+
+
 class CRUDGpu(CRUDBase[GPU, GPUCreate, GPUUpdate]):
     async def get_multi_by_owner(
-        self, db: AsyncSession, *, organization_id: uuid.UUID, status: Optional[GpuStatus] = None
-    ) -> List[GPU]:
-        query = select(self.model).filter(self.model.organization_id == organization_id)
+        self,
+        db: AsyncSession,
+        *,
+        organization_id: uuid.UUID,
+        status: Optional[GpuStatus] = None,
+        page: PageParams,
+    ) -> Tuple[List[GPU], Optional[PageKey]]:
+        """
+        A page of an organization's GPUs, oldest first. DEPROVISIONED GPUs
+        are only listed when asked for with `status`.
+        """
+        query = _owned_by(select(self.model), organization_id, status)
+        return await self.get_page(db, query, page=page, key=("owner", organization_id, status))
+
+    async def get_rows_by_owner(
+        self,
+        db: AsyncSession,
+        *,
+        organization_id: uuid.UUID,
+        status: Optional[GpuStatus] = None,
+        page: PageParams,
+    ) -> Tuple[List, Optional[PageKey]]:
+        """
+        The same page as `get_multi_by_owner`, as rows of `GPU_COLUMNS`
+        rather than entities: nothing is added to the identity map or
+        instrumented, which is most of the cost of large pages.
+        """
+        query = _owned_by(select(*GPU_COLUMNS), organization_id, status)
+        return await self.get_page(
+            db, query, page=page, key=("owner_rows", organization_id, status)
+        )
+
+    async def get_row(self, db: AsyncSession, id: uuid.UUID):
+        """A GPU as a row of `GPU_COLUMNS`, or None."""
+        async def get_row():
+            result = await db.execute(select(*GPU_COLUMNS).where(self.model.id == id))
+            return result.first()
+
+        return await self.coalesce(db, ("row", id), get_row)
+
+    async def get_owned_ids(
+        self, db: AsyncSession, *, organization_id: uuid.UUID, gpu_ids: Iterable[uuid.UUID]
+    ) -> Set[uuid.UUID]:
+        """The GPUs among `gpu_ids` that belong to the organization."""
+        result = await db.execute(
+            select(self.model.id).where(
+                self.model.id.in_(list(gpu_ids)), self.model.organization_id == organization_id
+            )
+        )
+        return set(result.scalars().all())
+
+    async def stream_export(
+        self,
+        db: AsyncSession,
+        *,
+        organization_id: uuid.UUID,
+        status: Optional[GpuStatus] = None,
+        health_state: Optional[GpuHealthState] = None,
+        created_after: Optional[datetime] = None,
+        created_before: Optional[datetime] = None,
+        updated_after: Optional[datetime] = None,
+        chunk_rows: int,
+    ) -> AsyncIterator[List]:
+        """
+        Stream an organization's GPUs, oldest first, as lists of up to
+        `chunk_rows` column rows. The rows come from a server-side cursor, so
+        only one chunk is in memory at a time.
+        """
+        query = select(*GPU_COLUMNS).where(self.model.organization_id == organization_id)
         if status:
-            query = query.filter(self.model.status == status)
-        result = await db.execute(query)
-        return result.scalars().all()
+            query = query.where(self.model.status == status)
+        if health_state:
+            query = query.where(self.model.health_state == health_state)
+        if created_after:
+            query = query.where(self.model.created_at >= created_after)
+        if created_before:
+            query = query.where(self.model.created_at < created_before)
+        if updated_after:
+            query = query.where(self.model.updated_at >= updated_after)
+        result = await db.stream(
+            query.order_by(self.model.created_at, self.model.id).execution_options(yield_per=chunk_rows)
+        )
+        async for rows in result.partitions():
+            yield rows
+
+    async def claim_warm(
+        self,
+        db: AsyncSession,
+        *,
+        gpu_model: str,
+        region: str,
+        organization_id: uuid.UUID,
+        user_id: uuid.UUID,
+        lease_expires_at: datetime,
+    ) -> Optional[GPU]:
+        """
+        Claim the oldest available warm pool GPU for a model and region and
+        bind it to the caller. Rows locked by concurrent claims are skipped,
+        so parallel allocations never wait on or double-claim the same GPU.
+        The caller must commit (or roll back to give the GPU back).
+        """
+        result = await db.execute(
+            select(self.model)
+            .where(
+                self.model.organization_id.is_(None),
+                self.model.status == GpuStatus.AVAILABLE,
+                self.model.gpu_model == gpu_model,
+                self.model.region == region,
+            )
+            .order_by(self.model.created_at)
+            .limit(1)
+            .with_for_update(skip_locked=True)
+        )
+        gpu = result.scalars().first()
+        if gpu is None:
+            return None
+
+        gpu.organization_id = organization_id
+        gpu.user_id = user_id
+        gpu.lease_expires_at = lease_expires_at
+        await db.flush()
+        return gpu
+
+    async def count_warm_pool(self, db: AsyncSession) -> Dict[Tuple[str, str], int]:
+        """Count unassigned GPUs that are ready or on their way, per (model, region)."""
+        result = await db.execute(
+            select(self.model.gpu_model, self.model.region, func.count(self.model.id))
+            .where(
+                self.model.organization_id.is_(None),
+                self.model.status.in_([GpuStatus.PROVISIONING, GpuStatus.AVAILABLE]),
+            )
+            .group_by(self.model.gpu_model, self.model.region)
+        )
+        return {(gpu_model, region): count for gpu_model, region, count in result}
+
+    async def get_unlaunched_warm(self, db: AsyncSession, *, created_before: datetime) -> List:
+        """Warm pool GPUs created before `created_before` whose launch never started."""
+        result = await db.execute(
+            select(self.model.id, self.model.gpu_model, self.model.region).where(
+                self.model.organization_id.is_(None),
+                self.model.status == GpuStatus.PROVISIONING,
+                self.model.instance_id.is_(None),
+                self.model.created_at < created_before,
+            )
+        )
+        return result.all()
+
+    async def get_launching(self, db: AsyncSession) -> List:
+        """GPUs still PROVISIONING whose instances have been launched."""
+        result = await db.execute(
+            select(
+                self.model.id,
+                self.model.organization_id,
+                self.model.region,
+                self.model.gang_id,
+                self.model.all_or_nothing,
+                self.model.placement_group,
+                self.model.instance_id,
+                self.model.created_at,
+            ).where(
+                self.model.status == GpuStatus.PROVISIONING,
+                self.model.instance_id.is_not(None),
+            )
+        )
+        return result.all()
+
+    async def apply_transitions(self, db: AsyncSession, transitions: List[Transition]) -> List:
+        """
+        Apply provisioning transitions in one statement and return the rows
+        that actually moved. The caller must commit.
+        """
+        if not transitions:
+            return []
+        result = await db.execute(build_transition_update(transitions))
+        return result.all()
+
+    async def claim_expired(self, db: AsyncSession, *, now: datetime, limit: int) -> List:
+        """
+        Move up to `limit` GPUs whose lease has expired to DEPROVISIONING and
+        return them. The caller must commit.
+        """
+        result = await db.execute(build_expire_leases_update(now, limit))
+        return result.all()
+
+    async def claim_stuck_deprovisioning(
+        self, db: AsyncSession, *, updated_before: datetime, limit: int
+    ) -> List:
+        """
+        Re-claim GPUs left in DEPROVISIONING since `updated_before` (their
+        termination failed) so they can be retried. The caller must commit.
+        """
+        stuck = (
+            select(self.model.id)
+            .where(
+                self.model.status == GpuStatus.DEPROVISIONING,
+                self.model.updated_at < updated_before,
+            )
+            .limit(limit)
+            .with_for_update(skip_locked=True)
+            .scalar_subquery()
+        )
+        result = await db.execute(
+            update(self.model)
+            .where(self.model.id.in_(stuck))
+            .values(status=GpuStatus.DEPROVISIONING)
+            .returning(*_SWEPT_COLUMNS)
+            .execution_options(synchronize_session=False)
+        )
+        return result.all()
+
+    async def mark_deprovisioned(self, db: AsyncSession, gpu_ids: List[uuid.UUID]) -> None:
+        """Finish de-provisioning GPUs in one statement. The caller must commit."""
+        if not gpu_ids:
+            return
+        await db.execute(
+            update(self.model)
+            .where(self.model.id.in_(gpu_ids), self.model.status == GpuStatus.DEPROVISIONING)
+            .values(status=GpuStatus.DEPROVISIONED)
+            .execution_options(synchronize_session=False)
+        )
+
+    async def get_idle_by_owner(self, db: AsyncSession, *, organization_id: uuid.UUID) -> List:
+        """
+        The organization's leased GPUs flagged as idle, longest idle first.
+        There are at most as many as the organization's GPU quota.
+        """
+        result = await db.execute(
+            select(self.model.id, self.model.idle_since, self.model.lease_expires_at)
+            .where(
+                self.model.organization_id == organization_id,
+                self.model.status.in_(LEASED_GPU_STATUSES),
+                self.model.idle_since.is_not(None),
+            )
+            .order_by(self.model.idle_since)
+        )
+        return result.all()
+
+    async def flag_idle(self, db: AsyncSession, idle: List[IdleGPU]) -> List[uuid.UUID]:
+        """
+        Flag idle GPUs that are not flagged yet and cut their leases, and
+        return them. The caller must commit.
+        """
+        if not idle:
+            return []
+        result = await db.execute(build_flag_idle_update(idle))
+        return list(result.scalars().all())
+
+    async def clear_idle(
+        self,
+        db: AsyncSession,
+        *,
+        gpu_ids: Optional[List[uuid.UUID]] = None,
+        organization_id: Optional[uuid.UUID] = None,
+    ) -> List[uuid.UUID]:
+        """
+        Clear the idle flag of GPUs, or of all of an organization's, and
+        return those that had it. The caller must commit.
+        """
+        query = update(self.model).where(self.model.idle_since.is_not(None))
+        if gpu_ids is not None:
+            if not gpu_ids:
+                return []
+            query = query.where(self.model.id.in_(gpu_ids))
+        if organization_id is not None:
+            query = query.where(self.model.organization_id == organization_id)
+        result = await db.execute(
+            query.values(idle_since=None)
+            .returning(self.model.id)
+            .execution_options(synchronize_session=False)
+        )
+        return list(result.scalars().all())
+
+    async def claim_idle(self, db: AsyncSession, idle: List[IdleGPU]) -> List:
+        """
+        Move GPUs that are still idle and were flagged before their deadline
+        to DEPROVISIONING, and return them. The caller must commit.
+        """
+        if not idle:
+            return []
+        result = await db.execute(build_claim_idle_update(idle))
+        return result.all()
+
+    async def return_to_warm_pool(
+        self, db: AsyncSession, gpu_ids: List[uuid.UUID], *, lease_expires_at: datetime
+    ) -> None:
+        """
+        Put claimed GPUs back in the warm pool instead of terminating them.
+        The caller must commit.
+        """
+        if not gpu_ids:
+            return
+        await db.execute(
+            update(self.model)
+            .where(self.model.id.in_(gpu_ids), self.model.status == GpuStatus.DEPROVISIONING)
+            .values(
+                status=GpuStatus.AVAILABLE,
+                organization_id=None,
+                user_id=None,
+                idle_since=None,
+                lease_expires_at=lease_expires_at,
+            )
+            .execution_options(synchronize_session=False)
+        )
+
+    async def get_deprovisioning(self, db: AsyncSession, gpu_ids: Iterable[uuid.UUID]) -> List:
+        """The GPUs among `gpu_ids` still in DEPROVISIONING, as the lease sweeper claims them."""
+        result = await db.execute(
+            select(*_SWEPT_COLUMNS).where(
+                self.model.id.in_(list(gpu_ids)), self.model.status == GpuStatus.DEPROVISIONING
+            )
+        )
+        return result.all()
+
+    async def get_active_gangs(self, db: AsyncSession, gang_ids: Iterable[uuid.UUID]) -> Set[uuid.UUID]:
+        """Return the gangs among `gang_ids` that still have active GPUs."""
+        gang_ids = list(gang_ids)
+        if not gang_ids:
+            return set()
+        result = await db.execute(
+            select(self.model.gang_id)
+            .where(self.model.gang_id.in_(gang_ids), self.model.status.in_(ACTIVE_GPU_STATUSES))
+            .distinct()
+        )
+        return set(result.scalars().all())
+
+
+# Columns of the GPU schema, which listings and exports select without
+# loading entities.
+GPU_COLUMNS = (
+    GPU.id,
+    GPU.organization_id,
+    GPU.user_id,
+    GPU.gpu_model,
+    GPU.region,
+    GPU.gang_id,
+    GPU.instance_id,
+    GPU.instance_public_ip,
+    GPU.status,
+    GPU.health_state,
+    GPU.lease_expires_at,
+    GPU.idle_since,
+    GPU.created_at,
+    GPU.updated_at,
+)
+
+# Columns the lease sweeper needs to terminate a GPU and release its quota.
+_SWEPT_COLUMNS = (
+    GPU.id,
+    GPU.organization_id,
+    GPU.region,
+    GPU.instance_id,
+    GPU.gang_id,
+    GPU.placement_group,
+)
+
+
+def _owned_by(query, organization_id: uuid.UUID, status: Optional[GpuStatus]):
+    query = query.where(GPU.organization_id == organization_id)
+    if status:
+        return query.where(GPU.status == status)
+    return query.where(GPU.status != GpuStatus.DEPROVISIONED)
+
+
+def build_flag_idle_update(idle: List[IdleGPU]):
+    """
+    Build `UPDATE gpus SET idle_since = now(), lease_expires_at = ... FROM
+    (VALUES ...) AS idle WHERE ... RETURNING gpus.id`. Only leased, unflagged
+    GPUs still owned by the organization that reported them idle are
+    touched. Leases are cut to `lease_expires_at` where that is earlier.
+    """
+    flag = _idle_values(idle)
+    return (
+        update(GPU)
+        .where(
+            GPU.id == flag.c.id,
+            GPU.organization_id == flag.c.organization_id,
+            GPU.status.in_(LEASED_GPU_STATUSES),
+            GPU.idle_since.is_(None),
+        )
+        .values(
+            idle_since=func.now(),
+            lease_expires_at=case(
+                (flag.c.lease_expires_at < GPU.lease_expires_at, flag.c.lease_expires_at),
+                else_=GPU.lease_expires_at,
+            ),
+        )
+        .returning(GPU.id)
+        .execution_options(synchronize_session=False)
+    )
+
+
+def build_claim_idle_update(idle: List[IdleGPU]):
+    """
+    Build `UPDATE gpus SET status = 'DEPROVISIONING' FROM (VALUES ...) AS
+    idle WHERE ... RETURNING ...`, claiming leased GPUs still owned by the
+    organization that reported them idle and flagged before `flagged_before`.
+    """
+    claim = _idle_values(idle)
+    return (
+        update(GPU)
+        .where(
+            GPU.id == claim.c.id,
+            GPU.organization_id == claim.c.organization_id,
+            GPU.status.in_(LEASED_GPU_STATUSES),
+            GPU.idle_since <= claim.c.flagged_before,
+        )
+        .values(status=GpuStatus.DEPROVISIONING)
+        .returning(*_SWEPT_COLUMNS, GPU.gpu_model)
+        .execution_options(synchronize_session=False)
+    )
+
+
+def _idle_values(idle: List[IdleGPU]):
+    return values(
+        column("id", UUID(as_uuid=True)),
+        column("organization_id", UUID(as_uuid=True)),
+        column("lease_expires_at", DateTime(timezone=True)),
+        column("flagged_before", DateTime(timezone=True)),
+        name="idle",
+    ).data([tuple(gpu) for gpu in idle])
+
+
+def build_expire_leases_update(now: datetime, limit: int):
+    """
+    Build `UPDATE gpus SET status = 'DEPROVISIONING' WHERE id IN (SELECT id
+    FROM gpus WHERE lease_expires_at < :now ... ORDER BY lease_expires_at
+    LIMIT :limit FOR UPDATE SKIP LOCKED) RETURNING ...`. The subselect walks
+    the partial `ix_gpus_lease_expires_at_leased`, and rows locked by a
+    concurrent sweep are skipped rather than waited on.
+    """
+    expired = (
+        select(GPU.id)
+        .where(
+            GPU.lease_expires_at < now,
+            GPU.status.in_(LEASED_GPU_STATUSES),
+        )
+        .order_by(GPU.lease_expires_at)
+        .limit(limit)
+        .with_for_update(skip_locked=True)
+        .scalar_subquery()
+    )
+    return (
+        update(GPU)
+        .where(GPU.id.in_(expired))
+        .values(status=GpuStatus.DEPROVISIONING)
+        .returning(*_SWEPT_COLUMNS)
+        .execution_options(synchronize_session=False)
+    )
+
+
+def build_transition_update(transitions: List[Transition]):
+    """
+    Build `UPDATE gpus SET status = ..., instance_public_ip = ... FROM
+    (VALUES ...) AS transition WHERE ... RETURNING ...`. Only GPUs that are
+    still PROVISIONING are touched, so concurrent reconcilers cannot apply a
+    transition twice.
+    """
+    transition = values(
+        column("id", UUID(as_uuid=True)),
+        column("status", String),
+        column("instance_public_ip", String),
+        name="transition",
+    ).data([(t.gpu_id, t.status.value, t.instance_public_ip) for t in transitions])
+    return (
+        update(GPU)
+        .where(GPU.id == transition.c.id)
+        .where(GPU.status == GpuStatus.PROVISIONING)
+        .values(
+            status=cast(transition.c.status, GPU.__table__.c.status.type),
+            instance_public_ip=func.coalesce(
+                transition.c.instance_public_ip, GPU.instance_public_ip
+            ),
+        )
+        .returning(
+            GPU.id,
+            GPU.organization_id,
+            GPU.region,
+            GPU.gang_id,
+            GPU.placement_group,
+            GPU.instance_id,
+            GPU.status,
+            GPU.created_at,
+        )
+        .execution_options(synchronize_session=False)
+    )
 
 
 gpu = CRUDGpu(GPU)
@@ -1,12 +1,12 @@
 import uuid
-from typing import Optional
+from typing import List, Optional
 
 from sqlalchemy import func
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
 
 from src.backend.crud.base import CRUDBase
-from src.backend.models.gpu import GPU, GpuStatus
+from src.backend.models.gpu import ACTIVE_GPU_STATUSES, GPU
 from src.backend.models.organization import Organization
 from src.backend.schemas.organization import OrganizationCreate, OrganizationUpdate
 
@@ -22,10 +22,22 @@ class CRUDOrganization(CRUDBase[Organization, OrganizationCreate, OrganizationUp
         result = await db.execute(
             select(func.count(GPU.id)).where(
                 GPU.organization_id == organization_id,
-                GPU.status.in_([GpuStatus.PROVISIONING, GpuStatus.AVAILABLE, GpuStatus.BUSY])
+                GPU.status.in_(ACTIVE_GPU_STATUSES)
             )
         )
         return result.scalar_one()
 
+    async def get_idle_policies(self, db: AsyncSession) -> List:
+        """The idle GPU policies of the organizations that have one enabled."""
+        result = await db.execute(
+            select(
+                self.model.id,
+                self.model.idle_timeout_seconds,
+                self.model.idle_action,
+                self.model.idle_grace_seconds,
+            ).where(self.model.idle_timeout_seconds.is_not(None))
+        )
+        return result.all()
+
 
 organization = CRUDOrganization(Organization)
@@ -1,11 +1,12 @@
 
-from typing import Any, Dict, Optional, Union, List
+from typing import Any, Dict, Optional, Tuple, Union, List
 import uuid
 
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
 
-from src.backend.core.security import get_password_hash
+from src.backend.core.pagination import PageKey, PageParams
+from src.backend.core.security import get_password_hash_async
 from src.backend.crud.base import CRUDBase
 from src.backend.models.user import User
 from src.backend.schemas.user import UserCreate, UserUpdate
@@ -15,7 +16,7 @@ class CRUDUser(CRUDBase[User, UserCreate, UserUpdate]):
     async def create(self, db: AsyncSession, *, obj_in: UserCreate) -> User:
         db_obj = User(
             email=obj_in.email,
-            hashed_password=get_password_hash(obj_in.password),
+            hashed_password=await get_password_hash_async(obj_in.password),
             role=obj_in.role,
             organization_id=obj_in.organization_id,
         )
@@ -33,7 +34,7 @@ class CRUDUser(CRUDBase[User, UserCreate, UserUpdate]):
             update_data = obj_in.dict(exclude_unset=True)
 
         if "password" in update_data and update_data["password"]:
-            hashed_password = get_password_hash(update_data["password"])
+            hashed_password = await get_password_hash_async(update_data["password"])
             del update_data["password"]
             update_data["hashed_password"] = hashed_password
 
@@ -44,15 +45,10 @@ class CRUDUser(CRUDBase[User, UserCreate, UserUpdate]):
         return result.scalars().first()
 
     async def get_users_by_organization(
-        self, db: AsyncSession, *, organization_id: uuid.UUID, skip: int = 0, limit: int = 100
-    ) -> List[User]:
-        result = await db.execute(
-            select(self.model)
-            .where(self.model.organization_id == organization_id)
-            .offset(skip)
-            .limit(limit)
-        )
-        return result.scalars().all()
+        self, db: AsyncSession, *, organization_id: uuid.UUID, page: PageParams
+    ) -> Tuple[List[User], Optional[PageKey]]:
+        query = select(self.model).where(self.model.organization_id == organization_id)
+        return await self.get_page(db, query, page=page)
 
 
 user = CRUDUser(User)
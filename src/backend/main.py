@@ -1,16 +1,56 @@
-from fastapi import FastAPI
+from contextlib import asynccontextmanager
+
+from fastapi import FastAPI, Request, status
+from fastapi.responses import JSONResponse
 
 from src.backend.api.v1.api import api_router
+from src.backend.core import metrics
+from src.backend.core.api_key_usage import api_key_usage_tracker
+from src.backend.core.hashing import HashingQueueFull, hashing_executor
+from src.backend.core.heartbeats import heartbeat_buffer
+from src.backend.core.idle_reclaim import idle_reclaimer
+from src.backend.core.idempotency import IdempotencyMiddleware, create_idempotency_store
+from src.backend.core.telemetry import telemetry_store
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Starts and stops the process-wide background components.
+    """
+    api_key_usage_tracker.start()
+    heartbeat_buffer.start()
+    telemetry_store.start()
+    idle_reclaimer.start()
+    yield
+    await idle_reclaimer.stop()
+    await telemetry_store.stop()
+    await heartbeat_buffer.stop()
+    await api_key_usage_tracker.stop()
+    hashing_executor.shutdown()
+
 
 app = FastAPI(
     title="GPUScheduler API",
     description="The control plane for the GPUScheduler service.",
     version="0.1.0",
+    lifespan=lifespan,
 )
 
+app.add_middleware(IdempotencyMiddleware, store=create_idempotency_store())
+
 app.include_router(api_router, prefix="/api/gpuscheduler/v1")
 
 
+@app.exception_handler(HashingQueueFull)
+async def hashing_queue_full_handler(request: Request, exc: HashingQueueFull):
+    return JSONResponse(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        content={"detail": "The server is busy. Please retry shortly."},
+        headers={"Retry-After": "1"},
+    )
+
+
 @app.get("/", summary="Root Endpoint")
 async def root():
     """
@@ -24,4 +64,12 @@ async def health_check():
     """
     A simple health check endpoint that returns the API status.
     """
-    return {"status": "ok"}
\ No newline at end of file
+    return {"status": "ok"}
+
+
+@app.get("/metrics", summary="Component Metrics")
+async def get_metrics():
+    """
+    Returns the counters of registered components (caches, pools, queues).
+    """
+    return await metrics.snapshot()
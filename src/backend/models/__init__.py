@@ -1,5 +1,6 @@
 from .gpu import GPU
 from .organization import Organization
-from .user import User, APIKey
+from .api_key import APIKey
+from .user import User
 
 __all__ = ["GPU", "Organization", "User", "APIKey"]
\ No newline at end of file
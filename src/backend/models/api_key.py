@@ -1,6 +1,6 @@
 import uuid
 
-from sqlalchemy import Column, DateTime, ForeignKey, String, func
+from sqlalchemy import Column, DateTime, ForeignKey, Index, String, func
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import relationship
 
@@ -20,5 +20,10 @@ class APIKey(Base):
     last_used_at = Column(DateTime(timezone=True), nullable=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
 
+    __table_args__ = (
+        # Paging through a user's API keys.
+        Index("ix_api_keys_user_id_created_at", "user_id", "created_at", "id"),
+    )
+
     user = relationship("User", back_populates="api_keys")
     organization = relationship("Organization", back_populates="api_keys")
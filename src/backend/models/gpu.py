@@ -1,7 +1,7 @@
 import enum
 import uuid
 
-from sqlalchemy import Column, DateTime, Enum, ForeignKey, String, func
+from sqlalchemy import Boolean, Column, DateTime, Enum, ForeignKey, Index, String, false, func, text
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import relationship
 
@@ -24,23 +24,80 @@ class GpuHealthState(str, enum.Enum):
     UNKNOWN = "UNKNOWN"
 
 
+# Statuses that count against an organization's `max_active_gpus` quota.
+ACTIVE_GPU_STATUSES = (GpuStatus.PROVISIONING, GpuStatus.AVAILABLE, GpuStatus.BUSY)
+
+# Statuses whose leases the lease sweeper expires.
+LEASED_GPU_STATUSES = (GpuStatus.AVAILABLE, GpuStatus.BUSY)
+
+
+def _status_in(statuses) -> str:
+    return "status IN ({})".format(", ".join(f"'{status.value}'" for status in statuses))
+
+
 class GPU(Base):
     __tablename__ = "gpus"
 
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
-    organization_id = Column(UUID(as_uuid=True), ForeignKey("organizations.id"), nullable=False)
-    user_id = Column(UUID(as_uuid=True), ForeignKey("users.id"), nullable=False)
+    # Both are NULL while the GPU sits unassigned in the warm pool.
+    organization_id = Column(UUID(as_uuid=True), ForeignKey("organizations.id"), nullable=True)
+    user_id = Column(UUID(as_uuid=True), ForeignKey("users.id"), nullable=True)
+
+    gpu_model = Column(String(255), nullable=True)
+    region = Column(String(64), nullable=True)
+
+    # GPUs allocated together by one gang request share a gang ID and, if
+    # requested, a cluster placement group.
+    gang_id = Column(UUID(as_uuid=True), nullable=True, index=True)
+    placement_group = Column(String(255), nullable=True)
+    # Whether the gang is rolled back as a whole if one of its GPUs fails.
+    all_or_nothing = Column(Boolean, nullable=False, default=False, server_default=false())
 
     instance_id = Column(String(255), nullable=True, index=True)
     instance_public_ip = Column(String(255), nullable=True)
 
     status = Column(Enum(GpuStatus), nullable=False, index=True, default=GpuStatus.PROVISIONING)
     health_state = Column(Enum(GpuHealthState), nullable=False, default=GpuHealthState.UNKNOWN)
-    lease_expires_at = Column(DateTime(timezone=True), nullable=False, index=True)
+    lease_expires_at = Column(DateTime(timezone=True), nullable=False)
     last_seen = Column(DateTime(timezone=True), nullable=True)
+    # When the idle reclaimer flagged the GPU as idle; NULL while it is in use.
+    idle_since = Column(DateTime(timezone=True), nullable=True)
 
     created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
     updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now(), nullable=False)
 
+    __table_args__ = (
+        Index(
+            "ix_gpus_warm_pool",
+            "gpu_model",
+            "region",
+            "created_at",
+            postgresql_where=text("organization_id IS NULL AND status = 'AVAILABLE'"),
+        ),
+        # Paging through an organization's GPUs: those not yet DEPROVISIONED
+        # (the default listing), or those in one status.
+        Index(
+            "ix_gpus_organization_id_created_at_current",
+            "organization_id",
+            "created_at",
+            "id",
+            postgresql_where=text("status <> 'DEPROVISIONED'"),
+        ),
+        Index("ix_gpus_organization_id_status_created_at", "organization_id", "status", "created_at", "id"),
+        # Quota counts. Most rows are DEPROVISIONED, so indexing only active
+        # GPUs keeps the index a fraction of the table's size.
+        Index(
+            "ix_gpus_organization_id_active",
+            "organization_id",
+            postgresql_where=text(_status_in(ACTIVE_GPU_STATUSES)),
+        ),
+        # The lease sweeper only looks at leased GPUs.
+        Index(
+            "ix_gpus_lease_expires_at_leased",
+            "lease_expires_at",
+            postgresql_where=text(_status_in(LEASED_GPU_STATUSES)),
+        ),
+    )
+
     organization = relationship("Organization", back_populates="gpus")
     user = relationship("User", back_populates="gpus")
\ No newline at end of file
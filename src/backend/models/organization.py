@@ -1,12 +1,22 @@
+import enum
 import uuid
 
-from sqlalchemy import Column, DateTime, Integer, String, func
+from sqlalchemy import Column, DateTime, Enum, Integer, String, func
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import relationship
 
 from src.backend.core.database import Base
 
 
+class IdleAction(str, enum.Enum):
+    # Only flag idle GPUs (GPU.idle_since).
+    NOTIFY = "NOTIFY"
+    # Also cut their lease to the grace period; the lease sweeper reclaims them.
+    SHORTEN_LEASE = "SHORTEN_LEASE"
+    # Reclaim them once they have stayed idle for the grace period.
+    RECLAIM = "RECLAIM"
+
+
 class Organization(Base):
     __tablename__ = "organizations"
 
@@ -14,6 +24,12 @@ class Organization(Base):
     name = Column(String(255), nullable=False)
     max_active_gpus = Column(Integer, nullable=False, default=5)
 
+    # Idle GPU policy: GPUs idle for idle_timeout_seconds are flagged, then
+    # handled per idle_action after idle_grace_seconds. NULL disables it.
+    idle_timeout_seconds = Column(Integer, nullable=True)
+    idle_action = Column(Enum(IdleAction), nullable=False, default=IdleAction.NOTIFY, server_default=IdleAction.NOTIFY.value)
+    idle_grace_seconds = Column(Integer, nullable=False, default=900, server_default="900")
+
     created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
     updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now(), nullable=False)
 
@@ -1,29 +1,122 @@
+import enum
 import uuid
 from datetime import datetime
-from typing import Optional
+from typing import List, Optional
 
 from pydantic import BaseModel, ConfigDict, Field
 
+from src.backend.core.config import settings
 from src.backend.models.gpu import GpuStatus, GpuHealthState
+from src.backend.models.organization import IdleAction
 
 
 class GPUBase(BaseModel):
     model_config = ConfigDict(from_attributes=True)
 
 
+class AllocationPriority(str, enum.Enum):
+    HIGH = "high"
+    NORMAL = "normal"
+    LOW = "low"
+
+
 class GPUAllocationRequest(BaseModel):
     """
     Schema for a new GPU allocation request.
     """
     gpu_model: str = Field(..., examples=["NVIDIA A100", "NVIDIA H100"], description="The model of the GPU requested.")
+    region: Optional[str] = Field(None, examples=["us-east-1"], description="The region to allocate in. Defaults to the service region.")
+    priority: AllocationPriority = Field(AllocationPriority.NORMAL, description="Priority relative to the organization's other queued requests.")
+    count: int = Field(1, ge=1, le=settings.GPU_GANG_MAX_SIZE, description="Number of GPUs to allocate together as a gang.")
+    all_or_nothing: bool = Field(True, description="Fail the whole gang unless every GPU can be launched.")
+    cluster_placement: bool = Field(False, description="Launch the gang into a cluster placement group for low-latency interconnect.")
 
 
 class GPUAllocationResponse(BaseModel):
     """
     Schema for the response to a GPU allocation request.
     """
-    task_id: str
+    task_id: Optional[str] = Field(None, description="The provisioning task, if the GPU was not served from the warm pool.")
+    gpu_id: uuid.UUID = Field(..., description="The ID the GPU will have once provisioning starts.")
+    gang_id: Optional[uuid.UUID] = Field(None, description="The ID shared by the GPUs of a gang allocation.")
+    gpu_ids: List[uuid.UUID] = Field(default_factory=list, description="The IDs of every GPU in a gang allocation.")
     message: str
+    queue_position: Optional[int] = Field(None, description="Requests of the organization ahead of this one, while queued.")
+    estimated_wait_seconds: Optional[int] = Field(None, description="Estimated time until provisioning starts, while queued.")
+
+
+class GPUAllocationStatus(BaseModel):
+    """
+    Schema for the scheduling state of an allocation request.
+    """
+    gpu_id: uuid.UUID
+    state: str = Field(..., examples=["queued", "dispatched"])
+    queue_position: Optional[int] = None
+    estimated_wait_seconds: Optional[int] = None
+
+
+class GPUHeartbeat(BaseModel):
+    """
+    Schema for a heartbeat from a GPU's on-instance agent.
+    """
+    health_state: GpuHealthState
+    utilization: Optional[float] = Field(None, ge=0, le=100, description="GPU utilization, in percent.")
+    memory_utilization: Optional[float] = Field(None, ge=0, le=100, description="GPU memory in use, in percent.")
+    temperature_c: Optional[float] = Field(None, description="GPU temperature, in degrees Celsius.")
+    power_w: Optional[float] = Field(None, ge=0, description="GPU power draw, in watts.")
+
+
+class GPUHeartbeatItem(GPUHeartbeat):
+    gpu_id: uuid.UUID
+
+
+class GPUHeartbeatBatch(BaseModel):
+    """
+    Schema for the heartbeats of several GPUs, e.g. from a host agent.
+    """
+    heartbeats: List[GPUHeartbeatItem] = Field(..., min_length=1, max_length=settings.HEARTBEAT_BATCH_MAX_SIZE)
+
+
+class GPUHeartbeatAck(BaseModel):
+    accepted: int = Field(..., description="Heartbeats accepted; they are written to the database asynchronously.")
+
+
+class TelemetryMetrics(BaseModel):
+    utilization: Optional[float] = None
+    memory_utilization: Optional[float] = None
+    temperature_c: Optional[float] = None
+    power_w: Optional[float] = None
+
+
+class TelemetrySummary(BaseModel):
+    """
+    Schema for telemetry aggregated over a window.
+    """
+    window_seconds: int
+    samples: int = Field(..., description="Heartbeats with telemetry in the window.")
+    resolution_seconds: int = Field(..., description="0 if computed from raw samples, else the size of the buckets p95 was computed over.")
+    mean: TelemetryMetrics
+    p95: TelemetryMetrics
+    idle_fraction: Optional[float] = Field(None, description="Share of samples below the idle utilization threshold.")
+
+
+class GPUTelemetry(TelemetrySummary):
+    gpu_id: uuid.UUID
+
+
+class OrganizationTelemetry(TelemetrySummary):
+    gpus: List[GPUTelemetry]
+
+
+class IdleGPU(BaseModel):
+    """
+    Schema for a GPU flagged as idle under the organization's idle policy.
+    """
+    gpu_id: uuid.UUID
+    idle_since: datetime
+    lease_expires_at: datetime
+    action: IdleAction
+    reclaim_at: Optional[datetime] = Field(None, description="When the GPU is reclaimed if it stays idle, under RECLAIM.")
 
 
 class GPUCreate(GPUBase):
@@ -38,10 +131,14 @@ class GPU(GPUBase):
     id: uuid.UUID
     organization_id: uuid.UUID
     user_id: uuid.UUID
+    gpu_model: Optional[str]
+    region: Optional[str]
+    gang_id: Optional[uuid.UUID] = None
     instance_id: Optional[str]
     instance_public_ip: Optional[str]
     status: GpuStatus
     health_state: GpuHealthState
     lease_expires_at: datetime
+    idle_since: Optional[datetime] = None
     created_at: datetime
     updated_at: datetime
\ No newline at end of file
@@ -1,7 +1,11 @@
 import uuid
 from datetime import datetime
+from typing import Optional
+
 from pydantic import BaseModel, ConfigDict, Field
 
+from src.backend.models.organization import IdleAction
+
 
 # Shared properties
 class OrganizationBase(BaseModel):
@@ -24,4 +28,13 @@ class Organization(OrganizationBase):
     id: uuid.UUID
     created_at: datetime
     updated_at: datetime
-    model_config = ConfigDict(from_attributes=True)
\ No newline at end of file
+    model_config = ConfigDict(from_attributes=True)
+
+class IdlePolicy(BaseModel):
+    """
+    Schema for an organization's policy on idle GPUs.
+    """
+    idle_timeout_seconds: Optional[int] = Field(None, ge=60, examples=[1800], description="Flag GPUs idle for this long. Null disables the policy.")
+    idle_action: IdleAction = Field(IdleAction.NOTIFY, description="What to do with flagged GPUs.")
+    idle_grace_seconds: int = Field(900, ge=0, description="Time flagged GPUs get before their lease runs out (SHORTEN_LEASE) or they are reclaimed (RECLAIM).")
+    model_config = ConfigDict(from_attributes=True)
@@ -1,12 +1,21 @@
-import asyncio
-import boto3
+import uuid
+from collections import defaultdict
+from typing import List, Optional, Set
 from celery import Celery
+from celery.signals import worker_init, worker_process_init, worker_process_shutdown
+from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
 
+from src.backend.cloud import CloudError, PlacementGroupInUse, chunked
 from src.backend.core.config import settings
-from src.backend.core.database import AsyncSessionLocal
-from src.backend.models.gpu import GPU, GpuStatus
+from src.backend.core.provisioning import plan_transitions
+from src.backend.core.quota import QuotaExceeded
+from src.backend.core.rate_limit import CloudAPIUnavailable
+from src.backend.core.worker_runtime import runtime
+from src.backend.crud.gpu import gpu as gpu_crud
+from src.backend.models.gpu import ACTIVE_GPU_STATUSES, GPU, GpuStatus
+from src.backend.models.organization import Organization
 
 celery_app = Celery(
     "worker",
@@ -16,99 +25,383 @@ celery_app = Celery(
 
 celery_app.conf.update(
     task_track_started=True,
+    beat_schedule={
+        "reconcile-quotas": {
+            "task": "src.backend.worker.reconcile_quotas",
+            "schedule": settings.QUOTA_RECONCILE_INTERVAL_SECONDS,
+        },
+        "check-expired-leases": {
+            "task": "src.backend.worker.check_expired_leases",
+            "schedule": settings.LEASE_SWEEP_INTERVAL_SECONDS,
+        },
+        "reconcile-provisioning": {
+            "task": "src.backend.worker.reconcile_provisioning",
+            "schedule": settings.PROVISION_POLL_INTERVAL_SECONDS,
+        },
+        "dispatch-allocations": {
+            "task": "src.backend.worker.dispatch_allocations",
+            "schedule": settings.SCHEDULER_DISPATCH_INTERVAL_SECONDS,
+        },
+        "replenish-warm-pool": {
+            "task": "src.backend.worker.replenish_warm_pool",
+            "schedule": settings.WARM_POOL_REPLENISH_INTERVAL_SECONDS,
+        },
+    },
 )
 
-@celery_app.task(bind=True)
+@worker_init.connect
+def check_worker_pool(sender, **kwargs):
+    """Refuse pools that run tasks concurrently, which the worker runtime cannot serve."""
+    try:
+        runtime.check_pool(sender.pool_cls)
+    except RuntimeError as e:
+        # Celery logs and ignores exceptions from signal handlers.
+        raise SystemExit(str(e))
+
+
+@worker_process_init.connect
+def init_worker_process(**kwargs):
+    """Set up the event loop, database pool and cloud clients of a worker process."""
+    runtime.start()
+
+
+@worker_process_shutdown.connect
+def shutdown_worker_process(**kwargs):
+    runtime.shutdown()
+
+
+def instance_type_for(gpu_model: str) -> str:
+    return settings.GPU_INSTANCE_TYPES.get(gpu_model, settings.AWS_INSTANCE_TYPE)
+
+
+def placement_group_name(gang_id: str) -> str:
+    return f"GPUScheduler-gang-{gang_id}"
+
+
+async def load_request_gpus(db: AsyncSession, allocation_request: dict) -> List[GPU]:
+    gpu_ids = allocation_request.get("gpu_ids") or [allocation_request["gpu_id"]]
+    result = await db.execute(select(GPU).where(GPU.id.in_([uuid.UUID(i) for i in gpu_ids])))
+    order = {gpu_id: index for index, gpu_id in enumerate(gpu_ids)}
+    return sorted(result.scalars().all(), key=lambda gpu: order[str(gpu.id)])
+
+
+async def fail_gpus(db: AsyncSession, gpus: List[GPU], organization_id: Optional[str]) -> None:
+    """Terminate whatever was launched for `gpus`, mark them ERROR and release their quota."""
+    if not gpus:
+        return
+    terminate_instances(gpus)
+    for gpu in gpus:
+        gpu.status = GpuStatus.ERROR
+    await db.commit()
+    await runtime.gpu_cache.invalidate(gpu.id for gpu in gpus)
+    if organization_id:
+        await runtime.quota.release_many(organization_id, [str(gpu.id) for gpu in gpus])
+
+
+def terminate_instances(gpus) -> Set[str]:
+    """
+    Terminate the instances of `gpus`, one call per region and batch of up
+    to 1000. Returns the instance IDs that could not be terminated.
+    """
+    by_region = defaultdict(list)
+    for gpu in gpus:
+        if gpu.instance_id:
+            by_region[gpu.region or settings.AWS_REGION].append(gpu.instance_id)
+    failed = set()
+    for region, instance_ids in by_region.items():
+        for chunk in chunked(instance_ids):
+            try:
+                runtime.cloud.terminate(region, chunk)
+            except (CloudError, CloudAPIUnavailable) as e:
+                print(f"Error terminating {len(chunk)} instances in {region}: {e}")
+                failed.update(chunk)
+                continue
+            print(f"Terminated {len(chunk)} instances in {region}.")
+    return failed
+
+
+async def commit_reservations(db: AsyncSession, organization_id: str, gpu_ids: List[str]) -> None:
+    """
+    Turn a request's reservations into active GPUs. Reservations that expired
+    while the request was queued are taken again, against the organization's
+    current limit, and QuotaExceeded is raised if they no longer fit.
+    """
+    expired = await runtime.quota.commit_many(organization_id, gpu_ids)
+    if not expired:
+        return
+    organization = await db.get(Organization, uuid.UUID(organization_id))
+    limit = organization.max_active_gpus if organization else 0
+    if not await runtime.quota.reserve_many(organization_id, expired, limit):
+        raise QuotaExceeded(f"GPU quota reached for organization {organization_id}.")
+    await runtime.quota.commit_many(organization_id, expired)
+
+
+async def finish_request(allocation_request: dict) -> None:
+    # Requests released by the scheduler free their in-flight slot.
+    if allocation_request.get("request_id"):
+        await runtime.scheduler.complete(allocation_request["request_id"])
+        dispatch_allocations.delay()
+
+
+@celery_app.task(bind=True, acks_late=True, reject_on_worker_lost=True, max_retries=10)
 def provision_gpu(self, allocation_request: dict):
     """
-    A Celery task to provision a new GPU on AWS.
+    A Celery task to provision a new GPU on the cloud provider.
+
+    This is the launch step of a resumable state machine: it creates the GPU
+    records and starts the instances, and `reconcile_provisioning` finalizes
+    them once they run. No step waits for an instance to boot. The launch is
+    idempotent: records are reused if they exist and the launch carries the
+    request's ClientToken, so a redelivered task (e.g. after a worker crash)
+    resumes instead of launching twice.
+
+    Requests without an organization provision an unassigned GPU for the
+    warm pool; those do not touch any quota.
+
+    Gang requests provision all of their GPUs with a single `run_instances`
+    call, optionally in a cluster placement group. An all-or-nothing gang is
+    rolled back completely (instances terminated, quota released) if any of
+    its GPUs fails to come up; otherwise only the failed GPUs are.
     """
-    async def _provision():
+    async def _launch():
         print(f"Received GPU provisioning task with data: {allocation_request}")
-        db: AsyncSession = AsyncSessionLocal()
-
-        # Create a new GPU record in the database
-        new_gpu = GPU(
-            organization_id=allocation_request["organization_id"],
-            user_id=allocation_request["user_id"],
-            status=GpuStatus.PROVISIONING,
-            lease_expires_at=datetime.utcnow() + timedelta(hours=1) # Default 1 hour lease
-        )
-        db.add(new_gpu)
-        await db.commit()
-        await db.refresh(new_gpu)
-        print(f"Created new GPU record with ID: {new_gpu.id}")
+        db: AsyncSession = runtime.session()
+        quota = runtime.quota
+        organization_id = allocation_request.get("organization_id")
+        gpu_ids = allocation_request.get("gpu_ids") or [allocation_request["gpu_id"]]
+        gang_id = allocation_request.get("gang_id")
+        user_id = allocation_request.get("user_id")
+        gpu_model = allocation_request["gpu_model"]
+        region = allocation_request.get("region") or settings.AWS_REGION
+        all_or_nothing = allocation_request.get("all_or_nothing", True)
+        placement_group = None
+        if gang_id and allocation_request.get("cluster_placement"):
+            placement_group = placement_group_name(gang_id)
+
+        if organization_id:
+            lease = timedelta(seconds=settings.GPU_DEFAULT_LEASE_SECONDS)
+        else:
+            lease = timedelta(seconds=settings.WARM_POOL_MAX_IDLE_SECONDS)
 
         try:
-            ec2 = boto3.resource("ec2", region_name=settings.AWS_REGION)
-
-            instance = ec2.create_instances(
-                ImageId=settings.AWS_AMI_ID,
-                InstanceType=settings.AWS_INSTANCE_TYPE,
-                MinCount=1,
-                MaxCount=1,
-                SecurityGroupIds=[settings.AWS_SECURITY_GROUP_ID],
-                KeyName=settings.AWS_KEY_PAIR_NAME,
-                TagSpecifications=[
-                    {
-                        "ResourceType": "instance",
-                        "Tags": [
-                            {"Key": "Name", "Value": f"GPUScheduler-{new_gpu.id}"},
-                            {"Key": "OrganizationID", "Value": str(new_gpu.organization_id)},
-                            {"Key": "UserID", "Value": str(new_gpu.user_id)},
-                        ],
-                    }
-                ],
-            )[0]
-
-            print(f"Requested EC2 instance with ID: {instance.id}")
-            instance.wait_until_running()
-            instance.reload()
-            print(f"EC2 instance {instance.id} is running.")
-
-            new_gpu.status = GpuStatus.AVAILABLE
-            new_gpu.instance_id = instance.id
-            new_gpu.instance_public_ip = instance.public_ip_address
-            await db.commit()
-            print(f"GPU {new_gpu.id} is now available.")
+            new_gpus = await load_request_gpus(db, allocation_request)
+            if not new_gpus:
+                # Create the GPU records in the database. Their IDs are the quota
+                # reservations taken by the API, which become active from here on.
+                new_gpus = [
+                    GPU(
+                        id=uuid.UUID(gpu_id),
+                        organization_id=uuid.UUID(organization_id) if organization_id else None,
+                        user_id=uuid.UUID(user_id) if user_id else None,
+                        gpu_model=gpu_model,
+                        region=region,
+                        gang_id=uuid.UUID(gang_id) if gang_id else None,
+                        placement_group=placement_group,
+                        all_or_nothing=bool(gang_id) and all_or_nothing,
+                        status=GpuStatus.PROVISIONING,
+                        lease_expires_at=datetime.now(timezone.utc) + lease,
+                    )
+                    for gpu_id in gpu_ids
+                ]
+                db.add_all(new_gpus)
+                await db.commit()
+                for new_gpu in new_gpus:
+                    await db.refresh(new_gpu)
+                print(f"Created new GPU records with IDs: {', '.join(gpu_ids)}")
+            if organization_id:
+                await commit_reservations(db, organization_id, gpu_ids)
+
+            pending = [gpu for gpu in new_gpus if gpu.status == GpuStatus.PROVISIONING]
+            if not pending:
+                print(f"Provisioning of {gpu_ids[0]} already finished.")
+                return {"status": "complete", "gpu_ids": gpu_ids}
+
+            if not all(gpu.instance_id for gpu in pending):
+                tags = {
+                    "Name": f"GPUScheduler-{gang_id or new_gpus[0].id}",
+                    "OrganizationID": str(organization_id),
+                    "UserID": str(user_id),
+                }
+                if gang_id:
+                    tags["GangID"] = gang_id
+                if placement_group:
+                    runtime.cloud.create_placement_group(region, placement_group)
 
-            return {"status": "complete", "gpu_id": str(new_gpu.id), "instance_id": instance.id}
+                instance_ids = runtime.cloud.launch(
+                    region,
+                    instance_type=instance_type_for(gpu_model),
+                    min_count=len(new_gpus) if all_or_nothing else 1,
+                    max_count=len(new_gpus),
+                    # Retrying with the same token returns the original launch.
+                    client_token=gang_id or gpu_ids[0],
+                    tags=tags,
+                    placement_group=placement_group,
+                )
+                print(f"Requested instances: {', '.join(instance_ids)}")
+
+                for new_gpu, instance_id in zip(new_gpus, instance_ids):
+                    new_gpu.instance_id = instance_id
+                await db.commit()
+                await runtime.gpu_cache.invalidate(gpu.id for gpu in new_gpus)
+                # Only possible without all-or-nothing: the cloud launched fewer than asked.
+                await fail_gpus(db, new_gpus[len(instance_ids):], organization_id)
 
         except Exception as e:
-            print(f"Error provisioning GPU: {e}")
-            new_gpu.status = GpuStatus.ERROR
-            await db.commit()
+            await db.rollback()
+            if isinstance(e, CloudAPIUnavailable) and self.request.retries < self.max_retries:
+                # The cloud API is throttling or degraded: keep the records and the
+                # reservations, and launch again (with the same ClientToken) later.
+                print(f"Cloud API unavailable, retrying launch: {e}")
+                raise self.retry(exc=e, countdown=settings.CLOUD_BREAKER_COOLDOWN_SECONDS)
+            print(f"Error provisioning GPUs: {e}")
+            # Roll the whole request back, including instances that did launch.
+            launched = await load_request_gpus(db, allocation_request)
+            await fail_gpus(
+                db, [gpu for gpu in launched if gpu.status == GpuStatus.PROVISIONING], organization_id
+            )
+            if organization_id:
+                await quota.release_many(organization_id, gpu_ids)
+            if placement_group:
+                delete_placement_group.delay(region, placement_group)
+            await finish_request(allocation_request)
             return {"status": "error", "error_message": str(e)}
 
         finally:
             await db.close()
 
-    return asyncio.run(_provision())
+        return {"status": "launched", "gpu_ids": gpu_ids}
+
+    return runtime.run(_launch())
+
+
+@celery_app.task
+def reconcile_provisioning():
+    """
+    The poll and finalize steps of provisioning, for every launch at once.
+
+    A periodic Celery task that looks up the instances of all PROVISIONING
+    GPUs with batched `describe` calls (up to 1000 IDs each) and applies the
+    resulting AVAILABLE/ERROR transitions in a single bulk UPDATE. GPUs that
+    failed are terminated and their quota released; finished requests free
+    their scheduler slot.
+    """
+    async def _reconcile():
+        db: AsyncSession = runtime.session()
+
+        try:
+            launching = await gpu_crud.get_launching(db)
+            if not launching:
+                return {"status": "complete", "transitioned": 0}
+
+            by_region = defaultdict(list)
+            for gpu in launching:
+                by_region[gpu.region or settings.AWS_REGION].append(gpu.instance_id)
+            instances = {}
+            for region, instance_ids in by_region.items():
+                instances.update(runtime.cloud.describe(region, instance_ids))
+
+            transitions = plan_transitions(
+                launching, instances, datetime.now(timezone.utc), settings.PROVISION_TIMEOUT_SECONDS
+            )
+            updated = await gpu_crud.apply_transitions(db, transitions)
+            await db.commit()
+            await runtime.gpu_cache.invalidate(gpu.id for gpu in updated)
+        finally:
+            await db.close()
+
+        failed = [gpu for gpu in updated if gpu.status == GpuStatus.ERROR]
+        ready = [gpu for gpu in updated if gpu.status == GpuStatus.AVAILABLE]
+        terminate_instances(failed)
+        released = defaultdict(list)
+        for gpu in failed:
+            if gpu.organization_id:
+                released[str(gpu.organization_id)].append(str(gpu.id))
+        for organization_id, gpu_ids in released.items():
+            await runtime.quota.release_many(organization_id, gpu_ids)
+
+        now = datetime.now(timezone.utc)
+        await runtime.warm_pool_stats.record_cold_ready(
+            (now - gpu.created_at).total_seconds() for gpu in ready
+        )
+
+        # A request is finished once none of its GPUs is left provisioning.
+        still_provisioning = set()
+        transitioned = {gpu.id for gpu in updated}
+        for gpu in launching:
+            if gpu.id not in transitioned:
+                still_provisioning.add(gpu.gang_id or gpu.id)
+        finished = {}
+        for gpu in updated:
+            request_id = gpu.gang_id or gpu.id
+            if request_id not in still_provisioning:
+                finished.setdefault(request_id, []).append(gpu)
+        for request_id, gpus in finished.items():
+            await runtime.scheduler.complete(str(request_id))
+            placement_group = gpus[0].placement_group
+            if placement_group and all(gpu.status == GpuStatus.ERROR for gpu in gpus):
+                delete_placement_group.delay(gpus[0].region, placement_group)
+        if finished:
+            dispatch_allocations.delay()
+
+        print(f"Provisioning reconciler: {len(ready)} GPUs available, {len(failed)} failed.")
+        return {"status": "complete", "available": len(ready), "failed": len(failed)}
+
+    return runtime.run(_reconcile())
+
+
+@celery_app.task(bind=True, max_retries=30)
+def delete_placement_group(self, region: str, group_name: str):
+    """
+    Deletes a gang's placement group. The cloud refuses while its instances
+    are still terminating, so the task retries until they are gone.
+    """
+    try:
+        if not runtime.cloud.delete_placement_group(region, group_name):
+            return {"status": "not_found"}
+    except PlacementGroupInUse:
+        raise self.retry(countdown=settings.PROVISION_POLL_INTERVAL_SECONDS)
+    except CloudAPIUnavailable as e:
+        raise self.retry(exc=e, countdown=settings.CLOUD_BREAKER_COOLDOWN_SECONDS)
+    print(f"Deleted placement group {group_name}")
+    return {"status": "complete"}
 
 
 @celery_app.task(bind=True)
 def deprovision_gpu(self, gpu_id: str):
     """
-    A Celery task to de-provision a GPU on AWS.
+    A Celery task to de-provision a GPU on the cloud provider.
     """
     async def _deprovision():
         print(f"Received GPU de-provisioning task for GPU ID: {gpu_id}")
-        db: AsyncSession = AsyncSessionLocal()
-        
+        db: AsyncSession = runtime.session()
+        quota = runtime.quota
+
         try:
             gpu = await db.get(GPU, gpu_id)
             if not gpu:
                 print(f"GPU with ID {gpu_id} not found.")
                 return {"status": "not_found"}
 
+            region = gpu.region or settings.AWS_REGION
             if gpu.instance_id:
-                ec2 = boto3.resource("ec2", region_name=settings.AWS_REGION)
-                instance = ec2.Instance(gpu.instance_id)
-                instance.terminate()
-                print(f"Terminated EC2 instance {gpu.instance_id}")
+                runtime.cloud.terminate(region, [gpu.instance_id])
+                print(f"Terminated instance {gpu.instance_id}")
 
             gpu.status = GpuStatus.DEPROVISIONED
             await db.commit()
+            await runtime.gpu_cache.invalidate([gpu.id])
+
+            # The placement group goes away with the last GPU of its gang.
+            if gpu.placement_group:
+                remaining = await db.execute(
+                    select(GPU.id).where(
+                        GPU.gang_id == gpu.gang_id, GPU.status.in_(ACTIVE_GPU_STATUSES)
+                    )
+                )
+                if remaining.first() is None:
+                    delete_placement_group.delay(region, gpu.placement_group)
+            if gpu.organization_id:
+                await quota.release(str(gpu.organization_id), str(gpu.id))
             print(f"GPU {gpu.id} has been de-provisioned.")
 
             return {"status": "complete", "gpu_id": str(gpu.id)}
@@ -121,4 +414,216 @@ def deprovision_gpu(self, gpu_id: str):
         finally:
             await db.close()
 
-    return asyncio.run(_deprovision())
\ No newline at end of file
+    return runtime.run(_deprovision())
+
+
+async def reclaim_claimed(db: AsyncSession, batch: List) -> int:
+    """
+    Terminate a batch of GPUs claimed into DEPROVISIONING, mark those that
+    went DEPROVISIONED and release their quota. Returns how many did.
+    """
+    not_terminated = terminate_instances(batch)
+    done = [gpu for gpu in batch if gpu.instance_id not in not_terminated]
+    await gpu_crud.mark_deprovisioned(db, [gpu.id for gpu in done])
+    await db.commit()
+    await runtime.gpu_cache.invalidate(gpu.id for gpu in done)
+
+    released = defaultdict(list)
+    for gpu in done:
+        if gpu.organization_id:
+            released[str(gpu.organization_id)].append(str(gpu.id))
+    for organization_id, gpu_ids in released.items():
+        await runtime.quota.release_many(organization_id, gpu_ids)
+
+    # Placement groups go away with the last GPU of their gang.
+    placement_groups = {
+        gpu.gang_id: (gpu.region or settings.AWS_REGION, gpu.placement_group)
+        for gpu in done
+        if gpu.placement_group
+    }
+    active_gangs = await gpu_crud.get_active_gangs(db, placement_groups)
+    for gang_id, (region, placement_group) in placement_groups.items():
+        if gang_id not in active_gangs:
+            delete_placement_group.delay(region, placement_group)
+    return len(done)
+
+
+@celery_app.task
+def check_expired_leases():
+    """
+    A periodic Celery task that reclaims every GPU whose lease has expired.
+
+    Each batch is claimed with a single UPDATE ... RETURNING that moves up to
+    LEASE_SWEEP_BATCH_SIZE expired GPUs to DEPROVISIONING, then terminated
+    with batched `terminate_instances` calls and marked DEPROVISIONED with
+    one more UPDATE. GPUs whose termination failed stay in DEPROVISIONING
+    and are retried after DEPROVISION_RETRY_SECONDS.
+    """
+    async def _sweep():
+        batch_size = settings.LEASE_SWEEP_BATCH_SIZE
+        retry_cutoff = datetime.now(timezone.utc) - timedelta(
+            seconds=settings.DEPROVISION_RETRY_SECONDS
+        )
+        claims = [
+            # Earlier terminations that failed first, then newly expired leases.
+            lambda db: gpu_crud.claim_stuck_deprovisioning(
+                db, updated_before=retry_cutoff, limit=batch_size
+            ),
+            lambda db: gpu_crud.claim_expired(db, now=datetime.now(timezone.utc), limit=batch_size),
+        ]
+        claimed = 0
+        reclaimed = 0
+
+        # Claimed GPUs leave the claim's WHERE clause (a claim also bumps
+        # updated_at), so each loop ends once a batch comes back short.
+        for claim in claims:
+            batch_len = batch_size
+            while batch_len == batch_size:
+                db: AsyncSession = runtime.session()
+                try:
+                    batch = await claim(db)
+                    await db.commit()
+                    await runtime.gpu_cache.invalidate(gpu.id for gpu in batch)
+                    batch_len = len(batch)
+                    if batch:
+                        claimed += len(batch)
+                        reclaimed += await reclaim_claimed(db, batch)
+                finally:
+                    await db.close()
+
+        failed = claimed - reclaimed
+        print(f"Lease sweep reclaimed {reclaimed} GPUs; {failed} terminations failed.")
+        return {"status": "complete", "reclaimed": reclaimed, "failed": failed}
+
+    return runtime.run(_sweep())
+
+
+@celery_app.task
+def reclaim_gpus(gpu_ids: List[str]):
+    """
+    Terminates GPUs the idle reclaimer moved to DEPROVISIONING, as one batch,
+    and lets queued allocations use the quota they free. GPUs whose
+    termination fails are retried by the lease sweeper.
+    """
+    async def _reclaim_gpus():
+        db: AsyncSession = runtime.session()
+
+        try:
+            batch = await gpu_crud.get_deprovisioning(db, [uuid.UUID(gpu_id) for gpu_id in gpu_ids])
+            reclaimed = await reclaim_claimed(db, batch) if batch else 0
+        finally:
+            await db.close()
+
+        if reclaimed:
+            dispatch_allocations.delay()
+        print(f"Reclaimed {reclaimed} idle GPUs; {len(batch) - reclaimed} terminations failed.")
+        return {"status": "complete", "reclaimed": reclaimed}
+
+    return runtime.run(_reclaim_gpus())
+
+
+@celery_app.task
+def dispatch_allocations():
+    """
+    Releases queued allocation requests to `provision_gpu`, fair-share across
+    organizations and within the global in-flight cap. Runs periodically and
+    whenever a request is queued or a provisioning task finishes.
+    """
+    async def _dispatch():
+        released = await runtime.scheduler.dispatch(provision_gpu.delay)
+        if released:
+            print(f"Dispatched {released} queued allocation requests.")
+        return {"status": "complete", "dispatched": released}
+
+    return runtime.run(_dispatch())
+
+
+@celery_app.task
+def reconcile_quotas():
+    """
+    A periodic Celery task that resyncs every organization's quota counter
+    with the GPUs the database considers active.
+    """
+    async def _reconcile():
+        db: AsyncSession = runtime.session()
+        quota = runtime.quota
+
+        try:
+            organization_ids = (await db.execute(select(Organization.id))).scalars().all()
+            rows = await db.execute(
+                select(GPU.organization_id, GPU.id).where(GPU.status.in_(ACTIVE_GPU_STATUSES))
+            )
+            active_ids = defaultdict(list)
+            for organization_id, gpu_id in rows:
+                active_ids[organization_id].append(str(gpu_id))
+
+            for organization_id in organization_ids:
+                await quota.reconcile(
+                    str(organization_id),
+                    active_ids.get(organization_id, []),
+                    grace=settings.QUOTA_RECONCILE_GRACE_SECONDS,
+                )
+            print(f"Reconciled quotas for {len(organization_ids)} organizations.")
+
+            return {"status": "complete", "organizations": len(organization_ids)}
+
+        finally:
+            await db.close()
+
+    return runtime.run(_reconcile())
+
+
+@celery_app.task
+def replenish_warm_pool():
+    """
+    A periodic Celery task that tops every warm pool up to its target size
+    by launching unassigned GPUs.
+
+    The GPU records are created before their launches are queued, so the
+    next run counts them even if their launch has not started yet. Launches
+    that never started (a lost task) are queued again once they are older
+    than the provisioning timeout; the launch is idempotent, so a slow task
+    that does start meanwhile is harmless.
+    """
+    async def _replenish():
+        db: AsyncSession = runtime.session()
+        now = datetime.now(timezone.utc)
+        lease_expires_at = now + timedelta(seconds=settings.WARM_POOL_MAX_IDLE_SECONDS)
+
+        try:
+            pool_sizes = await gpu_crud.count_warm_pool(db)
+            new_gpus = []
+            for gpu_model, targets in settings.WARM_POOL_TARGETS.items():
+                for region, target in targets.items():
+                    deficit = target - pool_sizes.get((gpu_model, region), 0)
+                    new_gpus += [
+                        GPU(
+                            id=uuid.uuid4(),
+                            gpu_model=gpu_model,
+                            region=region,
+                            status=GpuStatus.PROVISIONING,
+                            lease_expires_at=lease_expires_at,
+                        )
+                        for _ in range(max(deficit, 0))
+                    ]
+            unlaunched = await gpu_crud.get_unlaunched_warm(
+                db, created_before=now - timedelta(seconds=settings.PROVISION_TIMEOUT_SECONDS)
+            )
+            db.add_all(new_gpus)
+            await db.commit()
+        finally:
+            await db.close()
+
+        for gpu in [*new_gpus, *unlaunched]:
+            provision_gpu.delay(
+                {"gpu_id": str(gpu.id), "gpu_model": gpu.gpu_model, "region": gpu.region}
+            )
+        await runtime.warm_pool_stats.record_launched(len(new_gpus))
+        print(
+            f"Warm pool replenishment launched {len(new_gpus)} GPUs "
+            f"and retried {len(unlaunched)} launches."
+        )
+
+        return {"status": "complete", "launched": len(new_gpus), "retried": len(unlaunched)}
+
+    return runtime.run(_replenish())
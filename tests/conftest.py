@@ -7,7 +7,7 @@ from httpx import AsyncClient
 from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
 from sqlalchemy.orm import sessionmaker
 
-from src.backend.core.database import Base, get_db
+from src.backend.core.database import Base, get_db, get_read_db
 from src.backend.main import app
 
 DATABASE_URL = "sqlite+aiosqlite:///./test.db"
@@ -43,5 +43,6 @@ async def client(db: AsyncSession) -> AsyncGenerator[AsyncClient, None]:
         yield db
 
     app.dependency_overrides[get_db] = override_get_db
+    app.dependency_overrides[get_read_db] = override_get_db
     async with AsyncClient(app=app, base_url="http://test") as c:
         yield c
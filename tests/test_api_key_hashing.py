@@ -0,0 +1,50 @@
+import bcrypt
+import pytest
+
+from src.backend.core import security
+from src.backend.core.config import settings
+
+
+def test_hmac_hash_is_versioned():
+    key_hash = security.hash_api_key_secret("secret")
+    scheme, pepper_id, digest = key_hash.split("$")[1:]
+
+    assert scheme == "hmac-sha256"
+    assert int(pepper_id) == settings.API_KEY_PEPPER_ID
+    assert len(digest) == 64
+    assert not security.api_key_hash_needs_upgrade(key_hash)
+
+
+def test_hmac_verification():
+    key_hash = security.hash_api_key_secret("secret")
+
+    assert security.verify_hmac_api_key_secret("secret", key_hash)
+    assert not security.verify_hmac_api_key_secret("wrong", key_hash)
+    assert not security.verify_hmac_api_key_secret("secret", "$hmac-sha256$garbage")
+
+
+def test_bcrypt_hash_needs_upgrade():
+    legacy = bcrypt.hashpw(b"secret", bcrypt.gensalt()).decode("utf-8")
+    assert security.api_key_hash_needs_upgrade(legacy)
+
+
+def test_retired_pepper_still_verifies(monkeypatch):
+    old_hash = security.hash_api_key_secret("secret")
+    monkeypatch.setattr(
+        settings, "API_KEY_RETIRED_PEPPERS", {settings.API_KEY_PEPPER_ID: settings.API_KEY_PEPPER}
+    )
+    monkeypatch.setattr(settings, "API_KEY_PEPPER_ID", settings.API_KEY_PEPPER_ID + 1)
+    monkeypatch.setattr(settings, "API_KEY_PEPPER", "rotated-pepper")
+
+    assert security.verify_hmac_api_key_secret("secret", old_hash)
+    assert security.api_key_hash_needs_upgrade(old_hash)
+    assert not security.api_key_hash_needs_upgrade(security.hash_api_key_secret("secret"))
+
+
+@pytest.mark.asyncio
+async def test_async_verification_handles_both_schemes():
+    legacy = bcrypt.hashpw(b"secret", bcrypt.gensalt()).decode("utf-8")
+
+    assert await security.verify_api_key_secret_async("secret", security.hash_api_key_secret("secret"))
+    assert await security.verify_api_key_secret_async("secret", legacy)
+    assert not await security.verify_api_key_secret_async("wrong", legacy)
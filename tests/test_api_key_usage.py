@@ -0,0 +1,78 @@
+import uuid
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from sqlalchemy.dialects import postgresql
+
+from src.backend.core.api_key_usage import APIKeyUsageTracker, build_last_used_update
+
+
+class FakeSession:
+    def __init__(self, log, fail=False):
+        self.log = log
+        self.fail = fail
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    async def execute(self, statement):
+        if self.fail:
+            raise RuntimeError("database unavailable")
+        self.log.append(statement)
+
+    async def commit(self):
+        pass
+
+
+def test_update_statement_uses_values_list():
+    now = datetime.now(timezone.utc)
+    statement = build_last_used_update({uuid.uuid4(): now, uuid.uuid4(): now})
+    sql = str(statement.compile(dialect=postgresql.dialect()))
+
+    assert "UPDATE api_keys SET last_used_at=usage.last_used_at" in sql
+    assert "FROM (VALUES" in sql
+    assert "api_keys.last_used_at < usage.last_used_at" in sql
+
+
+@pytest.mark.asyncio
+async def test_record_coalesces_per_key():
+    log = []
+    tracker = APIKeyUsageTracker(lambda: FakeSession(log), flush_interval=60, max_pending=100)
+    key_id = uuid.uuid4()
+    earlier = datetime.now(timezone.utc)
+    later = earlier + timedelta(seconds=5)
+
+    tracker.record(key_id, later)
+    tracker.record(key_id, earlier)
+    tracker.record(uuid.uuid4(), earlier)
+
+    assert await tracker.flush() == 2
+    assert len(log) == 1
+    assert tracker.stats()["pending"] == 0
+    assert await tracker.flush() == 0
+
+
+@pytest.mark.asyncio
+async def test_failed_flush_keeps_usage():
+    tracker = APIKeyUsageTracker(lambda: FakeSession([], fail=True), flush_interval=60, max_pending=100)
+    tracker.record(uuid.uuid4())
+
+    assert await tracker.flush() == 0
+    assert tracker.stats()["pending"] == 1
+    assert tracker.stats()["failed_flushes"] == 1
+
+
+@pytest.mark.asyncio
+async def test_stop_flushes_pending_usage():
+    log = []
+    tracker = APIKeyUsageTracker(lambda: FakeSession(log), flush_interval=60, max_pending=100)
+    tracker.start()
+    tracker.record(uuid.uuid4())
+
+    await tracker.stop()
+
+    assert len(log) == 1
+    assert tracker.stats()["rows_flushed"] == 1
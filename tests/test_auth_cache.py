@@ -0,0 +1,261 @@
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+
+import pytest
+from fastapi import HTTPException
+
+from src.backend.core import auth
+from src.backend.core import auth_cache
+from src.backend.core.auth_cache import (
+    InMemoryKeyRevocations,
+    RedisKeyRevocations,
+    VerifiedKeyCache,
+)
+from src.backend.core.security import hash_api_key_secret
+from src.backend.crud import api_key as api_key_module
+
+
+def test_hit_after_put():
+    cache = VerifiedKeyCache(max_entries=10, ttl_seconds=60)
+    digest = cache.digest("abcd1234.secret")
+    key_id, user_id = uuid.uuid4(), uuid.uuid4()
+
+    assert cache.get(digest) is None
+    cache.put(digest, api_key_id=key_id, user_id=user_id, key_expires_at=None)
+
+    entry = cache.get(digest)
+    assert entry is not None
+    assert entry.user_id == user_id
+    assert cache.stats()["hits"] == 1
+    assert cache.stats()["misses"] == 1
+
+
+def test_digest_does_not_expose_token():
+    cache = VerifiedKeyCache(max_entries=10, ttl_seconds=60)
+    assert b"secret" not in cache.digest("abcd1234.secret")
+    assert cache.digest("a.b") == cache.digest("a.b")
+    assert cache.digest("a.b") != cache.digest("a.c")
+
+
+def test_ttl_expiry():
+    cache = VerifiedKeyCache(max_entries=10, ttl_seconds=0.01)
+    digest = cache.digest("token")
+    cache.put(digest, api_key_id=uuid.uuid4(), user_id=uuid.uuid4(), key_expires_at=None)
+    time.sleep(0.02)
+
+    assert cache.get(digest) is None
+    assert cache.stats()["expirations"] == 1
+    assert cache.stats()["size"] == 0
+
+
+def test_key_expiry_is_enforced_before_ttl():
+    cache = VerifiedKeyCache(max_entries=10, ttl_seconds=60)
+    digest = cache.digest("token")
+    expired = datetime.now(timezone.utc) - timedelta(seconds=1)
+    cache.put(digest, api_key_id=uuid.uuid4(), user_id=uuid.uuid4(), key_expires_at=expired)
+
+    assert cache.get(digest) is None
+
+
+def test_lru_eviction():
+    cache = VerifiedKeyCache(max_entries=2, ttl_seconds=60)
+    digests = [cache.digest(f"token-{i}") for i in range(3)]
+    for digest in digests[:2]:
+        cache.put(digest, api_key_id=uuid.uuid4(), user_id=uuid.uuid4(), key_expires_at=None)
+
+    # Touch the oldest entry so the second one becomes the eviction candidate.
+    assert cache.get(digests[0]) is not None
+    cache.put(digests[2], api_key_id=uuid.uuid4(), user_id=uuid.uuid4(), key_expires_at=None)
+
+    assert cache.get(digests[0]) is not None
+    assert cache.get(digests[1]) is None
+    assert cache.stats()["evictions"] == 1
+
+
+def test_invalidate_key_drops_all_entries_for_key():
+    cache = VerifiedKeyCache(max_entries=10, ttl_seconds=60)
+    key_id = uuid.uuid4()
+    first, second = cache.digest("token-1"), cache.digest("token-2")
+    cache.put(first, api_key_id=key_id, user_id=uuid.uuid4(), key_expires_at=None)
+    cache.put(second, api_key_id=key_id, user_id=uuid.uuid4(), key_expires_at=None)
+
+    cache.invalidate_key(key_id)
+
+    assert cache.get(first) is None
+    assert cache.get(second) is None
+    assert cache.stats()["invalidations"] == 2
+
+
+def test_unknown_prefixes_expire_and_stay_bounded():
+    cache = VerifiedKeyCache(max_entries=2, ttl_seconds=60, negative_ttl_seconds=60)
+    for prefix in ("a", "b", "c"):
+        cache.mark_unknown_prefix(prefix)
+
+    assert not cache.is_unknown_prefix("a")
+    assert cache.is_unknown_prefix("b") and cache.is_unknown_prefix("c")
+    assert cache.stats()["negative_hits"] == 2
+
+    expired = VerifiedKeyCache(max_entries=2, ttl_seconds=60, negative_ttl_seconds=0.01)
+    expired.mark_unknown_prefix("a")
+    time.sleep(0.02)
+    assert not expired.is_unknown_prefix("a")
+
+
+class PrimarySession:
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+
+@pytest.mark.asyncio
+async def test_unknown_prefix_reaches_the_primary_once(monkeypatch):
+    lookups = []
+
+    async def get_by_prefix(db, *, prefix):
+        lookups.append(db)
+        return None
+
+    replica = SimpleNamespace(bind="replica")
+    monkeypatch.setattr(auth.api_key_crud, "get_by_prefix", get_by_prefix)
+    monkeypatch.setattr(auth, "AsyncSessionLocal", PrimarySession)
+    monkeypatch.setattr(auth, "replica_router", SimpleNamespace(primary="primary"))
+    monkeypatch.setattr(
+        auth,
+        "verified_key_cache",
+        VerifiedKeyCache(max_entries=10, ttl_seconds=60, negative_ttl_seconds=60),
+    )
+
+    for _ in range(3):
+        with pytest.raises(HTTPException) as denied:
+            await auth.get_current_user(api_key="Bearer bogus.secret", db=replica)
+        assert denied.value.status_code == 401
+    # The replica and then the primary are asked once; repeats are turned away.
+    assert [type(db) for db in lookups] == [SimpleNamespace, PrimarySession]
+
+    with pytest.raises(HTTPException):
+        await auth.get_current_user(api_key="Bearer other.secret", db=replica)
+    assert len(lookups) == 4
+
+
+async def check_revocations_expire(revocations):
+    key_id = uuid.uuid4()
+    assert not await revocations.is_revoked(key_id)
+    await revocations.revoke(key_id)
+    assert await revocations.is_revoked(key_id)
+    assert not await revocations.is_revoked(uuid.uuid4())
+    time.sleep(0.06)
+    assert not await revocations.is_revoked(key_id)
+
+
+@pytest.mark.asyncio
+async def test_revocations_expire():
+    await check_revocations_expire(InMemoryKeyRevocations(ttl_seconds=0.05))
+
+
+@pytest.mark.asyncio
+async def test_redis_revocations_expire(monkeypatch):
+    fakeredis = pytest.importorskip("fakeredis")
+    monkeypatch.setattr(
+        auth_cache.redis,
+        "from_url",
+        lambda url, **kwargs: fakeredis.aioredis.FakeRedis(**kwargs),
+    )
+    await check_revocations_expire(RedisKeyRevocations("redis://unused", ttl_seconds=0.05))
+
+
+class KeySession:
+    """A read session over a fixed set of users."""
+
+    bind = "replica"
+
+    def __init__(self, *users):
+        self.users = {user.id: user for user in users}
+
+    async def get(self, model, ident):
+        return self.users.get(ident)
+
+    async def delete(self, instance):
+        pass
+
+    async def commit(self):
+        pass
+
+
+def create_api_key(user):
+    return SimpleNamespace(
+        id=uuid.uuid4(),
+        key_hash=hash_api_key_secret("secret"),
+        expires_at=None,
+        user_id=user.id,
+        user=user,
+    )
+
+
+@pytest.mark.asyncio
+async def test_revocation_reaches_every_process(monkeypatch):
+    db_api_key = create_api_key(SimpleNamespace(id=uuid.uuid4(), role="member"))
+
+    async def get_by_prefix(db, *, prefix):
+        # A lagging replica still returns the key after it was deleted.
+        return db_api_key
+
+    revocations = InMemoryKeyRevocations(ttl_seconds=60)
+    monkeypatch.setattr(auth.api_key_crud, "get_by_prefix", get_by_prefix)
+    monkeypatch.setattr(auth, "key_revocations", revocations)
+    monkeypatch.setattr(api_key_module, "key_revocations", revocations)
+    # One verified key cache per API process.
+    first, second, third = (VerifiedKeyCache(max_entries=10, ttl_seconds=60) for _ in range(3))
+
+    async def authenticate(cache):
+        monkeypatch.setattr(auth, "verified_key_cache", cache)
+        return await auth.get_current_user(
+            api_key="Bearer abcd.secret", db=KeySession(db_api_key.user)
+        )
+
+    assert (await authenticate(first)).id == db_api_key.user_id
+    assert (await authenticate(second)).id == db_api_key.user_id
+    assert second.stats()["size"] == 1
+
+    monkeypatch.setattr(api_key_module, "verified_key_cache", first)
+    await api_key_module.api_key.revoke(KeySession(), db_obj=db_api_key)
+    for cache in (first, second, third):
+        with pytest.raises(HTTPException) as denied:
+            await authenticate(cache)
+        assert denied.value.status_code == 401
+        assert cache.stats()["size"] == 0
+
+
+@pytest.mark.asyncio
+async def test_cache_hits_load_the_current_user(monkeypatch):
+    member = SimpleNamespace(id=uuid.uuid4(), role="admin")
+    db_api_key = create_api_key(member)
+
+    async def get_by_prefix(db, *, prefix):
+        return db_api_key
+
+    cache = VerifiedKeyCache(max_entries=10, ttl_seconds=60)
+    monkeypatch.setattr(auth.api_key_crud, "get_by_prefix", get_by_prefix)
+    monkeypatch.setattr(auth, "key_revocations", InMemoryKeyRevocations(ttl_seconds=60))
+    monkeypatch.setattr(auth, "verified_key_cache", cache)
+    admin_only = auth.RoleChecker(["admin"])
+
+    user = await auth.get_current_user(api_key="Bearer abcd.secret", db=KeySession(member))
+    assert admin_only(user) is member
+
+    # A demotion committed since is seen by the next cached request.
+    demoted = SimpleNamespace(id=member.id, role="member")
+    user = await auth.get_current_user(api_key="Bearer abcd.secret", db=KeySession(demoted))
+    assert cache.stats()["hits"] == 1
+    with pytest.raises(HTTPException) as denied:
+        admin_only(user)
+    assert denied.value.status_code == 403
+
+    # So is a deleted user.
+    with pytest.raises(HTTPException) as denied:
+        await auth.get_current_user(api_key="Bearer abcd.secret", db=KeySession())
+    assert denied.value.status_code == 401
+    assert cache.stats()["size"] == 0
@@ -0,0 +1,75 @@
+import pytest
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.ext.asyncio import create_async_engine
+from starlette.requests import Request
+
+from src.backend.core import database
+from src.backend.core.database import RecentWrites, ReplicaRouter
+
+
+def make_request(**headers):
+    raw = [(name.replace("_", "-").lower().encode(), value.encode()) for name, value in headers.items()]
+    return Request({"type": "http", "headers": raw})
+
+
+def test_replicas_are_used_round_robin_before_the_primary():
+    router = ReplicaRouter("primary", ["a", "b"], retry_after=60)
+
+    assert router.candidates() == ["a", "b", "primary"]
+    assert router.candidates() == ["b", "a", "primary"]
+
+    router.mark_down("a")
+    assert router.candidates() == ["b", "primary"]
+    assert router.stats()["replicas_down"] == 1
+    assert ReplicaRouter("primary", [], retry_after=60).candidates() == ["primary"]
+
+
+def test_recent_writes_expire_and_stay_bounded():
+    writes = RecentWrites(ttl_seconds=60, max_entries=2)
+    keys = [RecentWrites.key(f"Bearer {n}") for n in range(3)]
+    for key in keys:
+        writes.mark(key)
+
+    assert not writes.is_recent(keys[0])
+    assert writes.is_recent(keys[1]) and writes.is_recent(keys[2])
+
+    expired = RecentWrites(ttl_seconds=0)
+    expired.mark(keys[0])
+    assert not expired.is_recent(keys[0])
+
+
+@pytest.mark.asyncio
+async def test_read_sessions_fail_over_and_honour_recent_writes(monkeypatch, tmp_path):
+    primary = create_async_engine(f"sqlite+aiosqlite:///{tmp_path}/primary.db")
+    down = create_async_engine(f"sqlite+aiosqlite:///{tmp_path}/missing/replica.db")
+    replica = create_async_engine(f"sqlite+aiosqlite:///{tmp_path}/replica.db")
+    router = ReplicaRouter(primary, [down, replica], retry_after=60)
+    monkeypatch.setattr(database, "replica_router", router)
+    monkeypatch.setattr(database, "recent_writes", RecentWrites(ttl_seconds=60))
+
+    async def session_engine(request):
+        dependency = database.get_read_db(request)
+        session = await dependency.__anext__()
+        await dependency.aclose()
+        return session.bind
+
+    # The first replica cannot be opened: the read fails over and it is skipped afterwards.
+    assert await session_engine(make_request()) is replica
+    assert router.candidates() == [replica, primary]
+    assert router.stats()["failovers"] == 1
+
+    request = make_request(authorization="Bearer abc")
+    database.recent_writes.mark(RecentWrites.key("Bearer abc"))
+    assert await session_engine(request) is primary
+    assert await session_engine(make_request(x_read_consistency="primary")) is primary
+
+    router.replicas = [down]
+    router._down_until.clear()
+    assert await session_engine(make_request()) is primary
+
+    router.replicas = []
+    router.primary = down
+    with pytest.raises(OperationalError):
+        await session_engine(make_request())
+    for engine in (primary, down, replica):
+        await engine.dispose()
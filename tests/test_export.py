@@ -0,0 +1,86 @@
+import csv
+import io
+import json
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+
+from src.backend.core.database import Base
+from src.backend.core.export import ExportFormat, encode_rows
+from src.backend.crud import gpu as gpu_crud
+from src.backend.models import GPU, Organization
+from src.backend.models.gpu import GpuHealthState, GpuStatus
+
+COLUMNS = [column.key for column in gpu_crud.GPU_COLUMNS]
+
+
+async def export(db, export_format, **filters):
+    partitions = gpu_crud.gpu.stream_export(db, chunk_rows=3, **filters)
+    chunks = [chunk async for chunk in encode_rows(export_format, COLUMNS, partitions)]
+    return chunks
+
+
+async def create_session(tmp_path):
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path}/export.db")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    return AsyncSession(engine, expire_on_commit=False)
+
+
+@pytest.mark.asyncio
+async def test_export_streams_filtered_rows_in_chunks(tmp_path):
+    db = await create_session(tmp_path)
+    organization, other = Organization(name="org"), Organization(name="other")
+    created_at = datetime(2026, 10, 18)
+    gpus = [
+        GPU(
+            organization=organization,
+            gpu_model="a100",
+            region="us-east-1",
+            status=GpuStatus.DEPROVISIONED if n % 2 else GpuStatus.AVAILABLE,
+            health_state=GpuHealthState.UNHEALTHY if n == 4 else GpuHealthState.HEALTHY,
+            lease_expires_at=created_at + timedelta(days=1),
+            created_at=created_at + timedelta(minutes=n),
+        )
+        for n in range(8)
+    ]
+    db.add(GPU(organization=other, lease_expires_at=created_at, created_at=created_at))
+    db.add_all(gpus)
+    await db.commit()
+
+    chunks = await export(db, ExportFormat.NDJSON, organization_id=organization.id)
+    # Eight rows, three per chunk; DEPROVISIONED GPUs are exported too.
+    assert len(chunks) == 3
+    rows = [json.loads(line) for chunk in chunks for line in chunk.decode().splitlines()]
+    assert [row["id"] for row in rows] == [str(gpu.id) for gpu in gpus]
+    assert rows[1]["status"] == "DEPROVISIONED"
+    assert rows[0]["created_at"] == "2026-10-18T00:00:00"
+    assert rows[0]["user_id"] is None
+
+    chunks = await export(
+        db,
+        ExportFormat.CSV,
+        organization_id=organization.id,
+        status=GpuStatus.AVAILABLE,
+        health_state=GpuHealthState.HEALTHY,
+        created_after=created_at + timedelta(minutes=1),
+        created_before=created_at + timedelta(minutes=7),
+    )
+    rows = list(csv.reader(io.StringIO(b"".join(chunks).decode())))
+    assert rows[0] == COLUMNS
+    assert [row[0] for row in rows[1:]] == [str(gpus[2].id), str(gpus[6].id)]
+    assert rows[1][COLUMNS.index("user_id")] == ""
+    assert rows[1][COLUMNS.index("health_state")] == "HEALTHY"
+
+
+@pytest.mark.asyncio
+async def test_empty_csv_export_still_has_a_header(tmp_path):
+    db = await create_session(tmp_path)
+    organization = Organization(name="org")
+    db.add(organization)
+    await db.commit()
+
+    assert await export(db, ExportFormat.NDJSON, organization_id=organization.id) == []
+    chunks = await export(db, ExportFormat.CSV, organization_id=organization.id)
+    assert b"".join(chunks).decode().splitlines() == [",".join(COLUMNS)]
@@ -0,0 +1,101 @@
+import json
+import uuid
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+
+from src.backend.api.v1.endpoints import gpus as gpu_endpoints
+from src.backend.core.database import Base
+from src.backend.core.gpu_cache import GPUCache, InMemoryGPUCacheBackend
+from src.backend.models import GPU, Organization
+from src.backend.models.gpu import GpuStatus
+
+
+def create_cache(**kwargs) -> GPUCache:
+    options = dict(ttl_seconds=300, local_ttl_seconds=60, local_max_entries=100)
+    options.update(kwargs)
+    return GPUCache(InMemoryGPUCacheBackend(), **options)
+
+
+@pytest.mark.asyncio
+async def test_fill_then_hit_local_then_shared_tier():
+    cache = create_cache()
+    gpu_id = uuid.uuid4()
+    assert await cache.get(gpu_id) is None
+
+    version = await cache.version(gpu_id)
+    gpu = await cache.fill(gpu_id, {"id": gpu_id, "status": GpuStatus.BUSY}, version)
+    assert gpu == {"id": str(gpu_id), "status": "BUSY"}
+    assert await cache.get(gpu_id) == gpu
+
+    # Another process sharing the backend starts with an empty local tier.
+    other = GPUCache(cache.backend, ttl_seconds=300, local_ttl_seconds=60, local_max_entries=100)
+    assert await other.get(gpu_id) == gpu
+    assert (cache.stats()["local_hits"], other.stats()["shared_hits"]) == (1, 1)
+
+
+@pytest.mark.asyncio
+async def test_fill_started_before_an_invalidation_is_refused():
+    cache = create_cache()
+    gpu_id = uuid.uuid4()
+
+    version = await cache.version(gpu_id)
+    # A write lands between the reader's version check and its fill.
+    await cache.invalidate([gpu_id])
+    stale = await cache.fill(gpu_id, {"status": "PROVISIONING"}, version)
+    assert stale == {"status": "PROVISIONING"}
+    assert await cache.get(gpu_id) is None
+    assert cache.stats()["stale_fills"] == 1
+
+    await cache.fill(gpu_id, {"status": "AVAILABLE"}, await cache.version(gpu_id))
+    assert await cache.get(gpu_id) == {"status": "AVAILABLE"}
+
+
+@pytest.mark.asyncio
+async def test_invalidation_drops_both_tiers():
+    cache = create_cache()
+    gpu_id = uuid.uuid4()
+    await cache.fill(gpu_id, {"status": "BUSY"}, await cache.version(gpu_id))
+
+    await cache.invalidate([gpu_id])
+    assert await cache.get(gpu_id) is None
+    assert await cache.backend.get(str(gpu_id)) is None
+
+
+@pytest.mark.asyncio
+async def test_get_gpu_checks_ownership_on_cached_hits(tmp_path, monkeypatch):
+    cache = create_cache()
+    monkeypatch.setattr(gpu_endpoints, "gpu_cache", cache)
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path}/cache.db")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+
+    async with AsyncSession(engine, expire_on_commit=False) as db:
+        organization = Organization(name="org")
+        gpu = GPU(
+            organization=organization,
+            status=GpuStatus.BUSY,
+            lease_expires_at=datetime(2026, 10, 18) + timedelta(days=1),
+        )
+        db.add(gpu)
+        await db.commit()
+
+        owner = SimpleNamespace(organization_id=organization.id)
+        stranger = SimpleNamespace(organization_id=uuid.uuid4())
+
+        response = await gpu_endpoints.get_gpu(db=db, current_user=owner, gpu_id=gpu.id)
+        assert json.loads(response.body)["id"] == str(gpu.id)
+        assert cache.stats()["misses"] == 1
+
+        with pytest.raises(HTTPException) as denied:
+            await gpu_endpoints.get_gpu(db=db, current_user=stranger, gpu_id=gpu.id)
+        assert denied.value.status_code == 403
+        assert cache.stats()["local_hits"] == 1
+
+        with pytest.raises(HTTPException) as missing:
+            await gpu_endpoints.get_gpu(db=db, current_user=owner, gpu_id=uuid.uuid4())
+        assert missing.value.status_code == 404
+    await engine.dispose()
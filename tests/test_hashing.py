@@ -0,0 +1,66 @@
+import asyncio
+import threading
+
+import bcrypt
+import pytest
+
+from src.backend.core.hashing import HashingExecutor, HashingQueueFull
+from src.backend.core.security import verify_bcrypt_api_key_secret
+
+
+def _bcrypt_hash(secret: str) -> str:
+    return bcrypt.hashpw(secret.encode("utf-8"), bcrypt.gensalt()).decode("utf-8")
+
+
+@pytest.mark.asyncio
+async def test_run_returns_result_and_counts():
+    executor = HashingExecutor(kind="thread", max_workers=2, max_queue=2)
+    try:
+        key_hash = await executor.run(_bcrypt_hash, "secret")
+        assert await executor.run(verify_bcrypt_api_key_secret, "secret", key_hash)
+        assert not await executor.run(verify_bcrypt_api_key_secret, "wrong", key_hash)
+    finally:
+        executor.shutdown()
+
+    stats = executor.stats()
+    assert stats["completed"] == 3
+    assert stats["in_flight"] == 0
+    assert stats["rejected"] == 0
+
+
+@pytest.mark.asyncio
+async def test_rejects_when_backlog_is_full():
+    executor = HashingExecutor(kind="thread", max_workers=1, max_queue=1)
+    release = threading.Event()
+    try:
+        blocked = [asyncio.ensure_future(executor.run(release.wait)) for _ in range(2)]
+        await asyncio.sleep(0.05)
+        assert executor.stats()["queued"] == 1
+
+        with pytest.raises(HashingQueueFull):
+            await executor.run(release.wait)
+
+        release.set()
+        await asyncio.gather(*blocked)
+    finally:
+        release.set()
+        executor.shutdown()
+
+    assert executor.stats()["rejected"] == 1
+    assert executor.stats()["completed"] == 2
+
+
+@pytest.mark.asyncio
+async def test_does_not_block_event_loop():
+    executor = HashingExecutor(kind="thread", max_workers=1, max_queue=1)
+    release = threading.Event()
+    try:
+        job = asyncio.ensure_future(executor.run(release.wait))
+        # The loop keeps serving other coroutines while the job is blocked.
+        await asyncio.sleep(0.01)
+        assert not job.done()
+        release.set()
+        assert await job is True
+    finally:
+        release.set()
+        executor.shutdown()
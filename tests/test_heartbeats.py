@@ -0,0 +1,190 @@
+import asyncio
+import uuid
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+
+from src.backend.api.v1.endpoints import gpus as gpu_endpoints
+from src.backend.core.database import Base
+from src.backend.core.gpu_cache import GPUCache, InMemoryGPUCacheBackend
+from src.backend.core.heartbeats import HeartbeatBuffer, build_heartbeat_update
+from src.backend.models import GPU, Organization
+from src.backend.models.gpu import GpuHealthState
+from src.backend.schemas.gpu import GPUHeartbeat
+
+
+class FakeResult:
+    def __init__(self, rows):
+        self.rows = rows
+
+    def all(self):
+        return self.rows
+
+
+class FakeSession:
+    def __init__(self, log, written=(), fail=False):
+        self.log = log
+        self.written = written
+        self.fail = fail
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    async def execute(self, statement):
+        if self.fail:
+            raise RuntimeError("database unavailable")
+        self.log.append(statement)
+        return FakeResult(list(self.written))
+
+    async def commit(self):
+        pass
+
+
+def create_cache():
+    return GPUCache(
+        InMemoryGPUCacheBackend(), ttl_seconds=300, local_ttl_seconds=60, local_max_entries=100
+    )
+
+
+def create_buffer(session_factory, cache=None):
+    return HeartbeatBuffer(
+        session_factory,
+        cache or create_cache(),
+        flush_interval=60,
+        max_pending=100,
+        staleness=60,
+    )
+
+
+def test_update_only_writes_changes_and_stale_rows():
+    now = datetime.now(timezone.utc)
+    statement = build_heartbeat_update(
+        {uuid.uuid4(): (GpuHealthState.HEALTHY, now)}, timedelta(seconds=60)
+    )
+    sql = str(statement.compile(dialect=postgresql.dialect()))
+
+    assert "FROM (VALUES" in sql
+    assert "gpus.last_seen < heartbeat.last_seen" in sql
+    assert "gpus.health_state != CAST(heartbeat.health_state AS gpuhealthstate)" in sql
+    assert "gpus.last_seen < heartbeat.stale_before" in sql
+    assert "updated_at=CASE WHEN" in sql
+
+
+@pytest.mark.asyncio
+async def test_flush_keeps_the_latest_heartbeat_per_gpu():
+    log = []
+    buffer = create_buffer(lambda: FakeSession(log))
+    gpu_id = uuid.uuid4()
+    earlier = datetime.now(timezone.utc)
+
+    buffer.record(gpu_id, GpuHealthState.DEGRADED, earlier + timedelta(seconds=5))
+    buffer.record(gpu_id, GpuHealthState.HEALTHY, earlier)
+    buffer.record(uuid.uuid4(), GpuHealthState.HEALTHY, earlier)
+
+    await buffer.flush()
+    assert len(log) == 1
+    values = log[0].compile().params.values()
+    assert "DEGRADED" in values and "HEALTHY" in values
+    assert buffer.stats()["rows_flushed"] == 2
+    assert buffer.stats()["pending"] == 0
+
+
+@pytest.mark.asyncio
+async def test_flush_invalidates_gpus_whose_health_changed():
+    cache = create_cache()
+    changed, refreshed = uuid.uuid4(), uuid.uuid4()
+    for gpu_id in (changed, refreshed):
+        await cache.fill(gpu_id, {"health_state": "HEALTHY"}, await cache.version(gpu_id))
+    written = [
+        SimpleNamespace(id=changed, health_changed=True),
+        SimpleNamespace(id=refreshed, health_changed=False),
+    ]
+    buffer = create_buffer(lambda: FakeSession([], written), cache)
+    buffer.record(changed, GpuHealthState.UNHEALTHY)
+    buffer.record(refreshed, GpuHealthState.HEALTHY)
+
+    assert await buffer.flush() == 2
+    assert await cache.get(changed) is None
+    assert await cache.get(refreshed) == {"health_state": "HEALTHY"}
+
+
+@pytest.mark.asyncio
+async def test_failed_flush_keeps_heartbeats():
+    buffer = create_buffer(lambda: FakeSession([], fail=True))
+    buffer.record(uuid.uuid4(), GpuHealthState.HEALTHY)
+
+    assert await buffer.flush() == 0
+    assert buffer.stats()["pending"] == 1
+    assert buffer.stats()["failed_flushes"] == 1
+
+
+class FailingCache:
+    async def invalidate(self, gpu_ids):
+        raise ConnectionError("redis unavailable")
+
+
+@pytest.mark.asyncio
+async def test_failed_invalidation_does_not_stop_flushing():
+    gpu_id = uuid.uuid4()
+    written = [SimpleNamespace(id=gpu_id, health_changed=True)]
+    buffer = create_buffer(lambda: FakeSession([], written), FailingCache())
+    buffer.flush_interval = 0.01
+    buffer.record(gpu_id, GpuHealthState.UNHEALTHY)
+
+    assert await buffer.flush() == 1
+    assert buffer.stats()["failed_invalidations"] == 1
+
+    # The background task keeps running past failed invalidations.
+    buffer.start()
+    buffer.record(gpu_id, GpuHealthState.HEALTHY)
+    await asyncio.sleep(0.05)
+    assert buffer.stats()["flushes"] == 2
+    assert buffer.stats()["failed_invalidations"] == 2
+    assert not buffer._task.done()
+    buffer.record(gpu_id, GpuHealthState.DEGRADED)
+    await buffer.stop()
+    assert buffer.stats()["flushes"] == 3
+
+
+@pytest.mark.asyncio
+async def test_heartbeat_endpoint_checks_ownership_and_buffers(tmp_path, monkeypatch):
+    buffer = create_buffer(lambda: FakeSession([]))
+    monkeypatch.setattr(gpu_endpoints, "gpu_cache", create_cache())
+    monkeypatch.setattr(gpu_endpoints, "heartbeat_buffer", buffer)
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path}/heartbeats.db")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+
+    async with AsyncSession(engine, expire_on_commit=False) as db:
+        organization = Organization(name="org")
+        gpu = GPU(organization=organization, lease_expires_at=datetime(2026, 10, 19))
+        db.add(gpu)
+        await db.commit()
+        heartbeat = GPUHeartbeat(health_state=GpuHealthState.HEALTHY)
+
+        ack = await gpu_endpoints.record_heartbeat(
+            db=db,
+            current_user=SimpleNamespace(organization_id=organization.id),
+            gpu_id=gpu.id,
+            heartbeat=heartbeat,
+        )
+        assert ack == {"accepted": 1}
+        assert buffer.stats()["pending"] == 1
+
+        with pytest.raises(HTTPException) as denied:
+            await gpu_endpoints.record_heartbeat(
+                db=db,
+                current_user=SimpleNamespace(organization_id=uuid.uuid4()),
+                gpu_id=gpu.id,
+                heartbeat=heartbeat,
+            )
+        assert denied.value.status_code == 403
+        assert buffer.stats()["recorded"] == 1
+    await engine.dispose()
@@ -0,0 +1,88 @@
+import asyncio
+
+import pytest
+from fastapi import FastAPI
+from httpx import ASGITransport, AsyncClient
+
+from src.backend.core.idempotency import IdempotencyMiddleware, InMemoryIdempotencyStore
+
+
+def make_app():
+    app = FastAPI()
+    app.state.calls = 0
+    app.add_middleware(IdempotencyMiddleware, store=InMemoryIdempotencyStore(max_entries=100))
+
+    @app.post("/allocate")
+    async def allocate(payload: dict):
+        app.state.calls += 1
+        await asyncio.sleep(0.05)
+        return {"call": app.state.calls, "payload": payload}
+
+    return app
+
+
+def client_for(app):
+    return AsyncClient(transport=ASGITransport(app=app), base_url="http://test")
+
+
+@pytest.mark.asyncio
+async def test_retry_replays_stored_response():
+    app = make_app()
+    headers = {"Authorization": "Bearer a.b", "Idempotency-Key": "key-1"}
+    async with client_for(app) as client:
+        first = await client.post("/allocate", json={"gpu": 1}, headers=headers)
+        second = await client.post("/allocate", json={"gpu": 1}, headers=headers)
+
+    assert app.state.calls == 1
+    assert second.status_code == first.status_code == 200
+    assert second.json() == first.json()
+    assert second.headers["Idempotent-Replayed"] == "true"
+
+
+@pytest.mark.asyncio
+async def test_concurrent_duplicates_execute_once():
+    app = make_app()
+    headers = {"Authorization": "Bearer a.b", "Idempotency-Key": "key-1"}
+    async with client_for(app) as client:
+        responses = await asyncio.gather(
+            *[client.post("/allocate", json={"gpu": 1}, headers=headers) for _ in range(5)]
+        )
+
+    assert app.state.calls == 1
+    assert {r.json()["call"] for r in responses} == {1}
+
+
+@pytest.mark.asyncio
+async def test_keys_are_scoped_per_credential():
+    app = make_app()
+    async with client_for(app) as client:
+        await client.post(
+            "/allocate", json={}, headers={"Authorization": "Bearer a.b", "Idempotency-Key": "k"}
+        )
+        await client.post(
+            "/allocate", json={}, headers={"Authorization": "Bearer c.d", "Idempotency-Key": "k"}
+        )
+
+    assert app.state.calls == 2
+
+
+@pytest.mark.asyncio
+async def test_reused_key_with_different_body_is_rejected():
+    app = make_app()
+    headers = {"Authorization": "Bearer a.b", "Idempotency-Key": "key-1"}
+    async with client_for(app) as client:
+        await client.post("/allocate", json={"gpu": 1}, headers=headers)
+        response = await client.post("/allocate", json={"gpu": 2}, headers=headers)
+
+    assert response.status_code == 422
+    assert app.state.calls == 1
+
+
+@pytest.mark.asyncio
+async def test_requests_without_key_are_not_deduplicated():
+    app = make_app()
+    async with client_for(app) as client:
+        await client.post("/allocate", json={})
+        await client.post("/allocate", json={})
+
+    assert app.state.calls == 2
@@ -0,0 +1,273 @@
+import uuid
+from datetime import datetime, timedelta, timezone
+
+from types import SimpleNamespace
+
+import pytest
+from sqlalchemy.dialects import postgresql
+
+from src.backend.core import idle_reclaim
+from src.backend.core.gpu_cache import GPUCache, InMemoryGPUCacheBackend
+from src.backend.core.idle_reclaim import IdleReclaimer
+from src.backend.core.quota import InMemoryQuotaBackend
+from src.backend.core.telemetry import TelemetryStore
+from src.backend.crud.gpu import IdleGPU, build_claim_idle_update, build_flag_idle_update
+from src.backend.models.gpu import GpuStatus
+from src.backend.models.organization import IdleAction
+
+NOW = 1_000_000.0
+
+
+def create_store():
+    return TelemetryStore(
+        raw_samples=100,
+        minute_samples=60,
+        hour_samples=24,
+        idle_utilization=5.0,
+        max_gpus=100,
+        clock=lambda: NOW,
+    )
+
+
+def report(store, gpu, utilizations):
+    """One sample a minute, ending now."""
+    for i, utilization in enumerate(reversed(utilizations)):
+        store.record(gpu.id, gpu.organization_id, [utilization, None, None, None], at=NOW - i * 60)
+
+
+def test_idle_gpus():
+    store = create_store()
+    organization_id = uuid.uuid4()
+    idle, busy, new, blip = (
+        SimpleNamespace(id=uuid.uuid4(), organization_id=organization_id) for _ in range(4)
+    )
+    report(store, idle, [0] * 31)
+    report(store, busy, [0] * 20 + [90] * 11)
+    report(store, new, [0] * 10)
+    report(store, blip, [0] * 30 + [50])
+
+    idle_ids, active_ids = store.idle_gpus(organization_id, 1800, min_idle_fraction=0.95)
+    assert set(idle_ids) == {idle.id, blip.id}
+    assert active_ids == [busy.id]
+    assert store.idle_gpus(uuid.uuid4(), 1800, 0.95) == ([], [])
+
+
+def test_idle_updates_check_owner_status_and_flag():
+    idle = [IdleGPU(uuid.uuid4(), uuid.uuid4(), datetime.now(timezone.utc), None)]
+    flag = str(build_flag_idle_update(idle).compile(dialect=postgresql.dialect()))
+    assert "FROM (VALUES" in flag
+    assert "gpus.organization_id = idle.organization_id" in flag
+    assert "gpus.idle_since IS NULL" in flag
+    assert "lease_expires_at=CASE WHEN (idle.lease_expires_at < gpus.lease_expires_at)" in flag
+
+    claim = str(build_claim_idle_update(idle).compile(dialect=postgresql.dialect()))
+    assert "gpus.organization_id = idle.organization_id" in claim
+    assert "gpus.idle_since <= idle.flagged_before" in claim
+
+
+class FakeSession:
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    async def commit(self):
+        pass
+
+
+class FakeGPUCrud:
+    """Applies the idle statements' guards to GPUs kept in memory."""
+
+    def __init__(self, gpus):
+        self.gpus = {gpu.id: gpu for gpu in gpus}
+        self.statements = 0
+
+    def _owned(self, idle: IdleGPU):
+        gpu = self.gpus.get(idle.id)
+        if gpu and gpu.organization_id == idle.organization_id and gpu.status == GpuStatus.BUSY:
+            return gpu
+
+    async def clear_idle(self, db, *, gpu_ids):
+        self.statements += 1
+        cleared = [self.gpus[i] for i in gpu_ids if self.gpus[i].idle_since]
+        for gpu in cleared:
+            gpu.idle_since = None
+        return [gpu.id for gpu in cleared]
+
+    async def flag_idle(self, db, idle):
+        self.statements += 1
+        flagged = []
+        for item in idle:
+            gpu = self._owned(item)
+            if gpu and gpu.idle_since is None:
+                gpu.idle_since = datetime.now(timezone.utc)
+                if item.lease_expires_at:
+                    gpu.lease_expires_at = min(gpu.lease_expires_at, item.lease_expires_at)
+                flagged.append(gpu.id)
+        return flagged
+
+    async def claim_idle(self, db, idle):
+        self.statements += 1
+        claimed = []
+        for item in idle:
+            gpu = self._owned(item)
+            if gpu and gpu.idle_since and gpu.idle_since <= item.flagged_before:
+                gpu.status = GpuStatus.DEPROVISIONING
+                claimed.append(gpu)
+        return claimed
+
+    async def count_warm_pool(self, db):
+        return {}
+
+    async def return_to_warm_pool(self, db, gpu_ids, *, lease_expires_at):
+        for gpu_id in gpu_ids:
+            gpu = self.gpus[gpu_id]
+            gpu.status, gpu.organization_id, gpu.idle_since = GpuStatus.AVAILABLE, None, None
+
+
+class FakeOrganizationCrud:
+    def __init__(self, *policies):
+        self.policies = policies
+
+    async def get_idle_policies(self, db):
+        return self.policies
+
+
+def create_organization(action, gpus=3):
+    policy = SimpleNamespace(
+        id=uuid.uuid4(), idle_timeout_seconds=1800, idle_action=action, idle_grace_seconds=0
+    )
+    lease = datetime.now(timezone.utc) + timedelta(hours=1)
+    return policy, [
+        SimpleNamespace(
+            id=uuid.uuid4(),
+            organization_id=policy.id,
+            gpu_model="a100",
+            region="us-east-1",
+            gang_id=None,
+            status=GpuStatus.BUSY,
+            idle_since=None,
+            lease_expires_at=lease,
+        )
+        for _ in range(gpus)
+    ]
+
+
+def create_reclaimer(monkeypatch, store, policies, gpus, **overrides):
+    reclaimed, dispatched = [], []
+    crud = FakeGPUCrud(gpus)
+    monkeypatch.setattr(idle_reclaim, "gpu_crud", crud)
+    monkeypatch.setattr(idle_reclaim, "organization_crud", FakeOrganizationCrud(*policies))
+    options = dict(
+        interval=60,
+        min_idle_fraction=0.95,
+        batch_size=2,
+        warm_pool_targets=None,
+        reclaim=reclaimed.append,
+        dispatch=lambda: dispatched.append(True),
+    )
+    options.update(overrides)
+    cache = GPUCache(
+        InMemoryGPUCacheBackend(), ttl_seconds=60, local_ttl_seconds=1, local_max_entries=10
+    )
+    quota = InMemoryQuotaBackend(reservation_ttl=60)
+    reclaimer = IdleReclaimer(FakeSession, store, cache, quota, **options)
+    return reclaimer, crud, reclaimed, dispatched
+
+
+@pytest.mark.asyncio
+async def test_idle_gpus_are_flagged_then_cleared(monkeypatch):
+    store = create_store()
+    policy, (idle, busy, silent) = create_organization(IdleAction.NOTIFY)
+    reclaimer, _, reclaimed, _ = create_reclaimer(monkeypatch, store, [policy], [idle, busy, silent])
+    lease = idle.lease_expires_at
+    report(store, idle, [0] * 31)
+    report(store, busy, [90] * 31)
+
+    assert await reclaimer.run_once() == {"flagged": 1, "cleared": 0, "reclaimed": 0, "returned": 0}
+    assert idle.idle_since is not None
+    assert busy.idle_since is None and silent.idle_since is None
+    # NOTIFY leaves leases and GPUs alone.
+    assert idle.lease_expires_at == lease and idle.status == GpuStatus.BUSY
+    assert (await reclaimer.run_once())["flagged"] == 0
+    assert reclaimed == []
+
+    # Busy again for the last three minutes.
+    report(store, idle, [90] * 3)
+    assert (await reclaimer.run_once())["cleared"] == 1
+    assert idle.idle_since is None
+
+
+@pytest.mark.asyncio
+async def test_shorten_lease_cuts_leases_in_batches(monkeypatch):
+    store = create_store()
+    policy, gpus = create_organization(IdleAction.SHORTEN_LEASE)
+    reclaimer, crud, _, _ = create_reclaimer(monkeypatch, store, [policy], gpus)
+    for gpu in gpus:
+        report(store, gpu, [0] * 31)
+
+    assert (await reclaimer.run_once())["flagged"] == 3
+    # Three GPUs in batches of two.
+    assert crud.statements == 2
+    for gpu in gpus:
+        assert gpu.status == GpuStatus.BUSY
+        assert gpu.lease_expires_at <= datetime.now(timezone.utc)
+
+
+@pytest.mark.asyncio
+async def test_reclaim_after_the_grace_period(monkeypatch):
+    store = create_store()
+    policy, gpus = create_organization(IdleAction.RECLAIM)
+    other_policy, (other,) = create_organization(IdleAction.RECLAIM, gpus=1)
+    reclaimer, _, reclaimed, dispatched = create_reclaimer(
+        monkeypatch,
+        store,
+        [policy, other_policy],
+        [*gpus, other],
+        warm_pool_targets={"a100": {"us-east-1": 1}},
+    )
+    for gpu in gpus:
+        report(store, gpu, [0] * 31)
+    # Telemetry that a GPU left behind in another organization is not acted on.
+    report(store, SimpleNamespace(id=other.id, organization_id=policy.id), [0] * 31)
+
+    # GPUs are flagged in one pass and reclaimed in a later one.
+    assert await reclaimer.run_once() == {"flagged": 3, "cleared": 0, "reclaimed": 0, "returned": 0}
+    assert await reclaimer.run_once() == {"flagged": 0, "cleared": 0, "reclaimed": 2, "returned": 1}
+
+    warm = [gpu for gpu in gpus if gpu.status == GpuStatus.AVAILABLE]
+    assert len(warm) == 1
+    assert warm[0].organization_id is None and warm[0].idle_since is None
+    assert sorted(gpu_id for batch in reclaimed for gpu_id in batch) == sorted(
+        str(gpu.id) for gpu in gpus if gpu is not warm[0]
+    )
+    assert all(gpu.status == GpuStatus.DEPROVISIONING for gpu in gpus if gpu is not warm[0])
+    assert dispatched == [True]
+    assert other.status == GpuStatus.BUSY and other.idle_since is None
+
+
+@pytest.mark.asyncio
+async def test_gpus_claimed_after_return_start_without_telemetry(monkeypatch):
+    store = create_store()
+    policy, (gpu,) = create_organization(IdleAction.RECLAIM, gpus=1)
+    other_policy, _ = create_organization(IdleAction.RECLAIM, gpus=0)
+    reclaimer, _, reclaimed, _ = create_reclaimer(
+        monkeypatch,
+        store,
+        [policy, other_policy],
+        [gpu],
+        warm_pool_targets={"a100": {"us-east-1": 1}},
+    )
+    report(store, gpu, [0] * 31)
+    await reclaimer.run_once()
+    assert (await reclaimer.run_once())["returned"] == 1
+    assert store.gpu_telemetry(gpu.id, 1800) is None
+
+    # Claimed from the warm pool by another organization, which has only
+    # just started using it.
+    gpu.status, gpu.organization_id = GpuStatus.BUSY, other_policy.id
+    report(store, gpu, [0])
+    assert await reclaimer.run_once() == {"flagged": 0, "cleared": 0, "reclaimed": 0, "returned": 0}
+    assert gpu.idle_since is None
+    assert reclaimed == []
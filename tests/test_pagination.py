@@ -0,0 +1,66 @@
+import uuid
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.future import select
+
+from src.backend.core.database import Base
+from src.backend.core.pagination import PageParams, decode_cursor, encode_cursor, page_params
+from src.backend.crud.api_key import api_key as api_key_crud
+from src.backend.models import APIKey, Organization, User
+
+
+def test_cursor_round_trip():
+    key = (datetime(2026, 10, 18, 12, 0, 0, 123456, tzinfo=timezone.utc), uuid.uuid4())
+
+    cursor = encode_cursor(key)
+    assert "=" not in cursor
+    assert decode_cursor(cursor) == key
+
+    with pytest.raises(ValueError):
+        decode_cursor("not-a-cursor")
+    with pytest.raises(HTTPException):
+        page_params(cursor="not-a-cursor", limit=10, skip=0)
+
+
+@pytest.mark.asyncio
+async def test_pages_follow_created_at_then_id(tmp_path):
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path}/pages.db")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+
+    async with AsyncSession(engine, expire_on_commit=False) as db:
+        organization = Organization(name="org")
+        user = User(organization=organization, email="a@example.com", hashed_password="x")
+        # Keys created in one transaction share created_at; the ID breaks ties.
+        created_at = datetime(2026, 10, 18)
+        keys = [
+            APIKey(
+                user=user,
+                organization=organization,
+                key_hash=f"hash-{n}",
+                key_prefix=f"{n:08d}",
+                created_at=created_at + timedelta(seconds=n // 3),
+            )
+            for n in range(10)
+        ]
+        db.add_all(keys)
+        await db.commit()
+        expected = (await db.execute(
+            select(APIKey.id).order_by(APIKey.created_at, APIKey.id)
+        )).scalars().all()
+
+        seen = []
+        page = PageParams(after=None, limit=4)
+        while True:
+            rows, next_key = await api_key_crud.get_multi_by_user(db, user_id=user.id, page=page)
+            seen.extend(row.id for row in rows)
+            if next_key is None:
+                break
+            page = PageParams(after=decode_cursor(encode_cursor(next_key)), limit=4)
+
+    assert seen == expected
+    assert len(seen) == 10
+    await engine.dispose()
@@ -0,0 +1,279 @@
+import uuid
+from collections import namedtuple
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+
+import pytest
+from botocore.exceptions import ClientError
+from sqlalchemy import select
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+
+from src.backend import worker
+from src.backend.cloud.base import InstanceState, InsufficientCapacity
+from src.backend.cloud.ec2 import EC2Provider
+from src.backend.core.database import Base
+from src.backend.core.gpu_cache import GPUCache, InMemoryGPUCacheBackend
+from src.backend.core.provisioning import Transition, plan_transitions
+from src.backend.core.quota import InMemoryQuotaBackend
+from src.backend.core.rate_limit import CloudAPIUnavailable
+from src.backend.crud.gpu import build_expire_leases_update, build_transition_update
+from src.backend.models import GPU, Organization
+from src.backend.models.gpu import GpuStatus
+
+Launching = namedtuple("Launching", "id gang_id all_or_nothing instance_id created_at")
+NOW = datetime.now(timezone.utc)
+
+
+def launching(instance_id, gang_id=None, all_or_nothing=False, age=0):
+    return Launching(uuid.uuid4(), gang_id, all_or_nothing, instance_id, NOW - timedelta(seconds=age))
+
+
+def instance(instance_id, state, ip=None):
+    return InstanceState(instance_id, state, ip)
+
+
+def by_gpu(transitions):
+    return {t.gpu_id: t for t in transitions}
+
+
+def test_running_gpu_becomes_available():
+    gpu = launching("i-1")
+    other = launching("i-2")
+    plan = by_gpu(plan_transitions(
+        [gpu, other], {"i-1": instance("i-1", "running", "1.2.3.4"), "i-2": instance("i-2", "pending")},
+        NOW, timeout=600,
+    ))
+
+    assert plan == {gpu.id: Transition(gpu.id, GpuStatus.AVAILABLE, "1.2.3.4")}
+
+
+def test_gang_becomes_available_together():
+    gang_id = uuid.uuid4()
+    gpus = [launching("i-1", gang_id), launching("i-2", gang_id)]
+    states = {"i-1": instance("i-1", "running"), "i-2": instance("i-2", "pending")}
+    assert plan_transitions(gpus, states, NOW, timeout=600) == []
+
+    states["i-2"] = instance("i-2", "running")
+    assert {t.status for t in plan_transitions(gpus, states, NOW, timeout=600)} == {GpuStatus.AVAILABLE}
+
+
+def test_failure_rolls_back_all_or_nothing_gang():
+    gang_id = uuid.uuid4()
+    gpus = [launching("i-1", gang_id, True), launching("i-2", gang_id, True)]
+    states = {"i-1": instance("i-1", "running"), "i-2": instance("i-2", "terminated")}
+
+    plan = plan_transitions(gpus, states, NOW, timeout=600)
+    assert [t.status for t in plan] == [GpuStatus.ERROR, GpuStatus.ERROR]
+
+    # Without all-or-nothing only the failed GPU goes.
+    gpus = [launching("i-1", gang_id), launching("i-2", gang_id)]
+    plan = by_gpu(plan_transitions(gpus, states, NOW, timeout=600))
+    assert plan[gpus[1].id].status == GpuStatus.ERROR
+    assert plan[gpus[0].id].status == GpuStatus.AVAILABLE
+
+
+def test_timed_out_gpu_fails():
+    gpu = launching("i-1", age=1200)
+    plan = plan_transitions([gpu], {}, NOW, timeout=600)
+
+    assert plan == [Transition(gpu.id, GpuStatus.ERROR)]
+
+
+class FakeEC2:
+    def __init__(self, known):
+        self.known = known
+        self.calls = []
+
+    def describe_instances(self, InstanceIds):
+        self.calls.append(len(InstanceIds))
+        unknown = [i for i in InstanceIds if i not in self.known]
+        if unknown:
+            raise ClientError(
+                {"Error": {"Code": "InvalidInstanceID.NotFound",
+                           "Message": f"The instance IDs '{', '.join(unknown)}' do not exist"}},
+                "DescribeInstances",
+            )
+        instances = [{"InstanceId": i, "State": {"Name": "running"}} for i in InstanceIds]
+        return {"Reservations": [{"Instances": instances}]}
+
+    def client(self, region):
+        return self
+
+
+def test_describe_instances_batches_and_skips_unknown_ids():
+    ids = [f"i-{n:x}" for n in range(2500)]
+    ec2 = FakeEC2(known=set(ids) - {"i-5"})
+    provider = EC2Provider(ec2, image_id="ami-1", security_group_ids=["sg-1"], key_name="key")
+
+    instances = provider.describe("us-east-1", ids)
+
+    assert len(instances) == 2499
+    assert instances["i-0"] == InstanceState("i-0", "running")
+    assert ec2.calls == [1000, 999, 1000, 500]
+
+
+def test_transition_update_is_one_statement():
+    statement = build_transition_update(
+        [Transition(uuid.uuid4(), GpuStatus.AVAILABLE, "1.2.3.4"), Transition(uuid.uuid4(), GpuStatus.ERROR)]
+    )
+    sql = str(statement.compile(dialect=postgresql.dialect()))
+
+    assert "FROM (VALUES" in sql
+    assert "status=CAST(transition.status AS gpustatus)" in sql
+    assert "gpus.status = " in sql
+    assert "RETURNING" in sql
+
+
+def test_expire_leases_update_claims_one_indexed_batch():
+    statement = build_expire_leases_update(NOW, 1000)
+    sql = str(statement.compile(dialect=postgresql.dialect()))
+
+    assert sql.startswith("UPDATE gpus SET status=")
+    assert "gpus.lease_expires_at < " in sql
+    assert "ORDER BY gpus.lease_expires_at" in sql
+    assert "FOR UPDATE SKIP LOCKED" in sql
+    assert "RETURNING gpus.id" in sql
+
+
+class FakeCloud:
+    """Launches instances per ClientToken, like EC2, failing as scripted."""
+
+    def __init__(self, *failures, capacity=None):
+        self.failures = list(failures)
+        self.capacity = capacity
+        self.tokens = []
+        self.launched = {}
+        self.terminated = []
+
+    def launch(self, region, *, client_token, min_count, max_count, **options):
+        self.tokens.append(client_token)
+        failure = self.failures.pop(0) if self.failures else None
+        if failure and not failure.args[0].startswith("after launch"):
+            raise failure
+        if client_token not in self.launched:
+            count = min(max_count, self.capacity or max_count)
+            if count < min_count:
+                raise InsufficientCapacity("not enough capacity")
+            self.launched[client_token] = [f"i-{client_token[:8]}-{n}" for n in range(count)]
+        if failure:
+            # The launch went through, but its response was lost.
+            raise failure
+        return list(self.launched[client_token])
+
+    def terminate(self, region, instance_ids):
+        self.terminated += instance_ids
+
+    def create_placement_group(self, region, name):
+        pass
+
+
+async def create_launch(tmp_path, monkeypatch, cloud, count=2, all_or_nothing=True):
+    """A gang request reserved by the API, and a worker runtime to launch it with."""
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path}/launch.db")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    async with AsyncSession(engine, expire_on_commit=False) as db:
+        organization = Organization(name="org", max_active_gpus=count)
+        db.add(organization)
+        await db.commit()
+        organization_id = str(organization.id)
+
+    gpu_ids = [str(uuid.uuid4()) for _ in range(count)]
+    gang_id = str(uuid.uuid4())
+    completed = []
+    runtime = SimpleNamespace(
+        session=lambda: AsyncSession(engine, expire_on_commit=False),
+        quota=InMemoryQuotaBackend(reservation_ttl=60),
+        gpu_cache=GPUCache(
+            InMemoryGPUCacheBackend(), ttl_seconds=60, local_ttl_seconds=1, local_max_entries=10
+        ),
+        scheduler=SimpleNamespace(complete=lambda request_id: _append(completed, request_id)),
+        cloud=cloud,
+        run=lambda coro: coro,
+    )
+    monkeypatch.setattr(worker, "runtime", runtime)
+    monkeypatch.setattr(worker.dispatch_allocations, "delay", lambda: None)
+    assert await runtime.quota.reserve_many(organization_id, gpu_ids, limit=count)
+    payload = {
+        "gpu_model": "NVIDIA A100",
+        "region": "us-east-1",
+        "gpu_id": gpu_ids[0],
+        "gpu_ids": gpu_ids,
+        "gang_id": gang_id,
+        "request_id": gang_id,
+        "all_or_nothing": all_or_nothing,
+        "organization_id": organization_id,
+        "user_id": None,
+    }
+    return engine, runtime, payload, completed
+
+
+async def _append(items, item):
+    items.append(item)
+
+
+async def load_gpus(engine):
+    async with AsyncSession(engine) as db:
+        result = await db.execute(select(GPU.status, GPU.instance_id).order_by(GPU.instance_id))
+        return result.all()
+
+
+@pytest.mark.asyncio
+async def test_failed_launch_rolls_back_records_and_quota(tmp_path, monkeypatch):
+    cloud = FakeCloud(InsufficientCapacity("no capacity"))
+    engine, runtime, payload, completed = await create_launch(tmp_path, monkeypatch, cloud)
+
+    result = await worker.provision_gpu(payload)
+    assert result == {"status": "error", "error_message": "no capacity"}
+    assert await load_gpus(engine) == [(GpuStatus.ERROR, None), (GpuStatus.ERROR, None)]
+    assert await runtime.quota.usage(payload["organization_id"]) == {"active": 0, "reserved": 0}
+    # The request no longer holds a provisioning slot.
+    assert completed == [payload["request_id"]]
+    await engine.dispose()
+
+
+@pytest.mark.asyncio
+async def test_short_launch_fails_only_the_missing_gpus(tmp_path, monkeypatch):
+    cloud = FakeCloud(capacity=1)
+    engine, runtime, payload, completed = await create_launch(
+        tmp_path, monkeypatch, cloud, all_or_nothing=False
+    )
+
+    assert (await worker.provision_gpu(payload))["status"] == "launched"
+    instance_id = cloud.launched[payload["gang_id"]][0]
+    assert await load_gpus(engine) == [
+        (GpuStatus.ERROR, None),
+        (GpuStatus.PROVISIONING, instance_id),
+    ]
+    assert await runtime.quota.usage(payload["organization_id"]) == {"active": 1, "reserved": 0}
+    assert completed == []
+    await engine.dispose()
+
+
+@pytest.mark.asyncio
+async def test_retried_launch_reuses_records_and_client_token(tmp_path, monkeypatch):
+    cloud = FakeCloud(
+        CloudAPIUnavailable("throttled"), CloudAPIUnavailable("after launch: timed out")
+    )
+    engine, runtime, payload, completed = await create_launch(tmp_path, monkeypatch, cloud)
+
+    # Called directly, the task raises where Celery would schedule a retry;
+    # the records and reservations are kept for it.
+    for _ in range(2):
+        with pytest.raises(CloudAPIUnavailable):
+            await worker.provision_gpu(payload)
+        assert await load_gpus(engine) == [(GpuStatus.PROVISIONING, None)] * 2
+        assert await runtime.quota.usage(payload["organization_id"]) == {"active": 2, "reserved": 0}
+
+    # The instances launched by the attempt whose response was lost are the
+    # ones the retry records.
+    assert await worker.provision_gpu(payload) == {
+        "status": "launched",
+        "gpu_ids": payload["gpu_ids"],
+    }
+    assert cloud.tokens == [payload["gang_id"]] * 3
+    launched = cloud.launched[payload["gang_id"]]
+    assert await load_gpus(engine) == [(GpuStatus.PROVISIONING, i) for i in sorted(launched)]
+    assert cloud.terminated == [] and completed == []
+    await engine.dispose()
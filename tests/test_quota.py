@@ -0,0 +1,150 @@
+from types import SimpleNamespace
+import uuid
+
+import pytest
+
+from src.backend import worker
+from src.backend.core import quota as quota_module
+from src.backend.core.quota import InMemoryQuotaBackend, QuotaExceeded, RedisQuotaBackend
+
+
+@pytest.mark.asyncio
+async def test_reserve_respects_limit():
+    quota = InMemoryQuotaBackend(reservation_ttl=60)
+
+    assert await quota.reserve("org", "gpu-1", limit=2)
+    assert await quota.reserve("org", "gpu-2", limit=2)
+    assert not await quota.reserve("org", "gpu-3", limit=2)
+    assert await quota.usage("org") == {"active": 0, "reserved": 2}
+    assert quota.stats()["denied"] == 1
+
+
+@pytest.mark.asyncio
+async def test_reserve_is_idempotent():
+    quota = InMemoryQuotaBackend(reservation_ttl=60)
+
+    assert await quota.reserve("org", "gpu-1", limit=1)
+    assert await quota.reserve("org", "gpu-1", limit=1)
+    await quota.commit("org", "gpu-1")
+    assert await quota.reserve("org", "gpu-1", limit=1)
+    assert await quota.usage("org") == {"active": 1, "reserved": 0}
+
+
+@pytest.mark.asyncio
+async def test_commit_and_release():
+    quota = InMemoryQuotaBackend(reservation_ttl=60)
+    await quota.reserve("org", "gpu-1", limit=1)
+    await quota.commit("org", "gpu-1")
+
+    assert not await quota.reserve("org", "gpu-2", limit=1)
+
+    await quota.release("org", "gpu-1")
+    assert await quota.reserve("org", "gpu-2", limit=1)
+
+
+@pytest.mark.asyncio
+async def test_uncommitted_reservations_expire():
+    quota = InMemoryQuotaBackend(reservation_ttl=0)
+    await quota.reserve("org", "gpu-1", limit=1)
+
+    assert await quota.reserve("org", "gpu-2", limit=1)
+
+
+@pytest.mark.asyncio
+async def test_organizations_are_independent():
+    quota = InMemoryQuotaBackend(reservation_ttl=60)
+
+    assert await quota.reserve("org-a", "gpu-1", limit=1)
+    assert await quota.reserve("org-b", "gpu-2", limit=1)
+
+
+@pytest.mark.asyncio
+async def test_reconcile_resets_active_set_outside_grace():
+    quota = InMemoryQuotaBackend(reservation_ttl=60)
+    await quota.reserve("org", "gpu-1", limit=5)
+    await quota.commit("org", "gpu-1")
+    await quota.reserve("org", "gpu-2", limit=5)
+
+    # gpu-1 was committed just now, so a grace period protects it.
+    await quota.reconcile("org", ["gpu-2", "gpu-3"], grace=60)
+    assert await quota.usage("org") == {"active": 3, "reserved": 0}
+
+    await quota.reconcile("org", ["gpu-2", "gpu-3"], grace=0)
+    assert await quota.usage("org") == {"active": 2, "reserved": 0}
+
+
+@pytest.mark.asyncio
+async def test_reserve_many_is_all_or_nothing():
+    quota = InMemoryQuotaBackend(reservation_ttl=60)
+    await quota.reserve("org", "gpu-1", limit=4)
+
+    assert not await quota.reserve_many("org", ["gpu-2", "gpu-3", "gpu-4", "gpu-5"], limit=4)
+    assert await quota.usage("org") == {"active": 0, "reserved": 1}
+
+    assert await quota.reserve_many("org", ["gpu-1", "gpu-2", "gpu-3", "gpu-4"], limit=4)
+    await quota.commit_many("org", ["gpu-1", "gpu-2", "gpu-3", "gpu-4"])
+    assert await quota.usage("org") == {"active": 4, "reserved": 0}
+
+    await quota.release_many("org", ["gpu-3", "gpu-4"])
+    assert await quota.usage("org") == {"active": 2, "reserved": 0}
+
+
+async def check_expired_reservations_are_not_committed(quota):
+    await quota.reserve("org", "gpu-1", limit=2)
+    quota.reservation_ttl = 0
+    await quota.reserve("org", "gpu-2", limit=2)
+
+    # gpu-2's reservation expired: committing it must not take the limit.
+    assert await quota.commit_many("org", ["gpu-1", "gpu-2"]) == ["gpu-2"]
+    assert await quota.usage("org") == {"active": 1, "reserved": 0}
+    assert not await quota.commit("org", "gpu-3")
+
+
+@pytest.mark.asyncio
+async def test_expired_reservations_are_not_committed():
+    await check_expired_reservations_are_not_committed(InMemoryQuotaBackend(reservation_ttl=60))
+
+
+@pytest.mark.asyncio
+async def test_redis_expired_reservations_are_not_committed(monkeypatch):
+    fakeredis = pytest.importorskip("fakeredis")
+    pytest.importorskip("lupa")
+    monkeypatch.setattr(
+        quota_module.redis,
+        "from_url",
+        lambda url, **kwargs: fakeredis.aioredis.FakeRedis(**kwargs),
+    )
+    await check_expired_reservations_are_not_committed(
+        RedisQuotaBackend("redis://unused", reservation_ttl=60)
+    )
+
+
+class FakeSession:
+    def __init__(self, max_active_gpus):
+        self.organization = SimpleNamespace(max_active_gpus=max_active_gpus)
+
+    async def get(self, model, id):
+        return self.organization
+
+
+@pytest.mark.asyncio
+async def test_worker_reserves_expired_reservations_again(monkeypatch):
+    quota = InMemoryQuotaBackend(reservation_ttl=60)
+    monkeypatch.setattr(worker.runtime, "quota", quota)
+    organization_id = str(uuid.uuid4())
+    await quota.reserve(organization_id, "gpu-1", limit=2)
+    quota.reservation_ttl = 0
+    await quota.reserve(organization_id, "gpu-2", limit=2)
+    quota.reservation_ttl = 60
+
+    await worker.commit_reservations(FakeSession(2), organization_id, ["gpu-1", "gpu-2"])
+    assert await quota.usage(organization_id) == {"active": 2, "reserved": 0}
+
+    # Another request took the quota while this one waited.
+    quota.reservation_ttl = 0
+    await quota.reserve(organization_id, "gpu-3", limit=3)
+    quota.reservation_ttl = 60
+    await quota.reserve(organization_id, "gpu-4", limit=4)
+    with pytest.raises(QuotaExceeded):
+        await worker.commit_reservations(FakeSession(3), organization_id, ["gpu-3"])
+    assert await quota.usage(organization_id) == {"active": 2, "reserved": 1}
@@ -0,0 +1,118 @@
+from types import SimpleNamespace
+
+import pytest
+from botocore.exceptions import ClientError
+
+from src.backend.core.rate_limit import (
+    CloudAPIGuard,
+    CloudAPIUnavailable,
+    GuardedClient,
+    InMemoryRateLimitBackend,
+)
+
+
+class UnmeteredBackend(InMemoryRateLimitBackend):
+    """Adapts rates and trips breakers, but never makes a call wait."""
+
+    def take(self, key, rate, burst):
+        return 0.0
+
+
+def make_guard(backend=None, **overrides):
+    options = dict(
+        rates={"RunInstances": 2.0},
+        default_rate=10.0,
+        min_rate=0.5,
+        increase=0.5,
+        decrease=0.5,
+        max_attempts=3,
+        base_delay=0.1,
+        max_delay=1.0,
+        failure_threshold=3,
+        cooldown=30.0,
+        sleep=lambda seconds: None,
+    )
+    options.update(overrides)
+    return CloudAPIGuard(backend or UnmeteredBackend(), **options)
+
+
+def error(code):
+    return ClientError({"Error": {"Code": code, "Message": code}}, "RunInstances")
+
+
+def flaky(*errors, result="ok"):
+    remaining = list(errors)
+
+    def call():
+        if remaining:
+            raise remaining.pop(0)
+        return result
+
+    return call
+
+
+def test_token_bucket_limits_burst():
+    backend = InMemoryRateLimitBackend()
+
+    assert backend.take("us-east-1:RunInstances", rate=2, burst=2) == 0
+    assert backend.take("us-east-1:RunInstances", rate=2, burst=2) == 0
+    assert backend.take("us-east-1:RunInstances", rate=2, burst=2) == pytest.approx(0.5, abs=0.01)
+
+
+def test_throttling_is_retried_and_halves_the_rate():
+    backend = UnmeteredBackend()
+    guard = make_guard(backend)
+
+    assert guard.call("us-east-1", "RunInstances", flaky(error("RequestLimitExceeded"))) == "ok"
+
+    # Halved from 2.0 on the throttle, then increased by 0.5 on the success.
+    assert backend.get_rate("us-east-1:RunInstances") == 1.5
+    assert guard.stats()["throttled"] == 1
+    assert guard.stats()["retries"] == 1
+
+
+def test_rate_never_drops_below_minimum():
+    backend = UnmeteredBackend()
+    guard = make_guard(backend, max_attempts=10, failure_threshold=100)
+    throttles = [error("Throttling")] * 5
+
+    guard.call("us-east-1", "RunInstances", flaky(*throttles))
+    assert backend.get_rate("us-east-1:RunInstances") == 1.0
+
+
+def test_non_retryable_errors_are_raised_immediately():
+    guard = make_guard()
+
+    with pytest.raises(ClientError):
+        guard.call("us-east-1", "RunInstances", flaky(error("InvalidParameterValue")))
+    assert guard.stats()["retries"] == 0
+
+
+def test_breaker_opens_and_fails_fast():
+    guard = make_guard()
+    failing = flaky(*[error("ServiceUnavailable")] * 3)
+
+    with pytest.raises(CloudAPIUnavailable):
+        guard.call("us-east-1", "DescribeInstances", failing)
+    with pytest.raises(CloudAPIUnavailable):
+        guard.call("us-east-1", "DescribeInstances", lambda: "ok")
+    assert guard.stats()["rejected"] == 1
+
+    # Other regions are unaffected.
+    assert guard.call("eu-west-1", "DescribeInstances", lambda: "ok") == "ok"
+
+
+def test_guarded_client_routes_api_calls_through_the_guard():
+    calls = []
+    client = SimpleNamespace(
+        meta=SimpleNamespace(method_to_api_mapping={"run_instances": "RunInstances"}),
+        run_instances=lambda **kwargs: kwargs,
+        can_paginate=lambda name: False,
+    )
+    guard = make_guard()
+    guard.call = lambda region, action, fn, *args, **kwargs: calls.append((region, action)) or fn(**kwargs)
+    guarded = GuardedClient(client, "us-east-1", guard)
+
+    assert guarded.run_instances(MinCount=1) == {"MinCount": 1}
+    assert guarded.can_paginate("x") is False
+    assert calls == [("us-east-1", "RunInstances")]
@@ -0,0 +1,74 @@
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import List
+
+import pytest
+from pydantic import TypeAdapter
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+
+from src.backend.core.database import Base
+from src.backend.core.pagination import PageParams
+from src.backend.core.responses import FastJSONResponse
+from src.backend.crud.gpu import gpu as gpu_crud
+from src.backend.models import GPU, Organization, User
+from src.backend.models.gpu import GpuStatus
+from src.backend.schemas import gpu as gpu_schema
+
+GPU_LIST = TypeAdapter(List[gpu_schema.GPU])
+
+
+def test_fast_json_writes_utc_like_pydantic():
+    row = {
+        "id": uuid.uuid4(),
+        "status": GpuStatus.BUSY,
+        "created_at": datetime(2026, 10, 18, 12, 0, 0, 5, tzinfo=timezone.utc),
+        "updated_at": datetime(2026, 10, 18, 14, 0, tzinfo=timezone(timedelta(hours=2))),
+    }
+    body = FastJSONResponse([row]).body
+
+    class Row(gpu_schema.GPUBase):
+        id: uuid.UUID
+        status: GpuStatus
+        created_at: datetime
+        updated_at: datetime
+
+    assert body == TypeAdapter(List[Row]).dump_json([Row(**row)])
+
+
+@pytest.mark.asyncio
+async def test_row_listing_matches_the_response_model(tmp_path):
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path}/rows.db")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+
+    async with AsyncSession(engine, expire_on_commit=False) as db:
+        organization = Organization(name="org")
+        user = User(organization=organization, email="a@example.com", hashed_password="x")
+        created_at = datetime(2026, 10, 18)
+        db.add_all(
+            GPU(
+                organization=organization,
+                user=user,
+                gpu_model="a100",
+                region="us-east-1",
+                status=GpuStatus.DEPROVISIONED if n == 2 else GpuStatus.BUSY,
+                lease_expires_at=created_at + timedelta(days=1),
+                created_at=created_at + timedelta(minutes=n),
+                updated_at=created_at,
+            )
+            for n in range(5)
+        )
+        await db.commit()
+
+        page = PageParams(after=None, limit=3)
+        rows, next_key = await gpu_crud.get_rows_by_owner(
+            db, organization_id=organization.id, page=page
+        )
+        gpus, entity_next_key = await gpu_crud.get_multi_by_owner(
+            db, organization_id=organization.id, page=page
+        )
+        assert next_key == entity_next_key
+        assert FastJSONResponse([row._asdict() for row in rows]).body == GPU_LIST.dump_json(
+            GPU_LIST.validate_python(gpus)
+        )
+    await engine.dispose()
@@ -0,0 +1,140 @@
+import pytest
+
+from src.backend.core import scheduler as scheduler_module
+from src.backend.core.scheduler import (
+    FairShareScheduler,
+    InMemorySchedulerBackend,
+    RedisSchedulerBackend,
+)
+
+
+def make_scheduler(max_in_flight=4, weights=None):
+    return FairShareScheduler(
+        InMemorySchedulerBackend(retention=60),
+        max_in_flight=max_in_flight,
+        avg_provision_seconds=60,
+        in_flight_timeout=600,
+        weights=weights,
+    )
+
+
+async def enqueue(scheduler, organization_id, count, priority="normal", start=0):
+    for i in range(start, start + count):
+        request_id = f"{organization_id}-{i}"
+        await scheduler.enqueue(
+            request_id=request_id,
+            organization_id=organization_id,
+            priority=priority,
+            payload={"request_id": request_id},
+        )
+
+
+@pytest.mark.asyncio
+async def test_bursting_organization_does_not_starve_others():
+    scheduler = make_scheduler(max_in_flight=4)
+    await enqueue(scheduler, "a", 10)
+    await enqueue(scheduler, "b", 2)
+
+    dispatched = []
+    assert await scheduler.dispatch(lambda payload: dispatched.append(payload["request_id"])) == 4
+
+    assert sorted(dispatched) == ["a-0", "a-1", "b-0", "b-1"]
+
+
+@pytest.mark.asyncio
+async def test_in_flight_cap_and_completion():
+    scheduler = make_scheduler(max_in_flight=2)
+    await enqueue(scheduler, "a", 3)
+
+    dispatched = []
+    await scheduler.dispatch(lambda payload: dispatched.append(payload["request_id"]))
+    assert dispatched == ["a-0", "a-1"]
+    assert await scheduler.dispatch(dispatched.append) == 0
+
+    await scheduler.complete("a-0")
+    await scheduler.dispatch(lambda payload: dispatched.append(payload["request_id"]))
+    assert dispatched == ["a-0", "a-1", "a-2"]
+
+
+@pytest.mark.asyncio
+async def test_weights_split_capacity():
+    scheduler = make_scheduler(max_in_flight=8, weights={"a": 3})
+    await enqueue(scheduler, "a", 10)
+    await enqueue(scheduler, "b", 10)
+
+    dispatched = []
+    await scheduler.dispatch(lambda payload: dispatched.append(payload["request_id"]))
+
+    assert len([r for r in dispatched if r.startswith("a")]) == 6
+    assert len([r for r in dispatched if r.startswith("b")]) == 2
+
+
+@pytest.mark.asyncio
+async def test_priority_within_organization():
+    scheduler = make_scheduler(max_in_flight=1)
+    await enqueue(scheduler, "a", 1, priority="low")
+    await enqueue(scheduler, "a", 1, priority="high", start=1)
+
+    dispatched = []
+    await scheduler.dispatch(lambda payload: dispatched.append(payload["request_id"]))
+
+    assert dispatched == ["a-1"]
+
+
+@pytest.mark.asyncio
+async def test_status_reports_position_and_wait():
+    scheduler = make_scheduler(max_in_flight=2)
+    await enqueue(scheduler, "a", 3)
+
+    status = await scheduler.status("a-2")
+    assert status["state"] == "queued"
+    assert status["queue_position"] == 2
+    # 2 in-flight slots, a 60s provision time and a single organization.
+    assert status["estimated_wait_seconds"] == 90
+
+    await scheduler.dispatch(lambda payload: None)
+    assert (await scheduler.status("a-0"))["state"] == "dispatched"
+    assert (await scheduler.status("a-2"))["queue_position"] == 0
+    assert await scheduler.status("unknown") is None
+
+
+async def check_push_during_deactivate_keeps_request_dispatchable(backend):
+    scheduler = FairShareScheduler(
+        backend, max_in_flight=4, avg_provision_seconds=60, in_flight_timeout=600
+    )
+    await enqueue(scheduler, "a", 1)
+    submitted = []
+    assert await scheduler.dispatch(submitted.append) == 1
+
+    # The dispatcher found the queue empty, then a push landed before it
+    # dropped the organization from the ring.
+    await enqueue(scheduler, "a", 1, start=1)
+    assert await backend.deactivate("a") is False
+    assert await backend.ring() == ["a"]
+
+    assert await scheduler.dispatch(submitted.append) == 1
+    assert [payload["request_id"] for payload in submitted] == ["a-0", "a-1"]
+    assert await backend.deactivate("a") is True
+    assert await backend.ring() == []
+
+    # The organization rejoins the ring with its next request.
+    await enqueue(scheduler, "a", 1, start=2)
+    assert await backend.ring() == ["a"]
+
+
+@pytest.mark.asyncio
+async def test_push_during_deactivate_keeps_request_dispatchable():
+    await check_push_during_deactivate_keeps_request_dispatchable(InMemorySchedulerBackend(retention=60))
+
+
+@pytest.mark.asyncio
+async def test_redis_push_during_deactivate_keeps_request_dispatchable(monkeypatch):
+    fakeredis = pytest.importorskip("fakeredis")
+    pytest.importorskip("lupa")
+    monkeypatch.setattr(
+        scheduler_module.redis,
+        "from_url",
+        lambda url, **kwargs: fakeredis.aioredis.FakeRedis(**kwargs),
+    )
+    backend = RedisSchedulerBackend("redis://unused", retention=60)
+    await check_push_during_deactivate_keeps_request_dispatchable(backend)
@@ -0,0 +1,100 @@
+import pytest
+
+from src.backend.cloud import CloudError, InsufficientCapacity, PlacementGroupInUse, SimulatedProvider
+from src.backend.core.rate_limit import CloudAPIGuard, CloudAPIUnavailable, InMemoryRateLimitBackend
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def launch(provider, count=1, token="token", **kwargs):
+    options = {"instance_type": "p4d.24xlarge", "min_count": count, "max_count": count}
+    options.update(kwargs)
+    return provider.launch("us-east-1", client_token=token, tags={}, **options)
+
+
+def states(provider, instance_ids):
+    return {i: s.state for i, s in provider.describe("us-east-1", instance_ids).items()}
+
+
+def test_instances_boot_after_their_boot_time():
+    clock = Clock()
+    provider = SimulatedProvider(boot_distribution="constant", boot_seconds=30, clock=clock)
+    instance_ids = launch(provider, count=2)
+
+    assert set(states(provider, instance_ids).values()) == {"pending"}
+    clock.now = 30
+    described = provider.describe("us-east-1", instance_ids)
+    assert {s.state for s in described.values()} == {"running"}
+    assert all(s.public_ip for s in described.values())
+
+    # Repeating the launch with the same token starts nothing new.
+    assert launch(provider, count=2) == instance_ids
+
+
+def test_capacity_limits_launches():
+    provider = SimulatedProvider(capacity={"p4d.24xlarge": 3}, boot_seconds=1, seed=1)
+    launch(provider, count=2, token="a")
+
+    with pytest.raises(InsufficientCapacity):
+        launch(provider, count=2, token="b")
+    # Partial launches fill what is left.
+    assert len(launch(provider, token="c", min_count=1, max_count=2)) == 1
+
+
+def test_boot_failures_and_lifecycle():
+    clock = Clock()
+    provider = SimulatedProvider(
+        boot_distribution="uniform", boot_seconds=10, boot_failure_rate=1.0, clock=clock, seed=1
+    )
+    failed = launch(provider, token="a")
+    clock.now = 20
+    assert states(provider, failed) == {failed[0]: "terminated"}
+
+    provider.boot_failure_rate = 0.0
+    provider.create_placement_group("us-east-1", "gang")
+    instance_ids = launch(provider, token="b", placement_group="gang")
+    clock.now = 40
+    provider.stop("us-east-1", instance_ids)
+    clock.now = 50
+    assert states(provider, instance_ids) == {instance_ids[0]: "stopped"}
+
+    provider.terminate("us-east-1", instance_ids)
+    with pytest.raises(PlacementGroupInUse):
+        provider.delete_placement_group("us-east-1", "gang")
+    clock.now = 60
+    assert provider.delete_placement_group("us-east-1", "gang")
+    assert not provider.delete_placement_group("us-east-1", "gang")
+
+
+def test_throttling_goes_through_the_guard():
+    clock = Clock()
+    sleeps = []
+
+    def sleep(seconds):
+        sleeps.append(seconds)
+        clock.now += 1
+
+    guard = CloudAPIGuard(
+        InMemoryRateLimitBackend(),
+        rates={}, default_rate=1000, min_rate=1, increase=1, decrease=0.5,
+        max_attempts=3, base_delay=0, max_delay=0, failure_threshold=10, cooldown=30, sleep=sleep,
+    )
+    provider = SimulatedProvider(api_rate_limit=1, guard=guard, clock=clock)
+    provider.describe("us-east-1", [])
+    provider.describe("us-east-1", [])
+
+    assert guard.throttled == 1
+    assert len(sleeps) == 1
+
+    provider.launch_failure_rate = 1.0
+    with pytest.raises(CloudAPIUnavailable):
+        launch(provider)
+    provider.guard = None
+    with pytest.raises(CloudError):
+        launch(provider)
@@ -0,0 +1,93 @@
+import asyncio
+from datetime import datetime
+
+import pytest
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+
+from src.backend.core.database import Base
+from src.backend.core.single_flight import SingleFlight, single_flight
+from src.backend.crud.organization import organization as organization_crud
+from src.backend.models import Organization
+
+
+@pytest.mark.asyncio
+async def test_concurrent_calls_share_one_result():
+    flight = SingleFlight()
+    calls = []
+
+    async def call():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return len(calls)
+
+    results = await asyncio.gather(*(flight.do("key", call) for _ in range(5)))
+    assert results == [1] * 5
+    assert flight.stats() == {"in_flight": 0, "leaders": 1, "coalesced": 4}
+
+    # Nothing is kept: the next call runs again.
+    assert await flight.do("key", call) == 2
+
+
+@pytest.mark.asyncio
+async def test_errors_are_shared_and_cancelled_leaders_hand_over():
+    flight = SingleFlight()
+
+    async def fail():
+        await asyncio.sleep(0.01)
+        raise ValueError("boom")
+
+    results = await asyncio.gather(*(flight.do("key", fail) for _ in range(3)), return_exceptions=True)
+    assert [type(result) for result in results] == [ValueError] * 3
+
+    started = asyncio.Event()
+
+    async def slow():
+        started.set()
+        await asyncio.sleep(10)
+
+    leader = asyncio.create_task(flight.do("key", slow))
+    await started.wait()
+    follower = asyncio.create_task(flight.do("key", lambda: asyncio.sleep(0, result="own")))
+    await asyncio.sleep(0)
+    leader.cancel()
+    assert await follower == "own"
+
+
+@pytest.mark.asyncio
+async def test_concurrent_gets_run_one_query_into_each_session(tmp_path):
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path}/flight.db")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    async with AsyncSession(engine, expire_on_commit=False) as db:
+        organization = Organization(name="org")
+        db.add(organization)
+        await db.commit()
+        organization_id = organization.id
+
+    selects = []
+
+    def count(conn, cursor, statement, parameters, context, executemany):
+        if statement.startswith("SELECT organizations"):
+            selects.append(statement)
+
+    event.listen(engine.sync_engine, "before_cursor_execute", count)
+    sessions = [AsyncSession(engine) for _ in range(4)]
+    coalesced = single_flight.coalesced
+    found = await asyncio.gather(
+        *(organization_crud.get(db, id=organization_id) for db in sessions)
+    )
+    assert len(selects) == 1
+    assert single_flight.coalesced - coalesced == 3
+    # Every caller gets an instance of its own session.
+    assert [organization in db for organization, db in zip(found, sessions)] == [True] * 4
+    assert len({id(organization) for organization in found}) == 4
+
+    # A session that wrote reads for itself.
+    sessions[0].info["wrote"] = True
+    await asyncio.gather(*(organization_crud.get(db, id=organization_id) for db in sessions[:2]))
+    assert len(selects) == 3
+
+    for db in sessions:
+        await db.close()
+    await engine.dispose()
@@ -0,0 +1,145 @@
+import uuid
+
+import numpy as np
+import pytest
+
+from src.backend.core.telemetry import MINUTE, TelemetryStore
+
+
+class Clock:
+    def __init__(self, now=1_000_000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+def create_store(clock, **overrides):
+    options = dict(
+        raw_samples=10,
+        minute_samples=5,
+        hour_samples=4,
+        idle_utilization=5.0,
+        max_gpus=100,
+        clock=clock,
+    )
+    options.update(overrides)
+    return TelemetryStore(**options)
+
+
+def test_raw_window_aggregates():
+    clock = Clock(3600 * 300)
+    store = create_store(clock)
+    gpu_id, organization_id = uuid.uuid4(), uuid.uuid4()
+    for i, utilization in enumerate([0, 2, 50, 100]):
+        store.record(gpu_id, organization_id, [utilization, 40, None, 200], at=clock.now - 40 + i * 10)
+
+    telemetry = store.gpu_telemetry(gpu_id, window_seconds=60)
+    assert telemetry["samples"] == 4
+    assert telemetry["resolution_seconds"] == 0
+    assert telemetry["mean"] == {
+        "utilization": 38.0,
+        "memory_utilization": 40.0,
+        "temperature_c": None,
+        "power_w": 200.0,
+    }
+    assert telemetry["p95"]["utilization"] == pytest.approx(92.5)
+    assert telemetry["idle_fraction"] == 0.5
+
+    # Samples older than the window are left out.
+    assert store.gpu_telemetry(gpu_id, window_seconds=15)["samples"] == 1
+    assert store.gpu_telemetry(uuid.uuid4(), window_seconds=60) is None
+
+
+def test_windows_past_the_raw_ring_use_downsampled_means():
+    clock = Clock(3600 * 300)
+    store = create_store(clock)
+    gpu_id = uuid.uuid4()
+    start = clock.now
+    # 4 minutes of one sample every 10 seconds: idle for two, busy for two.
+    for i in range(24):
+        store.record(gpu_id, None, [0 if i < 12 else 80, None, None, None], at=start + i * 10)
+    clock.now = start + 240
+
+    telemetry = store.gpu_telemetry(gpu_id, window_seconds=600)
+    # The raw ring only holds 10 samples, so the minute means are used.
+    assert telemetry["resolution_seconds"] == MINUTE
+    assert telemetry["samples"] == 24
+    assert telemetry["mean"]["utilization"] == 40.0
+    assert telemetry["idle_fraction"] == 0.5
+
+    # The hour tier, including the minute and hour being filled, agrees.
+    telemetry = store.gpu_telemetry(gpu_id, window_seconds=3600 * 3)
+    assert telemetry["samples"] == 24
+    assert telemetry["mean"]["utilization"] == 40.0
+
+
+def test_memory_is_fixed_per_gpu_and_gpus_are_bounded():
+    clock = Clock()
+    store = create_store(clock, max_gpus=2)
+    gpu_ids = [uuid.uuid4() for _ in range(3)]
+    organization_id = uuid.uuid4()
+    store.record(gpu_ids[0], organization_id, [10, None, None, None])
+    size = store.stats()["bytes"]
+    for i in range(1000):
+        store.record(gpu_ids[0], organization_id, [10, None, None, None], at=clock.now + i * 30)
+    assert store.stats()["bytes"] == size
+
+    store.record(gpu_ids[1], organization_id, [10, None, None, None])
+    store.record(gpu_ids[2], organization_id, [10, None, None, None])
+    assert store.stats()["gpus"] == 2
+    assert store.stats()["evicted"] == 1
+    summary, per_gpu = store.organization_telemetry(organization_id, window_seconds=60)
+    assert set(per_gpu) == {gpu_ids[1], gpu_ids[2]}
+    assert summary["samples"] == 2
+
+
+def test_gpus_move_between_organizations():
+    clock = Clock()
+    store = create_store(clock)
+    gpu_id, first, second = uuid.uuid4(), uuid.uuid4(), uuid.uuid4()
+    store.record(gpu_id, first, [0, None, None, None], at=clock.now - 30)
+    store.record(gpu_id, second, [10, None, None, None])
+
+    assert store.organization_telemetry(first, 60)[1] == {}
+    assert set(store.organization_telemetry(second, 60)[1]) == {gpu_id}
+    # The first organization's samples do not follow the GPU.
+    assert store.gpu_telemetry(gpu_id, 60)["samples"] == 1
+    assert store.idle_gpus(second, 60, min_idle_fraction=0.5) == ([], [gpu_id])
+
+    store.forget([gpu_id])
+    assert store.gpu_telemetry(gpu_id, 60) is None
+    assert store.organization_telemetry(second, 60)[1] == {}
+
+
+def test_samples_without_metrics_are_ignored():
+    store = create_store(Clock())
+    store.record(uuid.uuid4(), None, [None, None, None, None])
+    assert store.stats()["gpus"] == 0
+
+
+def test_snapshot_round_trip(tmp_path):
+    clock = Clock(3600 * 300)
+    store = create_store(clock)
+    organization_id = uuid.uuid4()
+    gpu_ids = [uuid.uuid4(), uuid.uuid4()]
+    for i in range(200):
+        store.record(gpu_ids[i % 2], organization_id, [i % 7, 10, 60, 250], at=clock.now + i * 10)
+    store.record(uuid.uuid4(), None, [1, None, None, None], at=clock.now)
+    clock.now += 2000
+    path = tmp_path / "telemetry.npz"
+    store.snapshot(str(path))
+
+    restored = create_store(clock)
+    restored.load(str(path))
+    assert restored.stats()["gpus"] == 3
+    for window in (60, 600, 3600 * 4):
+        assert restored.organization_telemetry(organization_id, window) == store.organization_telemetry(
+            organization_id, window
+        )
+
+    # Rings that shrank keep the newest rows.
+    smaller = create_store(clock, raw_samples=3)
+    smaller.load(str(path))
+    times, _, _ = smaller._series[gpu_ids[1]].rings[0].rows()
+    np.testing.assert_array_equal(times, store._series[gpu_ids[1]].rings[0].rows()[0][-3:])
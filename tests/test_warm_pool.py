@@ -0,0 +1,339 @@
+import uuid
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import select, update
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+
+from src.backend import worker
+from src.backend.api.v1.endpoints import gpus as gpu_endpoints
+from src.backend.core import metrics
+from src.backend.core import warm_pool as warm_pool_module
+from src.backend.core.database import Base
+from src.backend.core.gpu_cache import GPUCache, InMemoryGPUCacheBackend
+from src.backend.core.quota import InMemoryQuotaBackend
+from src.backend.core.warm_pool import (
+    InMemoryWarmPoolStatsBackend,
+    RedisWarmPoolStatsBackend,
+    WarmPoolStats,
+)
+from src.backend.crud.gpu import gpu as gpu_crud
+from src.backend.models import GPU, Organization
+from src.backend.models.gpu import GpuStatus
+from src.backend.schemas.gpu import GPUAllocationRequest
+
+NOW = datetime.now(timezone.utc)
+LEASE = NOW + timedelta(days=1)
+
+
+async def create_engine(tmp_path):
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path}/warm_pool.db")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    return engine
+
+
+def create_runtime(engine):
+    """The parts of the worker runtime the tasks use; `run` hands back the coroutine."""
+    return SimpleNamespace(
+        session=lambda: AsyncSession(engine, expire_on_commit=False),
+        warm_pool_stats=WarmPoolStats(InMemoryWarmPoolStatsBackend()),
+        run=lambda coro: coro,
+    )
+
+
+def warm_gpu(gpu_model="a100", region="us-east-1", status=GpuStatus.AVAILABLE, age=0, **columns):
+    return GPU(
+        gpu_model=gpu_model,
+        region=region,
+        status=status,
+        lease_expires_at=LEASE,
+        created_at=NOW - timedelta(minutes=age),
+        **columns,
+    )
+
+
+async def check_stats_are_shared(create_backend):
+    # One process serves the API and another runs the worker.
+    api_stats, worker_stats = WarmPoolStats(create_backend()), WarmPoolStats(create_backend())
+    await api_stats.record_hit(0.5)
+    await api_stats.record_hit(1.5)
+    await api_stats.record_miss()
+    await worker_stats.record_cold_ready([100, 200])
+    await worker_stats.record_cold_ready([])
+    await worker_stats.record_launched(3)
+
+    assert await api_stats.stats() == {
+        "hits": 2,
+        "misses": 1,
+        "hit_rate": 2 / 3,
+        "avg_hit_ready_seconds": 1.0,
+        "avg_cold_ready_seconds": 150.0,
+        "replenish_launched": 3,
+    }
+
+
+@pytest.mark.asyncio
+async def test_stats_are_shared():
+    backend = InMemoryWarmPoolStatsBackend()
+    await check_stats_are_shared(lambda: backend)
+
+
+@pytest.mark.asyncio
+async def test_redis_stats_are_shared(monkeypatch):
+    fakeredis = pytest.importorskip("fakeredis")
+    server = fakeredis.FakeServer()
+    monkeypatch.setattr(
+        warm_pool_module.redis,
+        "from_url",
+        lambda url, **kwargs: fakeredis.aioredis.FakeRedis(server=server, **kwargs),
+    )
+    await check_stats_are_shared(lambda: RedisWarmPoolStatsBackend("redis://unused"))
+
+
+@pytest.mark.asyncio
+async def test_metrics_snapshot_awaits_async_collectors(monkeypatch):
+    monkeypatch.setattr(metrics, "_collectors", {})
+    stats = WarmPoolStats(InMemoryWarmPoolStatsBackend())
+    await stats.record_miss()
+    metrics.register("warm_pool", stats.stats)
+    metrics.register("plain", lambda: {"count": 1})
+
+    snapshot = await metrics.snapshot()
+    assert snapshot["warm_pool"]["misses"] == 1
+    assert snapshot["plain"] == {"count": 1}
+
+
+@pytest.mark.asyncio
+async def test_replenish_counts_launches_that_have_not_started(tmp_path, monkeypatch):
+    engine = await create_engine(tmp_path)
+    runtime = create_runtime(engine)
+    launched = []
+    monkeypatch.setattr(worker, "runtime", runtime)
+    monkeypatch.setattr(worker.provision_gpu, "delay", launched.append)
+    monkeypatch.setattr(
+        worker.settings, "WARM_POOL_TARGETS", {"a100": {"us-east-1": 2, "eu-west-1": 1}}
+    )
+
+    assert (await worker.replenish_warm_pool())["launched"] == 3
+    # The queued launches have not run yet, but their records count.
+    assert (await worker.replenish_warm_pool())["launched"] == 0
+    assert sorted((r["gpu_model"], r["region"]) for r in launched) == [
+        ("a100", "eu-west-1"),
+        ("a100", "us-east-1"),
+        ("a100", "us-east-1"),
+    ]
+    assert (await runtime.warm_pool_stats.stats())["replenish_launched"] == 3
+
+    # A launch that never started is queued again after the timeout.
+    async with runtime.session() as db:
+        gpu_ids = (await db.execute(select(GPU.id))).scalars().all()
+        await db.execute(
+            update(GPU)
+            .where(GPU.id == gpu_ids[0])
+            .values(created_at=datetime.now(timezone.utc) - timedelta(hours=1))
+        )
+        await db.execute(
+            update(GPU).where(GPU.id == gpu_ids[1]).values(status=GpuStatus.AVAILABLE)
+        )
+        await db.commit()
+    launched.clear()
+    assert await worker.replenish_warm_pool() == {
+        "status": "complete",
+        "launched": 0,
+        "retried": 1,
+    }
+    assert launched[0]["gpu_id"] == str(gpu_ids[0])
+    await engine.dispose()
+
+
+@pytest.mark.asyncio
+async def test_claim_warm_takes_the_oldest_matching_pool_gpu(tmp_path):
+    engine = await create_engine(tmp_path)
+    async with AsyncSession(engine, expire_on_commit=False, autoflush=False) as db:
+        organization = Organization(name="org")
+        older, newer = warm_gpu(age=10), warm_gpu(age=5)
+        db.add_all(
+            [
+                organization,
+                newer,
+                older,
+                # Not in the a100/us-east-1 pool.
+                warm_gpu(age=60, organization=Organization(name="owner")),
+                warm_gpu(age=60, status=GpuStatus.PROVISIONING),
+                warm_gpu(age=60, gpu_model="h100"),
+                warm_gpu(age=60, region="eu-west-1"),
+            ]
+        )
+        await db.commit()
+        statements = []
+        execute = db.execute
+
+        async def record(statement, *args, **kwargs):
+            statements.append(statement)
+            return await execute(statement, *args, **kwargs)
+
+        db.execute = record
+        organization_id, older_id, newer_id = organization.id, older.id, newer.id
+        user_id = uuid.uuid4()
+
+        async def claim():
+            return await gpu_crud.claim_warm(
+                db,
+                gpu_model="a100",
+                region="us-east-1",
+                organization_id=organization_id,
+                user_id=user_id,
+                lease_expires_at=NOW + timedelta(hours=1),
+            )
+
+        claimed = await claim()
+        assert claimed.id == older_id
+        assert claimed.user_id == user_id
+        # The claim is flushed, so the same transaction already sees it.
+        owned = await db.execute(select(GPU.id).where(GPU.organization_id == organization_id))
+        assert owned.scalars().all() == [older_id]
+
+        # Rolling back gives the GPU back to the pool.
+        await db.rollback()
+        assert (await claim()).id == older_id
+        assert (await claim()).id == newer_id
+        assert await claim() is None
+
+    sql = str(statements[0].compile(dialect=postgresql.dialect()))
+    assert "ORDER BY gpus.created_at" in sql
+    assert sql.endswith("FOR UPDATE SKIP LOCKED")
+    await engine.dispose()
+
+
+@pytest.mark.asyncio
+async def test_count_warm_pool_counts_unassigned_gpus_on_their_way(tmp_path):
+    engine = await create_engine(tmp_path)
+    async with AsyncSession(engine) as db:
+        db.add_all(
+            [
+                warm_gpu(),
+                warm_gpu(status=GpuStatus.PROVISIONING),
+                warm_gpu(region="eu-west-1"),
+                warm_gpu(status=GpuStatus.ERROR),
+                warm_gpu(status=GpuStatus.DEPROVISIONING),
+                warm_gpu(organization=Organization(name="owner")),
+            ]
+        )
+        await db.commit()
+
+        assert await gpu_crud.count_warm_pool(db) == {
+            ("a100", "us-east-1"): 2,
+            ("a100", "eu-west-1"): 1,
+        }
+    await engine.dispose()
+
+
+@pytest.mark.asyncio
+async def test_replenish_launches_each_pool_deficit(tmp_path, monkeypatch):
+    engine = await create_engine(tmp_path)
+    async with AsyncSession(engine) as db:
+        db.add_all(
+            [
+                warm_gpu(),
+                # Above target: nothing is launched, nor taken away.
+                warm_gpu(region="eu-west-1"),
+                warm_gpu(region="eu-west-1"),
+                # Assigned GPUs are not part of the pool.
+                warm_gpu(gpu_model="h100", organization=Organization(name="owner")),
+            ]
+        )
+        await db.commit()
+    launched = []
+    monkeypatch.setattr(worker, "runtime", create_runtime(engine))
+    monkeypatch.setattr(worker.provision_gpu, "delay", launched.append)
+    monkeypatch.setattr(
+        worker.settings,
+        "WARM_POOL_TARGETS",
+        {"a100": {"us-east-1": 3, "eu-west-1": 1}, "h100": {"us-east-1": 2}},
+    )
+
+    assert (await worker.replenish_warm_pool())["launched"] == 4
+    assert sorted((r["gpu_model"], r["region"]) for r in launched) == [
+        ("a100", "us-east-1"),
+        ("a100", "us-east-1"),
+        ("h100", "us-east-1"),
+        ("h100", "us-east-1"),
+    ]
+    async with AsyncSession(engine) as db:
+        assert await gpu_crud.count_warm_pool(db) == {
+            ("a100", "us-east-1"): 3,
+            ("a100", "eu-west-1"): 2,
+            ("h100", "us-east-1"): 2,
+        }
+    await engine.dispose()
+
+
+class FakeScheduler:
+    def __init__(self):
+        self.payloads = []
+
+    async def enqueue(self, *, payload, **request):
+        self.payloads.append(payload)
+        return {"queue_position": 0, "estimated_wait_seconds": 1}
+
+
+@pytest.mark.asyncio
+async def test_allocate_serves_the_warm_pool_then_falls_back_to_cold(tmp_path, monkeypatch):
+    engine = await create_engine(tmp_path)
+    cache = GPUCache(
+        InMemoryGPUCacheBackend(), ttl_seconds=300, local_ttl_seconds=60, local_max_entries=100
+    )
+    quota = InMemoryQuotaBackend(reservation_ttl=60)
+    stats = WarmPoolStats(InMemoryWarmPoolStatsBackend())
+    scheduler = FakeScheduler()
+    monkeypatch.setattr(gpu_endpoints, "gpu_cache", cache)
+    monkeypatch.setattr(gpu_endpoints, "quota_backend", quota)
+    monkeypatch.setattr(gpu_endpoints, "warm_pool_stats", stats)
+    monkeypatch.setattr(gpu_endpoints, "allocation_scheduler", scheduler)
+    monkeypatch.setattr(gpu_endpoints, "dispatch_allocations", SimpleNamespace(delay=lambda: None))
+
+    async with AsyncSession(engine, expire_on_commit=False) as db:
+        organization = Organization(name="org", max_active_gpus=2)
+        pool_gpu = warm_gpu()
+        db.add_all([organization, pool_gpu])
+        await db.commit()
+        await cache.fill(pool_gpu.id, {"status": "AVAILABLE"}, await cache.version(pool_gpu.id))
+        user = SimpleNamespace(id=uuid.uuid4(), organization_id=organization.id)
+
+        async def allocate():
+            return await gpu_endpoints.allocate_gpu(
+                db=db,
+                allocation_request=GPUAllocationRequest(gpu_model="a100", region="us-east-1"),
+                current_user=user,
+            )
+
+        hit = await allocate()
+        assert hit["gpu_id"] == pool_gpu.id and hit["task_id"] is None
+        assert await cache.get(pool_gpu.id) is None
+        assert await quota.usage(str(organization.id)) == {"active": 1, "reserved": 0}
+
+        # The pool is empty: the request is queued for cold provisioning.
+        miss = await allocate()
+        assert miss["gpu_id"] != pool_gpu.id
+        assert scheduler.payloads[0]["gpu_id"] == str(miss["gpu_id"])
+        assert await quota.usage(str(organization.id)) == {"active": 1, "reserved": 1}
+
+        # Over quota, a claimed warm GPU goes back to the pool.
+        spare = warm_gpu()
+        db.add(spare)
+        await db.commit()
+        pool_gpu_id, spare_id, organization_id = pool_gpu.id, spare.id, organization.id
+        with pytest.raises(HTTPException) as denied:
+            await allocate()
+        assert denied.value.status_code == 429
+
+    async with AsyncSession(engine) as db:
+        owners = dict((await db.execute(select(GPU.id, GPU.organization_id))).all())
+        assert owners == {pool_gpu_id: organization_id, spare_id: None}
+    stats = await stats.stats()
+    assert (stats["hits"], stats["misses"]) == (1, 1)
+    await engine.dispose()
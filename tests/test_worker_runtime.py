@@ -0,0 +1,74 @@
+import asyncio
+import threading
+
+import pytest
+
+from src.backend.cloud.ec2 import EC2Clients
+from src.backend.core.worker_runtime import WorkerRuntime
+
+
+def test_tasks_share_one_event_loop():
+    runtime = WorkerRuntime()
+
+    async def current_loop():
+        return asyncio.get_running_loop()
+
+    first = runtime.run(current_loop())
+    second = runtime.run(current_loop())
+    assert first is second
+    assert runtime.session().bind is runtime.engine
+
+    runtime.shutdown()
+    assert not runtime.started
+    assert first.is_closed()
+
+
+def test_ec2_clients_are_cached():
+    clients = EC2Clients()
+
+    assert clients.client("us-east-1") is clients.client("us-east-1")
+    assert clients.client("us-east-1") is not clients.client("eu-west-1")
+    assert clients.resource("us-east-1") is clients.resource("us-east-1")
+
+
+def test_ec2_resources_are_per_thread():
+    clients = EC2Clients()
+    main_resource = clients.resource("us-east-1")
+    other = []
+    thread = threading.Thread(target=lambda: other.append(clients.resource("us-east-1")))
+    thread.start()
+    thread.join()
+
+    assert other[0] is not main_resource
+
+
+def test_only_pools_that_run_one_task_at_a_time_are_supported():
+    runtime = WorkerRuntime()
+    runtime.check_pool("prefork")
+    runtime.check_pool("solo")
+    for pool in ("threads", "gevent", "eventlet"):
+        with pytest.raises(RuntimeError):
+            runtime.check_pool(pool)
+
+
+def test_tasks_from_other_threads_are_refused():
+    runtime = WorkerRuntime()
+
+    async def nothing():
+        pass
+
+    runtime.run(nothing())
+    errors = []
+
+    def run_in_thread():
+        try:
+            runtime.run(nothing())
+        except RuntimeError as e:
+            errors.append(e)
+
+    thread = threading.Thread(target=run_in_thread)
+    thread.start()
+    thread.join()
+    runtime.shutdown()
+
+    assert len(errors) == 1